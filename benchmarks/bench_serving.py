@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: Werkzeug threaded server vs aiohttp serving mode.
+
+Fires N POST /command requests with C concurrent connections against each
+server (both started in-process on loopback) and prints requests/sec and
+latency percentiles. The result cache is off unless --cache is given, so
+every request runs the handler and the comparison is thread-per-request vs
+the bounded pool, not cache hits.
+
+Run: python benchmarks/bench_serving.py --requests 4000 --concurrency 200
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import threading
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'client'))
+
+import aiohttp
+from aiohttp import web
+from werkzeug.serving import make_server
+
+import server
+from aio_server import create_app
+from result_cache import ResultCache
+
+
+def start_werkzeug(port):
+    httpd = make_server('127.0.0.1', port, server.app, threaded=True)
+    httpd.request_queue_size = 1024
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd.shutdown
+
+
+def start_aiohttp(port, workers):
+    ready = threading.Event()
+    loop = asyncio.new_event_loop()
+    state = {}
+
+    async def boot():
+        app = create_app(server.app, server.dispatch_command, server.check_token, max_workers=workers)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', port, backlog=1024)
+        await site.start()
+        state['runner'] = runner
+        ready.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(boot())
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait(10)
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(state['runner'].cleanup(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+    return stop
+
+
+async def load(url, total, concurrency, payload):
+    headers = {'Authorization': f'Bearer {server.AUTH_TOKEN}', 'Content-Type': 'application/json'}
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def worker():
+            nonlocal errors
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                t0 = time.perf_counter()
+                try:
+                    async with session.post(url, data=payload, headers=headers) as resp:
+                        await resp.read()
+                        if resp.status != 200:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return elapsed, latencies, errors
+
+
+def report(name, elapsed, latencies, errors):
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f'{name:<10} {len(latencies) / elapsed:>9.0f} req/s   '
+          f'p50 {p(0.50):7.1f} ms   p99 {p(0.99):7.1f} ms   '
+          f'mean {statistics.mean(latencies) * 1000:7.1f} ms   errors {errors}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=server.SERVER_WORKERS)
+    parser.add_argument('--command', default='network_stats')
+    parser.add_argument('--port', type=int, default=5810)
+    parser.add_argument('--cache', action='store_true', help='keep the result cache (measures cache hits)')
+    args = parser.parse_args()
+    if not args.cache:
+        server.result_cache = ResultCache({})  # dispatch_command looks it up per request
+
+    payload = json.dumps({'command': args.command, 'params': {}})
+    print(f'{args.requests} x POST /command {args.command!r}, concurrency {args.concurrency}, '
+          f'cache {"on" if args.cache else "off"}\n')
+
+    for name, starter in (('werkzeug', lambda p: start_werkzeug(p)),
+                          ('aiohttp', lambda p: start_aiohttp(p, args.workers))):
+        port = args.port + (name == 'aiohttp')
+        stop = starter(port)
+        try:
+            url = f'http://127.0.0.1:{port}/command'
+            asyncio.run(load(url, 50, 10, payload))  # warm-up
+            report(name, *asyncio.run(load(url, args.requests, args.concurrency, payload)))
+        finally:
+            stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Transport benchmark: TCP loopback vs Unix domain socket.
+
+Sends N POST /command requests (one at a time by default, like the bot does)
+to each server mode listening on 127.0.0.1 and on a Unix socket, and prints
+per-command latency percentiles plus CPU time per request. Client and server
+share this process, so the CPU figure is the whole round trip on the machine.
+
+Run: python benchmarks/bench_transport.py --requests 5000 --concurrency 1
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'client'))
+
+import aiohttp
+from aiohttp import web
+from werkzeug.serving import make_server
+
+import server
+from aio_server import create_app
+from transport import bind_unix_socket
+
+
+def start_werkzeug(port, sock_path):
+    servers = [make_server('127.0.0.1', port, server.app, threaded=True)]
+    sock = bind_unix_socket(sock_path)
+    servers.append(make_server(f'unix://{sock_path}', 0, server.app, threaded=True, fd=sock.fileno()))
+    for httpd in servers:
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def stop():
+        for httpd in servers:
+            httpd.shutdown()
+            httpd.server_close()
+    return stop
+
+
+def start_aiohttp(port, sock_path, workers):
+    ready = threading.Event()
+    loop = asyncio.new_event_loop()
+    state = {}
+
+    async def boot():
+        app = create_app(server.app, server.dispatch_command, server.check_token, max_workers=workers)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        await web.SockSite(runner, bind_unix_socket(sock_path)).start()
+        state['runner'] = runner
+        ready.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(boot())
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait(10)
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(state['runner'].cleanup(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+    return stop
+
+
+async def load(url, make_connector, total, concurrency, payload):
+    headers = {'Authorization': f'Bearer {server.AUTH_TOKEN}', 'Content-Type': 'application/json'}
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async with aiohttp.ClientSession(connector=make_connector()) as session:
+        async def worker():
+            nonlocal errors, remaining
+            while remaining > 0:
+                remaining -= 1
+                t0 = time.perf_counter()
+                try:
+                    async with session.post(url, data=payload, headers=headers) as resp:
+                        await resp.read()
+                        if resp.status != 200:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+
+        cpu0 = time.process_time()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu0
+    return elapsed, cpu, latencies, errors
+
+
+def report(name, elapsed, cpu, latencies, errors):
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e6
+    print(f'{name:<16} {len(latencies) / elapsed:>7.0f} req/s   '
+          f'p50 {p(0.50):7.0f} µs   p99 {p(0.99):7.0f} µs   '
+          f'cpu {cpu / len(latencies) * 1e6:6.0f} µs/req   errors {errors}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=server.SERVER_WORKERS)
+    parser.add_argument('--command', default='network_stats')
+    parser.add_argument('--port', type=int, default=5820)
+    args = parser.parse_args()
+
+    payload = json.dumps({'command': args.command, 'params': {}})
+    print(f'{args.requests} x POST /command {args.command!r}, concurrency {args.concurrency}\n')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, starter in (('werkzeug', start_werkzeug),
+                              ('aiohttp', lambda p, s: start_aiohttp(p, s, args.workers))):
+            port = args.port + (mode == 'aiohttp')
+            sock_path = os.path.join(tmp, f'{mode}.sock')
+            stop = starter(port, sock_path)
+            try:
+                for transport, connector in (('tcp', lambda: aiohttp.TCPConnector(limit=args.concurrency)),
+                                             ('unix', lambda: aiohttp.UnixConnector(sock_path, limit=args.concurrency))):
+                    host = f'127.0.0.1:{port}' if transport == 'tcp' else 'localhost'
+                    url = f'http://{host}/command'
+                    asyncio.run(load(url, connector, 200, args.concurrency, payload))  # warm-up
+                    report(f'{mode}/{transport}',
+                           *asyncio.run(load(url, connector, args.requests, args.concurrency, payload)))
+            finally:
+                stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,19 +4,23 @@ Telegram KDE Connect Bot - Enhanced with CommandManager (exclusive commands)
 """
 
 import asyncio
+import html
 import logging
 import sys
+import time
 
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import Command
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, BufferedInputFile, InputMediaPhoto
 from aiogram.enums import ParseMode, ChatAction
 
 from . import config
 from client import SystemClient
 from middlewares.error import ErrorMiddleware
-from utils import safe_edit, safe_delete, chat_action, result_icon, ephemeral_notice
+from utils import (safe_edit, safe_edit_caption, safe_delete, chat_action, result_icon, ephemeral_notice,
+                   send_screenshot)
 from command_manager import CommandManager  # NEW
+from screen_feed import ScreenFeed
 
 from fallbacks import fallback_callback
 
@@ -29,6 +33,8 @@ logger = logging.getLogger(__name__)
 
 client = SystemClient()
 command_manager = CommandManager()  # NEW
+# Live screen feeds run in their own manager so other commands don't stop them
+watch_manager = CommandManager()
 
 
 def main_keyboard():
@@ -51,6 +57,7 @@ def system_keyboard():
         keyboard=[
             [KeyboardButton(text='🔒 Lock Screen'), KeyboardButton(text='😴 Sleep')],
             [KeyboardButton(text='📸 Screenshot'), KeyboardButton(text='⚠️ Shutdown')],
+            [KeyboardButton(text='👁️ Watch Screen'), KeyboardButton(text='⏹ Stop Watch')],
             [KeyboardButton(text='« Main Menu')],
         ],
         resize_keyboard=True,
@@ -74,6 +81,7 @@ def clipboard_keyboard():
     return ReplyKeyboardMarkup(
         keyboard=[
             [KeyboardButton(text='📋 Get Clipboard'), KeyboardButton(text='✍️ Copy Text')],
+            [KeyboardButton(text='🕘 Clipboard History')],
             [KeyboardButton(text='« Main Menu')],
         ],
         resize_keyboard=True,
@@ -141,16 +149,15 @@ async def handle_screenshot(message: Message):
     if not await authorize(message):
         return
 
-    from aiogram.types import BufferedInputFile
-
     async def runner():
         msg = await message.answer('📸 Taking screenshot...')
         async with chat_action(message.bot, message.chat.id, ChatAction.UPLOAD_PHOTO):
-            result = await client.send_command('screenshot')
-            if result.get('status') == 'success' and result.get('file'):
-                data = await client.get_screenshot(result['file'])
-                photo = BufferedInputFile(data, filename='screenshot.png')
-                await message.answer_photo(photo=photo, caption='📸 Screenshot')
+            result = await send_screenshot(client, message, {
+                'format': config.SCREENSHOT_FORMAT,
+                'quality': config.SCREENSHOT_QUALITY,
+                'max_width': config.SCREENSHOT_MAX_WIDTH,
+            })
+            if result.get('status') == 'success':
                 await safe_delete(msg)
             else:
                 await safe_edit(msg, f"❌ {result.get('message')}")
@@ -162,6 +169,61 @@ async def handle_screenshot(message: Message):
     )
 
 
+async def handle_watch_screen(message: Message):
+    """
+    Live screen feed: one photo message edited in place every N seconds
+    (``/watch 10``). Unchanged frames are skipped server-side, so nothing is uploaded.
+    """
+    if not await authorize(message):
+        return
+
+    parts = (message.text or '').split()
+    try:
+        interval = float(parts[1]) if len(parts) > 1 and parts[0].startswith('/') else config.WATCH_INTERVAL
+    except ValueError:
+        await message.answer('❌ Usage: /watch 5')
+        return
+    interval = max(config.WATCH_MIN_INTERVAL, interval)
+
+    feed = ScreenFeed(
+        client,
+        interval=interval,
+        params={'format': 'jpeg', 'quality': config.WATCH_QUALITY, 'max_width': config.WATCH_MAX_WIDTH},
+        threshold=config.WATCH_THRESHOLD,
+        duration=config.WATCH_MAX_MINUTES * 60,
+    )
+    state = {'message': None}
+
+    async def publish(result):
+        caption = f"👁️ Live screen · {time.strftime('%H:%M:%S')} · frame {feed.frames_sent + 1} · /stopwatch"
+        photo = BufferedInputFile(result['data'], filename=result['file'])
+        if state['message'] is None:
+            state['message'] = await message.answer_photo(photo=photo, caption=caption)
+        else:
+            await state['message'].edit_media(InputMediaPhoto(media=photo, caption=caption))
+
+    async def runner():
+        try:
+            await feed.run(publish)
+        finally:
+            text = f"⏹ Watch ended · {feed.summary()}"
+            if feed.last_error and not feed.frames_sent:
+                text = f"❌ {feed.last_error}"
+            if state['message'] is not None:
+                await safe_edit_caption(state['message'], text)
+            else:
+                await message.answer(text)
+
+    await watch_manager.run_exclusive(chat_id=message.chat.id, coro_factory=runner)
+
+
+async def handle_stop_watch(message: Message):
+    if not await authorize(message):
+        return
+    if not watch_manager.cancel(message.chat.id):
+        await message.answer('ℹ️ No live screen running.')
+
+
 async def handle_lock_screen(message: Message):
     if not await authorize(message):
         return
@@ -208,7 +270,16 @@ async def handle_paste(message: Message):
     async def runner():
         msg = await message.answer('📋 Getting clipboard...')
         result = await client.send_command('paste')
-        content = result.get('content', '(empty)')
+        if result.get('truncated'):
+            # Too long for a Telegram message: send the full text as a file
+            data = await client.get_clipboard_entry(result['id'])
+            await safe_delete(msg)
+            await message.answer_document(
+                BufferedInputFile(data, filename=f"clipboard-{result['id']}.txt"),
+                caption=f"📋 Clipboard ({result['chars']:,} chars)"
+            )
+            return
+        content = html.escape(result.get('content') or '(empty)')
         await safe_edit(msg, f"📋 <b>Clipboard:</b>\n<code>{content}</code>", parse_mode=ParseMode.HTML)
 
     await command_manager.run_exclusive(
@@ -218,12 +289,36 @@ async def handle_paste(message: Message):
     )
 
 
+async def handle_clipboard_history(message: Message):
+    """🕘 Clipboard History / /cliphistory [page]"""
+    if not await authorize(message):
+        return
+    parts = (message.text or '').split()
+    page = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() and int(parts[1]) > 0 else 1
+
+    async def runner():
+        result = await client.send_command('clipboard_history', {'offset': (page - 1) * 10, 'limit': 10})
+        text = result.get('details') or result.get('message')
+        if result.get('next_offset') is not None:
+            text += f"\n\nMore: /cliphistory {page + 1}"
+        await message.answer(text[:4000], reply_markup=clipboard_keyboard())
+
+    await command_manager.run_exclusive(
+        chat_id=message.chat.id,
+        coro_factory=runner,
+        on_cancel=lambda: ephemeral_notice(message, "⏳ Clipboard history dibatalkan.")
+    )
+
+
 async def cmd_volume(message: Message):
     if not await authorize(message):
         return
     parts = message.text.split()
     if len(parts) < 2:
-        await message.answer('❌ Usage: /volume 50', reply_markup=media_keyboard())
+        await show_volume(message)
+        return
+    if parts[1] == 'app':
+        await set_app_volume(message, parts[2:])
         return
     try:
         level = int(parts[1])
@@ -234,6 +329,39 @@ async def cmd_volume(message: Message):
         return
     await handle_volume_button(message, level)
 
+
+async def show_volume(message: Message):
+    """/volume without a level: current level, mute state and application streams."""
+
+    async def runner():
+        result = await client.send_command('volume_get')
+        text = result.get('details') or result.get('message')
+        await message.answer(f"{text}\n\nUsage: /volume 50  ·  /volume app <#> 30", reply_markup=media_keyboard())
+
+    await command_manager.run_exclusive(
+        chat_id=message.chat.id,
+        coro_factory=runner,
+        on_cancel=lambda: ephemeral_notice(message, "⏳ Perintah volume sebelumnya di-cancel.")
+    )
+
+
+async def set_app_volume(message: Message, args):
+    """/volume app <index> <0-100>"""
+    if len(args) != 2 or not args[0].isdigit() or not args[1].isdigit() or not 0 <= int(args[1]) <= 100:
+        await message.answer('❌ Usage: /volume app 42 30  (see /volume for stream numbers)')
+        return
+
+    async def runner():
+        result = await client.send_command('volume_app', {'index': int(args[0]), 'level': int(args[1])})
+        await message.answer(f"{result_icon(result.get('status'))} {result.get('message')}")
+
+    await command_manager.run_exclusive(
+        chat_id=message.chat.id,
+        coro_factory=runner,
+        on_cancel=lambda: ephemeral_notice(message, "⏳ Perintah volume sebelumnya di-cancel.")
+    )
+
+
 async def handle_sleep(message: Message):
     """
     Put PC to sleep (exclusive). Membatalkan perintah sleep sebelumnya jika user spam.
@@ -374,6 +502,80 @@ async def handle_processes(message: Message):
     )
 
 
+async def cmd_ps(message: Message):
+    """/ps <pattern> (substring), /ps -p <prefix>, /ps -r <regex> over name and cmdline."""
+    if not await authorize(message):
+        return
+    parts = (message.text or '').split(maxsplit=2)
+    mode = 'substring'
+    if len(parts) == 3 and parts[1] in ('-p', '-r'):
+        mode = 'prefix' if parts[1] == '-p' else 'regex'
+        pattern = parts[2]
+    else:
+        pattern = (message.text or '').partition(' ')[2].strip()
+    if not pattern:
+        await message.answer('❌ Usage: /ps firefox  ·  /ps -p fire  ·  /ps -r "^python.*server"')
+        return
+
+    async def runner():
+        msg = await message.answer('🔍 Searching processes...')
+        result = await client.send_command('process_search', {'pattern': pattern, 'mode': mode, 'limit': 15})
+        text = result.get('details') or result.get('message')
+        await safe_edit(msg, text[:4000])
+
+    await command_manager.run_exclusive(
+        chat_id=message.chat.id,
+        coro_factory=runner,
+        on_cancel=lambda: ephemeral_notice(message, '⏳ Process search cancelled.')
+    )
+
+
+async def cmd_pinfo(message: Message):
+    """/pinfo <pid>"""
+    if not await authorize(message):
+        return
+    parts = (message.text or '').split()
+    if len(parts) < 2 or not parts[1].isdigit():
+        await message.answer('❌ Usage: /pinfo 1234')
+        return
+
+    async def runner():
+        result = await client.send_command('process_info', {'pid': int(parts[1])})
+        await message.answer((result.get('details') or result.get('message'))[:4000])
+
+    await command_manager.run_exclusive(
+        chat_id=message.chat.id,
+        coro_factory=runner,
+        on_cancel=lambda: ephemeral_notice(message, '⏳ Process info cancelled.')
+    )
+
+
+async def cmd_pkill(message: Message):
+    """/pkill <name>, /pkill -t <pid> (whole tree), /pkill -n <name> (dry run)."""
+    if not await authorize(message):
+        return
+    parts = (message.text or '').split()
+    flags = {p for p in parts[1:] if p in ('-t', '-n')}
+    args = [p for p in parts[1:] if p not in flags]
+    if len(args) != 1 or ('-t' in flags and not args[0].isdigit()):
+        await message.answer('❌ Usage: /pkill firefox  ·  /pkill -t 1234 (tree)  ·  /pkill -n firefox (preview)')
+        return
+    params = {'tree': int(args[0])} if '-t' in flags else {'pattern': args[0]}
+    params['dry_run'] = '-n' in flags
+
+    async def runner():
+        msg = await message.answer('🔪 Killing processes...')
+        result = await client.send_command('process_kill_many', params)
+        text = result.get('details') or result.get('message')
+        await safe_edit(msg, text[:4000])
+
+    await command_manager.run_exclusive(
+        chat_id=message.chat.id,
+        coro_factory=runner,
+        on_cancel=lambda: ephemeral_notice(message, '⏳ Kill cancelled.')
+    )
+
+
 async def handle_player(message: Message):
     if not await authorize(message):
         return
@@ -414,6 +616,12 @@ async def main():
     dp.message.register(cmd_status, Command('status'))
     dp.message.register(cmd_volume, Command('volume'))
     dp.message.register(cmd_copy, Command('copy'))
+    dp.message.register(handle_clipboard_history, Command('cliphistory'))
+    dp.message.register(handle_watch_screen, Command('watch'))
+    dp.message.register(handle_stop_watch, Command('stopwatch'))
+    dp.message.register(cmd_ps, Command('ps'))
+    dp.message.register(cmd_pinfo, Command('pinfo'))
+    dp.message.register(cmd_pkill, Command('pkill'))
 
     # Menus
     dp.message.register(handle_main_menu, F.text == '« Main Menu')
@@ -431,6 +639,8 @@ async def main():
     dp.message.register(handle_sleep, F.text == '😴 Sleep')
     dp.message.register(handle_screenshot, F.text == '📸 Screenshot')
     dp.message.register(handle_shutdown, F.text == '⚠️ Shutdown')
+    dp.message.register(handle_watch_screen, F.text == '👁️ Watch Screen')
+    dp.message.register(handle_stop_watch, F.text == '⏹ Stop Watch')
 
     dp.message.register(handle_mute, F.text == '🔇 Mute')
     dp.message.register(lambda m: handle_volume_button(m, 25), F.text == '🔉 25%')
@@ -440,6 +650,7 @@ async def main():
 
     dp.message.register(handle_paste, F.text == '📋 Get Clipboard')
     dp.message.register(handle_copy_prompt, F.text == '✍️ Copy Text')
+    dp.message.register(handle_clipboard_history, F.text == '🕘 Clipboard History')
 
     dp.callback_query.register(fallback_callback)
 
@@ -448,6 +659,7 @@ async def main():
         await dp.start_polling(bot)
     finally:
         command_manager.cancel_all()
+        watch_manager.cancel_all()
         # Close Telegram and HTTP client sessions gracefully
         try:
             await client.aclose()
@@ -5,8 +5,10 @@ Enhanced with retries, backoff, and clearer error messages.
 
 import aiohttp
 import asyncio
+import os
+import json
 import logging
-from typing import Dict, Optional, Any, Callable, Awaitable
+from typing import Dict, List, Optional, Any, AsyncIterator, Callable, Awaitable
 from . import config
 
 logger = logging.getLogger(__name__)
@@ -17,6 +19,11 @@ class SystemClient:
 
     def __init__(self):
         self.base_url = config.CLIENT_URL.rstrip("/")
+        # unix:///run/user/1000/kdebot.sock -> HTTP over that socket; the host part is then cosmetic
+        self.unix_path: Optional[str] = None
+        if self.base_url.startswith('unix://'):
+            self.unix_path = self.base_url[len('unix://'):]
+            self.base_url = 'http://localhost'
         self.auth_token = config.AUTH_TOKEN
         self.timeout = aiohttp.ClientTimeout(total=config.REQUEST_TIMEOUT)
         self.headers = {
@@ -31,7 +38,8 @@ class SystemClient:
     async def _get_session(self) -> aiohttp.ClientSession:
         """Lazy-create a persistent aiohttp session reused across requests."""
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(timeout=self.timeout)
+            connector = aiohttp.UnixConnector(path=self.unix_path) if self.unix_path else None
+            self._session = aiohttp.ClientSession(timeout=self.timeout, connector=connector)
         return self._session
 
     async def aclose(self):
@@ -85,6 +93,40 @@ class SystemClient:
             logger.error('Request failed: %s', e)
             return {'status': 'error', 'message': f'Unexpected error: {str(e)}'}
 
+    async def send_batch(self, commands: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run several commands in one round trip via /commands.
+
+        ``commands`` is a list of ``{'command': name, 'params': {...}}``; the response
+        holds ``results`` in the same order, each with its own status and elapsed_ms.
+        """
+        url = f'{self.base_url}/commands'
+        payload = {'commands': [{'command': c['command'], 'params': c.get('params') or {}} for c in commands]}
+
+        async def _do():
+            session = await self._get_session()
+            async with session.post(url, json=payload, headers=self.headers) as response:
+                if response.status == 401:
+                    return {'status': 'error', 'message': 'Authentication failed. Check AUTH_TOKEN on bot and client.'}
+                if response.status >= 500:
+                    text = await response.text()
+                    logger.error("Server error %s: %s", response.status, text)
+                    return {'status': 'error', 'message': 'Local client error (5xx). Try again.'}
+                if response.status == 400:
+                    return await response.json()
+                response.raise_for_status()
+                return await response.json()
+
+        try:
+            return await self._with_retries(_do)
+        except aiohttp.ClientConnectorError:
+            return {'status': 'error', 'message': 'Python client not running.\nStart: cd client && python server.py'}
+        except asyncio.TimeoutError:
+            return {'status': 'error', 'message': 'Request timeout. Please try again.'}
+        except Exception as e:
+            logger.error('Batch request failed: %s', e)
+            return {'status': 'error', 'message': f'Unexpected error: {str(e)}'}
+
     async def get_status(self) -> Dict[str, Any]:
         """Get system status with retries."""
         url = f'{self.base_url}/status'
@@ -101,6 +143,31 @@ class SystemClient:
             logger.error('Failed to get status: %s', e)
             return {'status': 'error', 'message': str(e)}
 
+    async def stream_events(self, topics: Optional[List[str]] = None,
+                            interval: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield live telemetry delta frames from /stream (Server-Sent Events).
+
+        Each frame maps topic -> changed fields, e.g. ``{'ts': ..., 'cpu': {'cpu': 12.5}}``.
+        Iterates until the caller stops or the connection drops.
+        """
+        url = f'{self.base_url}/stream'
+        params = {}
+        if topics:
+            params['topics'] = ','.join(topics)
+        if interval:
+            params['interval'] = str(interval)
+        # No total timeout for a long-lived stream; keepalives arrive every 15s
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+
+        session = await self._get_session()
+        async with session.get(url, params=params, headers=self.headers, timeout=timeout) as response:
+            response.raise_for_status()
+            async for raw in response.content:
+                line = raw.decode('utf-8').rstrip('\r\n')
+                if line.startswith('data: '):
+                    yield json.loads(line[6:])
+
     async def upload_file(self, filename: str, file_url: str, file_size: int) -> Dict[str, Any]:
         """Upload file to PC, returning server JSON response."""
         url = f'{self.base_url}/upload'
@@ -120,6 +187,61 @@ class SystemClient:
             logger.error('Upload failed: %s', e)
             return {'status': 'error', 'message': str(e)}
 
+    async def get_job(self, job_id: str) -> Dict[str, Any]:
+        """Get transfer job progress from /jobs/<id>."""
+        url = f'{self.base_url}/jobs/{job_id}'
+
+        async def _do():
+            session = await self._get_session()
+            async with session.get(url, headers=self.headers) as response:
+                if response.status in (401, 404):
+                    return await response.json()
+                response.raise_for_status()
+                return await response.json()
+
+        try:
+            return await self._with_retries(_do)
+        except Exception as e:
+            logger.error('Job status failed: %s', e)
+            return {'status': 'error', 'message': str(e)}
+
+    async def wait_for_job(
+        self,
+        job_id: str,
+        on_progress: Optional[Callable[[Dict[str, Any]], Awaitable]] = None,
+        poll_interval: float = 1.0,
+        min_update_interval: float = 3.0,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Poll a transfer job until it finishes and return its final job dict.
+
+        ``on_progress`` is throttled: called at most once per ``min_update_interval``
+        seconds and only when the percentage moved, so Telegram edits stay well under
+        rate limits.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        last_update = 0.0
+        last_percent = None
+        while True:
+            result = await self.get_job(job_id)
+            if result.get('status') != 'success':
+                return {'state': 'error', 'error': result.get('message')}
+            job = result['job']
+            if job['state'] in ('done', 'error'):
+                return job
+            now = loop.time()
+            if on_progress and now - last_update >= min_update_interval and job.get('percent') != last_percent:
+                last_update, last_percent = now, job.get('percent')
+                try:
+                    await on_progress(job)
+                except Exception as e:
+                    logger.debug('Progress callback failed: %s', e)
+            if deadline and now >= deadline:
+                return {**job, 'state': 'error', 'error': 'Timed out waiting for transfer'}
+            await asyncio.sleep(poll_interval)
+
     async def download_file(self, filepath: str) -> bytes:
         """Download file bytes from PC. Raises Exception on error (handled by caller)."""
         url = f'{self.base_url}/getfile'
@@ -133,6 +255,136 @@ class SystemClient:
 
         return await self._with_retries(_do)
 
+    async def download_to(self, filepath: str, dest: str, chunk_size: int = 1 << 20) -> Dict[str, Any]:
+        """
+        Stream a PC file to ``dest`` without holding it in memory.
+
+        The server ETag is kept in ``<dest>.etag``: an unchanged file is answered with
+        304 and skipped, and an interrupted transfer resumes from ``<dest>.part`` with
+        a Range request guarded by If-Range (a changed file restarts from zero, and so
+        does a ``.part`` the server answers with 416, e.g. one that is already complete).
+        """
+        url = f'{self.base_url}/getfile'
+        part, meta = dest + '.part', dest + '.etag'
+        try:
+            with open(meta, encoding='utf-8') as f:
+                etag = f.read().strip() or None
+        except OSError:
+            etag = None
+
+        async def _do():
+            nonlocal etag
+            headers = {'Authorization': self.headers['Authorization']}
+            offset = os.path.getsize(part) if etag and os.path.exists(part) else 0
+            if offset:
+                headers.update({'Range': f'bytes={offset}-', 'If-Range': etag})
+            elif etag and os.path.exists(dest):
+                headers['If-None-Match'] = etag
+            timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+
+            session = await self._get_session()
+            async with session.get(url, params={'path': filepath}, headers=headers, timeout=timeout) as response:
+                if response.status == 304:
+                    return {'status': 'success', 'path': dest, 'bytes': 0, 'resumed': False, 'unchanged': True}
+                if response.status in (400, 401, 403, 404):
+                    body = await response.json(content_type=None)
+                    return {'status': 'error', 'message': body.get('message', f'HTTP {response.status}')}
+                if response.status == 416 and offset:
+                    restart = True
+                else:
+                    restart = False
+                    response.raise_for_status()
+                    resumed = response.status == 206
+                    new_etag = response.headers.get('ETag')
+                    if new_etag:
+                        with open(meta, 'w', encoding='utf-8') as f:
+                            f.write(new_etag)
+                    received = 0
+                    with open(part, 'ab' if resumed else 'wb') as f:
+                        async for chunk in response.content.iter_chunked(chunk_size):
+                            f.write(chunk)
+                            received += len(chunk)
+            if restart:
+                # The .part does not fit the file any more: drop it and start from zero
+                for stale in (part, meta):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+                etag = None
+                return await _do()
+            os.replace(part, dest)
+            return {'status': 'success', 'path': dest, 'bytes': received, 'resumed': resumed, 'unchanged': False}
+
+        try:
+            return await self._with_retries(_do)
+        except Exception as e:
+            logger.error('Download failed: %s', e)
+            return {'status': 'error', 'message': str(e)}
+
+    async def capture_screenshot(self, params: Optional[Dict[str, Any]] = None,
+                                 if_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Capture a screenshot and receive the image in the same response (GET /screenshot).
+
+        Returns ``{'status': 'success', 'data': bytes, 'file', 'format', 'width', 'height',
+        'backend', 'hash', 'since'}`` or an error dict. With ``if_hash`` (the ``hash`` of an
+        earlier capture) an unchanged screen yields ``{'status': 'success', 'unchanged': True,
+        'hash', 'since'}`` and no image.
+        """
+        url = f'{self.base_url}/screenshot'
+        query = {k: str(v) for k, v in (params or {}).items() if v is not None}
+        req_headers = dict(self.headers)
+        if if_hash:
+            req_headers['If-None-Match'] = f'"{if_hash}"'
+
+        async def _do():
+            session = await self._get_session()
+            async with session.get(url, params=query, headers=req_headers) as response:
+                if response.status == 401:
+                    return {'status': 'error', 'message': 'Authentication failed. Check AUTH_TOKEN on bot and client.'}
+                if response.content_type == 'application/json':
+                    return await response.json()
+                since = float(response.headers.get('X-Screenshot-Since', 0))
+                if response.status == 304:
+                    return {'status': 'success', 'unchanged': True, 'hash': if_hash, 'since': since}
+                response.raise_for_status()
+                headers = response.headers
+                return {
+                    'status': 'success',
+                    'unchanged': False,
+                    'hash': headers.get('ETag', '').strip('"') or None,
+                    'since': since,
+                    'data': await response.read(),
+                    'file': headers.get('X-Screenshot-File', 'screenshot'),
+                    'format': response.content_type.split('/')[-1],
+                    'width': int(headers.get('X-Screenshot-Width', 0)),
+                    'height': int(headers.get('X-Screenshot-Height', 0)),
+                    'backend': headers.get('X-Screenshot-Backend'),
+                }
+
+        try:
+            return await self._with_retries(_do)
+        except aiohttp.ClientConnectorError:
+            return {'status': 'error', 'message': 'Python client not running.\nStart: cd client && python server.py'}
+        except asyncio.TimeoutError:
+            return {'status': 'error', 'message': 'Request timeout. Please try again.'}
+        except Exception as e:
+            logger.error('Screenshot failed: %s', e)
+            return {'status': 'error', 'message': str(e)}
+
+    async def get_clipboard_entry(self, entry_id: str) -> bytes:
+        """Full text (UTF-8) of a clipboard history entry, for pastes too large to send inline."""
+        url = f'{self.base_url}/clipboard/{entry_id}'
+
+        async def _do():
+            session = await self._get_session()
+            async with session.get(url, headers=self.headers) as response:
+                response.raise_for_status()
+                return await response.read()
+
+        return await self._with_retries(_do)
+
     async def get_screenshot(self, filename: str) -> bytes:
         """Get screenshot file bytes. Raises Exception on error (handled by caller)."""
         url = f'{self.base_url}/download/{filename}'
@@ -61,6 +61,14 @@ class CommandManager:
         except Exception as e:
             logger.error("Unhandled exception in command task: %s", e)
 
+    def cancel(self, chat_id: int) -> bool:
+        """Cancel the running task for chat_id (if any); returns whether one was running."""
+        task = self._active.get(chat_id)
+        if task and not task.done():
+            task.cancel()
+            return True
+        return False
+
     def cancel_all(self):
         """Optional: Cancel semua task (dipanggil saat shutdown)."""
         for chat_id, task in self._active.items():
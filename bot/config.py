@@ -19,6 +19,22 @@ AUTH_TOKEN = os.getenv('AUTH_TOKEN')
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', 30))
 
+# Screenshots are re-compressed by Telegram anyway; ask the client for a smaller image
+SCREENSHOT_FORMAT = os.getenv('SCREENSHOT_FORMAT', 'jpeg')
+SCREENSHOT_QUALITY = int(os.getenv('SCREENSHOT_QUALITY', 85))
+SCREENSHOT_MAX_WIDTH = int(os.getenv('SCREENSHOT_MAX_WIDTH', 2560))
+
+# Live screen feed (/watch): smaller frames, unchanged ones are skipped
+WATCH_INTERVAL = float(os.getenv('WATCH_INTERVAL', 5))
+WATCH_MIN_INTERVAL = float(os.getenv('WATCH_MIN_INTERVAL', 3))  # Telegram edit rate limits
+WATCH_MAX_WIDTH = int(os.getenv('WATCH_MAX_WIDTH', 1280))
+WATCH_QUALITY = int(os.getenv('WATCH_QUALITY', 70))
+WATCH_THRESHOLD = int(os.getenv('WATCH_THRESHOLD', 2))  # hash bits that may differ before a frame is re-sent
+WATCH_MAX_MINUTES = float(os.getenv('WATCH_MAX_MINUTES', 30))
+
+# Files fetched from the PC are kept for repeat requests, least recently used evicted first
+DOWNLOAD_CACHE_MB = int(os.getenv('DOWNLOAD_CACHE_MB', 512))
+
 # Validate configuration
 if not BOT_TOKEN:
     raise ValueError("❌ BOT_TOKEN is required in .env file")
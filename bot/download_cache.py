@@ -0,0 +1,88 @@
+"""
+On-disk cache for files fetched from the PC.
+
+Each requested path maps to one cache file plus its ``.etag``, so asking for
+an unchanged file again is answered with 304 and nothing crosses the wire.
+The Telegram ``file_id`` of the last upload is remembered too, letting the
+bot re-send the document without uploading it again. The cache is trimmed
+least-recently-used first once it grows past ``max_bytes``.
+"""
+
+import os
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCache:
+    """LRU-bounded cache directory fed by ``SystemClient.download_to``."""
+
+    def __init__(self, root: str, max_bytes: int = 512 << 20):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._file_ids: Dict[str, str] = {}
+
+    def path_for(self, filepath: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(filepath.encode('utf-8')).hexdigest()[:16])
+
+    async def fetch(self, client, filepath: str) -> Dict[str, Any]:
+        """Download ``filepath`` into the cache, skipping it when the PC copy is unchanged."""
+        os.makedirs(self.root, exist_ok=True)
+        dest = self.path_for(filepath)
+        result = await client.download_to(filepath, dest)
+        if result.get('status') != 'success':
+            # Drop the leftovers so the next request starts clean; the etag may
+            # already describe a newer file than the cached copy
+            for stale in (dest + '.part', dest + '.etag'):
+                _remove(stale)
+            return result
+        if not result.get('unchanged'):
+            self._file_ids.pop(dest, None)
+        os.utime(dest)  # mark as recently used
+        self.prune(keep=dest)
+        return result
+
+    def file_id(self, dest: str) -> Optional[str]:
+        return self._file_ids.get(dest)
+
+    def remember(self, dest: str, file_id: str):
+        self._file_ids[dest] = file_id
+
+    def prune(self, keep: Optional[str] = None):
+        """Evict least recently used entries until the cache fits ``max_bytes``."""
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            if '.' in name:
+                continue  # .etag / .part companions go with their entry
+            path = os.path.join(self.root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            for victim in (path, path + '.etag'):
+                _remove(victim)
+            self._file_ids.pop(path, None)
+            total -= size
+            logger.debug('Evicted %s from the download cache', path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
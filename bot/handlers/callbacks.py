@@ -3,11 +3,13 @@ Callback query handlers for inline buttons
 """
 
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, BufferedInputFile
+from aiogram.types import CallbackQuery
 from aiogram.enums import ParseMode
 
+import config
 import keyboards
 from client import SystemClient
+from utils import send_screenshot
 
 router = Router()
 client = SystemClient()
@@ -110,19 +112,14 @@ async def callback_cmd_screenshot(callback: CallbackQuery):
     await callback.answer('📸 Taking screenshot...')
 
     try:
-        result = await client.send_command('screenshot')
+        # Image comes back in the same response; an unchanged screen re-sends the cached file_id
+        result = await send_screenshot(client, callback.message, {
+            'format': config.SCREENSHOT_FORMAT,
+            'quality': config.SCREENSHOT_QUALITY,
+            'max_width': config.SCREENSHOT_MAX_WIDTH,
+        }, reply_markup=keyboards.system_menu())
 
-        if result.get('status') == 'success' and result.get('file'):
-            # Download screenshot
-            screenshot_data = await client.get_screenshot(result['file'])
-
-            # Send as photo
-            photo = BufferedInputFile(screenshot_data, filename='screenshot.png')
-            await callback.message.answer_photo(
-                photo=photo,
-                caption='📸 Screenshot',
-                reply_markup=keyboards.system_menu()
-            )
+        if result.get('status') == 'success':
             await callback.message.delete()
         else:
             await callback.message.edit_text(
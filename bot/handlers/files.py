@@ -3,16 +3,50 @@ File upload/download handlers
 """
 
 from aiogram import Router, F
-from aiogram.types import Message, BufferedInputFile
+from aiogram.types import Message, FSInputFile
 from aiogram.enums import ParseMode
 import os
+import tempfile
 
+import config
 import keyboards
 from client import SystemClient
+from download_cache import DownloadCache
 
 router = Router()
 client = SystemClient()
 
+# Downloads are streamed here and kept with their ETag, so asking for an
+# unchanged file again costs a 304 instead of a transfer
+DOWNLOAD_CACHE = os.path.join(tempfile.gettempdir(), 'kdebot-downloads')
+downloads = DownloadCache(DOWNLOAD_CACHE, max_bytes=config.DOWNLOAD_CACHE_MB << 20)
+
+
+def _human(n):
+    n = float(n)
+    for unit in ('B', 'KB', 'MB'):
+        if n < 1024:
+            return f'{n:.0f} {unit}' if unit == 'B' else f'{n:.1f} {unit}'
+        n /= 1024
+    return f'{n:.1f} GB'
+
+
+async def _upload_with_progress(msg: Message, filename: str, file_url: str, file_size: int):
+    """Queue the transfer on the PC and edit ``msg`` with throttled progress until it ends."""
+    result = await client.upload_file(filename=filename, file_url=file_url, file_size=file_size)
+    job_id = result.get('job_id')
+    if result.get('status') != 'success' or not job_id:
+        return result
+
+    async def on_progress(job):
+        percent = f"{job['percent']:.0f}%" if job.get('percent') is not None else _human(job['bytes_done'])
+        await msg.edit_text(f"📥 Transferring to PC... {percent} ({_human(job.get('speed_bps') or 0)}/s)")
+
+    job = await client.wait_for_job(job_id, on_progress=on_progress)
+    if job.get('state') != 'done':
+        return {'status': 'error', 'message': job.get('error') or 'Upload failed'}
+    return {'status': 'success', 'path': job.get('path')}
+
 
 @router.message(F.document)
 async def handle_document(message: Message):
@@ -23,7 +57,8 @@ async def handle_document(message: Message):
         file = await message.bot.get_file(message.document.file_id)
         file_url = message.bot.session.api.file_url(message.bot.token, file.file_path)
 
-        result = await client.upload_file(
+        result = await _upload_with_progress(
+            msg,
             filename=message.document.file_name,
             file_url=file_url,
             file_size=message.document.file_size
@@ -59,7 +94,8 @@ async def handle_photo(message: Message):
 
         filename = f'photo_{int(message.date.timestamp())}.jpg'
 
-        result = await client.upload_file(
+        result = await _upload_with_progress(
+            msg,
             filename=filename,
             file_url=file_url,
             file_size=photo.file_size
@@ -92,16 +128,20 @@ async def handle_text(message: Message):
     if '/' in text or '\\' in text:
         msg = await message.answer('📥 Retrieving file from PC...')
 
+        filename = os.path.basename(text.rstrip('/\\')) or 'file'
         try:
-            file_data = await client.download_file(text)
-            filename = os.path.basename(text)
-
-            # Send as document
-            document = BufferedInputFile(file_data, filename=filename)
-            await message.answer_document(
-                document=document,
+            result = await downloads.fetch(client, text)
+            if result.get('status') != 'success':
+                raise RuntimeError(result.get('message', 'Download failed'))
+
+            # Send as document, read from disk unless Telegram already has this copy
+            dest = result['path']
+            sent = await message.answer_document(
+                document=downloads.file_id(dest) or FSInputFile(dest, filename=filename),
                 reply_markup=keyboards.files_menu()
             )
+            if sent.document:
+                downloads.remember(dest, sent.document.file_id)
             await msg.delete()
         except Exception as e:
             await msg.edit_text(
@@ -0,0 +1,60 @@
+"""
+Live screen feed ("watch screen") for one Telegram message.
+
+Every ``interval`` seconds the client captures a downscaled frame, sending the
+hash of the last frame *published*. Frames within ``threshold`` differing hash
+bits come back as ``unchanged`` with no image, so an idle desktop costs one
+small request per tick instead of an upload.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ScreenFeed:
+    """Capture loop; ``publish(result)`` receives only frames that changed."""
+
+    def __init__(self, client, interval: float = 5.0, params: Optional[Dict[str, Any]] = None,
+                 threshold: int = 2, duration: float = 1800.0, max_errors: int = 3):
+        self.client = client
+        self.interval = interval
+        self.params = {**(params or {}), 'threshold': threshold}
+        self.duration = duration
+        self.max_errors = max_errors
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.bytes_sent = 0
+        self.last_error: Optional[str] = None
+
+    async def run(self, publish: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        """Loop until ``duration`` elapses, the task is cancelled or captures keep failing."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.duration
+        last_hash: Optional[str] = None
+        errors = 0
+        while loop.time() < deadline:
+            started = loop.time()
+            result = await self.client.capture_screenshot(self.params, if_hash=last_hash)
+            if result.get('status') != 'success':
+                errors += 1
+                self.last_error = result.get('message')
+                logger.warning("Screen feed capture failed (%d/%d): %s", errors, self.max_errors, self.last_error)
+                if errors >= self.max_errors:
+                    return
+            elif result.get('unchanged'):
+                errors = 0
+                self.frames_skipped += 1
+            else:
+                errors = 0
+                await publish(result)
+                last_hash = result.get('hash')
+                self.frames_sent += 1
+                self.bytes_sent += len(result['data'])
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
+
+    def summary(self) -> str:
+        return (f'{self.frames_sent} frames sent, {self.frames_skipped} unchanged skipped, '
+                f'{self.bytes_sent / 1024:.0f} KB')
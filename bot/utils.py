@@ -5,11 +5,12 @@ Utility helpers (ditambahkan helper baru optional).
 import asyncio
 import contextlib
 import logging
-from typing import Optional
+import time
+from typing import Any, Dict, Optional
 from aiogram import Bot
 from aiogram.enums import ChatAction
 from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
-from aiogram.types import Message
+from aiogram.types import BufferedInputFile, Message
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,11 @@ async def safe_edit(message: Message, text: str, **kwargs) -> None:
         await message.edit_text(text, **kwargs)
 
 
+async def safe_edit_caption(message: Message, caption: str, **kwargs) -> None:
+    with contextlib.suppress(TelegramBadRequest, TelegramAPIError):
+        await message.edit_caption(caption=caption, **kwargs)
+
+
 async def safe_delete(message: Message) -> None:
     with contextlib.suppress(TelegramBadRequest, TelegramAPIError):
         await message.delete()
@@ -53,4 +59,38 @@ async def ephemeral_notice(message: Message, text: str, delay: float = 2.5):
         await asyncio.sleep(delay)
         await safe_delete(m)
     except Exception:
-        pass
\ No newline at end of file
+        pass
+
+
+class ScreenshotCache:
+    """Hash and Telegram file_id of the last screenshot sent (one screen, one owner)."""
+
+    def __init__(self) -> None:
+        self.hash: Optional[str] = None
+        self.file_id: Optional[str] = None
+
+
+screenshot_cache = ScreenshotCache()
+
+
+async def send_screenshot(client, target: Message, params: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+    """
+    Capture a screenshot and answer ``target`` with it.
+
+    If the client reports the screen unchanged since the cached hash, the cached
+    Telegram file_id is re-sent instead of uploading the image again.
+    Returns the client result (errors are left to the caller).
+    """
+    cache = screenshot_cache
+    result = await client.capture_screenshot(params, if_hash=cache.hash if cache.file_id else None)
+    if result.get('status') != 'success':
+        return result
+    if result.get('unchanged'):
+        since = time.strftime('%H:%M:%S', time.localtime(result['since']))
+        await target.answer_photo(photo=cache.file_id, caption=f'📸 Screenshot (no change since {since})', **kwargs)
+        return result
+    photo = BufferedInputFile(result['data'], filename=result['file'])
+    sent = await target.answer_photo(photo=photo, caption='📸 Screenshot', **kwargs)
+    if sent.photo:
+        cache.hash, cache.file_id = result.get('hash'), sent.photo[-1].file_id
+    return result
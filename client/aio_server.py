@@ -0,0 +1,217 @@
+"""
+Async serving mode (aiohttp)
+
+Selected with SERVER_MODE=aiohttp. ``/command`` is served natively: the
+request is parsed on the event loop and the blocking COMMAND_MAP handler
+runs on a bounded thread pool, so concurrency is capped by SERVER_WORKERS
+instead of growing one thread per connection. Every other route is bridged
+to the Flask WSGI app on the same pool (responses are buffered), except
+``/stream`` which is served natively so watchers never hold a pool thread,
+and GET ``/getfile`` / ``/download/<name>`` which use aiohttp's FileResponse:
+Range, If-Range and ETag handling with zero-copy ``os.sendfile``.
+"""
+
+import io
+import socket
+import os
+import sys
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from aiohttp import web
+from multidict import CIMultiDict
+
+import metrics
+from stream import KEEPALIVE_SECONDS, StreamHub, format_frame, parse_subscription_args
+
+logger = logging.getLogger(__name__)
+
+Dispatch = Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]]
+CheckAuth = Callable[[str], Optional[str]]
+ResolvePath = Callable[[str], Tuple[Optional[str], Optional[Dict[str, Any]], int]]
+
+# Hop-by-hop / length headers are recomputed by aiohttp
+_SKIP_RESPONSE_HEADERS = {'content-length', 'transfer-encoding', 'connection'}
+
+EXECUTOR_KEY = web.AppKey('executor', ThreadPoolExecutor)
+
+
+def _wsgi_environ(request: web.Request, body: bytes) -> Dict[str, Any]:
+    host, _, port = (request.host or '').partition(':')
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': request.path,
+        'QUERY_STRING': request.query_string,
+        'SERVER_NAME': host or 'localhost',
+        'SERVER_PORT': port or '80',
+        'SERVER_PROTOCOL': f'HTTP/{request.version.major}.{request.version.minor}',
+        'REMOTE_ADDR': request.remote or '',
+        'CONTENT_TYPE': request.headers.get('Content-Type', ''),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': request.scheme,
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in request.headers.items():
+        key = name.upper().replace('-', '_')
+        if key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            continue
+        key = 'HTTP_' + key
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def _call_wsgi(wsgi_app, environ: Dict[str, Any]) -> Tuple[int, list, bytes]:
+    captured = {}
+
+    def start_response(status, headers, exc_info=None):
+        captured['status'] = int(status.split(' ', 1)[0])
+        captured['headers'] = headers
+
+    iterable = wsgi_app(environ, start_response)
+    try:
+        body = b''.join(iterable)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    return captured['status'], captured['headers'], body
+
+
+def _file_response(path: str) -> web.FileResponse:
+    name = os.path.basename(path).replace('"', '')
+    return web.FileResponse(path, chunk_size=1 << 20,
+                            headers={'Content-Disposition': f'attachment; filename="{name}"'})
+
+
+def create_app(wsgi_app, dispatch: Dispatch, check_auth: CheckAuth, max_workers: int = 16,
+               stream_hub: Optional[StreamHub] = None, resolve_path: Optional[ResolvePath] = None,
+               resolve_screenshot: Optional[ResolvePath] = None) -> web.Application:
+    """Build the aiohttp application around an existing Flask app and its dispatcher."""
+    app = web.Application()
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='handler')
+    app[EXECUTOR_KEY] = executor
+
+    async def handle_command(request: web.Request) -> web.Response:
+        error = check_auth(request.headers.get('Authorization', ''))
+        if error:
+            return web.json_response({'status': 'error', 'message': error}, status=401)
+        try:
+            data = await request.json()
+        except ValueError as e:
+            return web.json_response({'status': 'error', 'message': f'Invalid JSON: {e}'}, status=400)
+        loop = asyncio.get_running_loop()
+        result, status = await loop.run_in_executor(executor, dispatch, data)
+        return web.json_response(result, status=status)
+
+    async def bridge(request: web.Request) -> web.Response:
+        body = await request.read()
+        environ = _wsgi_environ(request, body)
+        loop = asyncio.get_running_loop()
+        status, headers, payload = await loop.run_in_executor(executor, _call_wsgi, wsgi_app, environ)
+        out = CIMultiDict((k, v) for k, v in headers if k.lower() not in _SKIP_RESPONSE_HEADERS)
+        return web.Response(status=status, headers=out, body=payload)
+
+    async def handle_stream(request: web.Request) -> web.StreamResponse:
+        error = check_auth(request.headers.get('Authorization', ''))
+        if error:
+            return web.json_response({'status': 'error', 'message': error}, status=401)
+        try:
+            topics, interval = parse_subscription_args(request.query)
+            sub = stream_hub.subscribe(topics, interval)
+        except ValueError as e:
+            return web.json_response({'status': 'error', 'message': str(e)}, status=400)
+        except OverflowError as e:
+            return web.json_response({'status': 'error', 'message': str(e)}, status=503)
+
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        try:
+            await response.prepare(request)
+            await response.write(b'retry: 3000\n\n')
+            idle = 0.0
+            while True:
+                frame = sub.drain()
+                if frame:
+                    await response.write(format_frame(frame).encode())
+                    idle = 0.0
+                elif idle >= KEEPALIVE_SECONDS:
+                    await response.write(b': keepalive\n\n')
+                    idle = 0.0
+                await asyncio.sleep(sub.interval)
+                idle += sub.interval
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            stream_hub.unsubscribe(sub)
+        return response
+
+    async def handle_getfile(request: web.Request) -> web.StreamResponse:
+        error = check_auth(request.headers.get('Authorization', ''))
+        if error:
+            return web.json_response({'status': 'error', 'message': error}, status=401)
+        path, failure, status = resolve_path(request.query.get('path', ''))
+        if failure:
+            return web.json_response(failure, status=status)
+        return _file_response(path)
+
+    async def handle_download(request: web.Request) -> web.StreamResponse:
+        error = check_auth(request.headers.get('Authorization', ''))
+        if error:
+            return web.json_response({'status': 'error', 'message': error}, status=401)
+        path, failure, status = resolve_screenshot(request.match_info['filename'])
+        if failure:
+            return web.json_response(failure, status=status)
+        return _file_response(path)
+
+    async def shutdown_executor(_app):
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    app.router.add_post('/command', handle_command)
+    if stream_hub is not None:
+        app.router.add_get('/stream', handle_stream)
+    if resolve_path is not None:
+        app.router.add_get('/getfile', handle_getfile, allow_head=True)
+    if resolve_screenshot is not None:
+        app.router.add_get('/download/{filename}', handle_download, allow_head=True)
+    app.router.add_route('*', '/{tail:.*}', bridge)
+
+    @web.middleware
+    async def record_metrics(request: web.Request, handler):
+        # Bridged requests run Flask's own before/teardown hooks; count them once
+        if request.match_info.handler is bridge:
+            return await handler(request)
+        metrics.HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            metrics.HTTP_IN_FLIGHT.dec()
+            resource = request.match_info.route.resource
+            route = metrics.route_label(resource.canonical) if resource else 'unmatched'
+            metrics.HTTP_LATENCY.observe(time.perf_counter() - started, route)
+
+    app.middlewares.append(record_metrics)
+    app.on_cleanup.append(shutdown_executor)
+    return app
+
+
+def serve(wsgi_app, dispatch: Dispatch, check_auth: CheckAuth, host: str = '127.0.0.1',
+          port: int = 5000, max_workers: int = 16, stream_hub: Optional[StreamHub] = None,
+          resolve_path: Optional[ResolvePath] = None, resolve_screenshot: Optional[ResolvePath] = None,
+          sock: Optional[socket.socket] = None) -> None:
+    """Run the async server until interrupted (on ``sock`` instead of host:port when given)."""
+    app = create_app(wsgi_app, dispatch, check_auth, max_workers=max_workers, stream_hub=stream_hub,
+                     resolve_path=resolve_path, resolve_screenshot=resolve_screenshot)
+    if sock is not None:
+        logger.info('Serving aiohttp on %s with %d handler workers', sock.getsockname(), max_workers)
+        web.run_app(app, sock=sock, print=None, access_log=None)
+        return
+    logger.info('Serving aiohttp on %s:%s with %d handler workers', host, port, max_workers)
+    web.run_app(app, host=host, port=port, print=None, access_log=None)
@@ -2,20 +2,232 @@
 
 Provides battery level, charging status and time remaining.
 Original file had excessive indentation causing readability issues; corrected here.
+
+On Linux a BatterySampler reads /sys/class/power_supply directly into a
+compact ring buffer; time-to-empty / time-to-full come from the charge or
+discharge rate fitted over that history instead of psutil's often-unknown
+secsleft.
 """
 
+import os
+import math
+import time
 import psutil
 import logging
+import threading
+from collections import deque
+
+from handlers.telemetry import PeriodicSampler
 
 logger = logging.getLogger(__name__)
 
+POWER_SUPPLY_ROOT = '/sys/class/power_supply'
+# Sample status codes (kept as small ints in the ring buffer)
+STATUSES = ('Unknown', 'Charging', 'Discharging', 'Not charging', 'Full')
+
+
+def _read(path, name):
+    try:
+        with open(os.path.join(path, name)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _number(path, name):
+    value = _read(path, name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def read_power_supply(root=POWER_SUPPLY_ROOT):
+    """Aggregate all system batteries under ``root``; None when there is none.
+
+    Energy is in Wh and power in W. Batteries that only report charge_* (µAh)
+    and current_now (µA) are converted with voltage_now (µV).
+    """
+    try:
+        names = sorted(os.listdir(root))
+    except OSError:
+        return None
+    batteries, plugged = [], None
+    for name in names:
+        path = os.path.join(root, name)
+        kind = _read(path, 'type')
+        if kind == 'Mains':
+            plugged = bool(plugged) or _read(path, 'online') == '1'
+        elif kind == 'Battery' and _read(path, 'scope') != 'Device':  # skip mice, headsets...
+            batteries.append(path)
+    if not batteries:
+        return None
+
+    energy_now = energy_full = power = 0.0
+    has_energy, has_power, percents, statuses = True, True, [], []
+    for path in batteries:
+        volts = (_number(path, 'voltage_now') or 0) / 1e6
+        now, full = _number(path, 'energy_now'), _number(path, 'energy_full')
+        if now is None or full is None:
+            charge_now, charge_full = _number(path, 'charge_now'), _number(path, 'charge_full')
+            if charge_now is not None and charge_full is not None and volts:
+                now, full = charge_now * volts, charge_full * volts
+        if now is None or not full:
+            has_energy = False
+        else:
+            energy_now += now / 1e6
+            energy_full += full / 1e6
+        watts = _number(path, 'power_now')
+        if watts is None and _number(path, 'current_now') is not None and volts:
+            watts = _number(path, 'current_now') * volts
+        if watts is None:
+            has_power = False
+        else:
+            power += abs(watts) / 1e6
+        capacity = _number(path, 'capacity')
+        if capacity is not None:
+            percents.append(capacity)
+        statuses.append(_read(path, 'status') or 'Unknown')
+
+    if has_energy and energy_full:
+        percent = energy_now * 100 / energy_full
+    elif percents:
+        percent = sum(percents) / len(percents)
+    else:
+        return None
+    # Any battery (dis)charging decides the pack's state
+    status = next((st for st in ('Discharging', 'Charging') if st in statuses), statuses[0])
+    if plugged is None:
+        plugged = status != 'Discharging'
+    return {
+        'percent': round(percent, 1),
+        'status': status if status in STATUSES else 'Unknown',
+        'plugged': plugged,
+        'energy_now': round(energy_now, 3) if has_energy else None,
+        'energy_full': round(energy_full, 3) if has_energy else None,
+        'power': round(power, 3) if has_power else None,
+        'batteries': len(batteries),
+    }
+
+
+class BatterySampler(PeriodicSampler):
+    """Ring buffer of (ts, percent, energy Wh, power W, status) read from sysfs.
+
+    ``estimate()`` fits a least-squares slope over the samples since the last
+    charging/discharging transition (at most ``window`` seconds), which smooths
+    out the 1% steps of ``capacity``.
+    """
+
+    name = 'battery-sampler'
+
+    def __init__(self, interval=30.0, history_hours=24, root=POWER_SUPPLY_ROOT, window=900, clock=time.time):
+        super().__init__(interval)
+        self.root = root
+        self.window = max(60.0, float(window))
+        self._samples = deque(maxlen=max(2, math.ceil(history_hours * 3600 / self.interval)))
+        self._latest = None
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def tick(self):
+        reading = read_power_supply(self.root)
+        with self._lock:
+            self._latest = reading
+            if reading is not None:
+                self._samples.append((self._clock(), reading['percent'], reading['energy_now'],
+                                      reading['power'], STATUSES.index(reading['status'])))
+        return reading
+
+    def latest(self):
+        """Newest sysfs reading, taking one inline on first use; None without a battery."""
+        with self._lock:
+            if self._samples:
+                return self._latest
+        return self.tick()
+
+    @property
+    def available(self):
+        return self.latest() is not None
+
+    def _run_since_transition(self):
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return []
+        state = samples[-1][4]
+        run = []
+        for sample in reversed(samples):
+            if sample[4] != state or samples[-1][0] - sample[0] > self.window:
+                break
+            run.append(sample)
+        run.reverse()
+        return run
+
+    def estimate(self):
+        """{'rate_pct_h', 'rate_w', 'time_to_empty', 'time_to_full', 'span'}; None values when unknown."""
+        run = self._run_since_transition()
+        result = {'rate_pct_h': None, 'rate_w': None, 'time_to_empty': None, 'time_to_full': None,
+                  'span': round(run[-1][0] - run[0][0]) if run else 0}
+        if len(run) < 3 or result['span'] < 60:
+            return result
+
+        pct_per_s = _slope([(s[0], s[1]) for s in run])
+        result['rate_pct_h'] = round(pct_per_s * 3600, 2)
+        if all(s[2] is not None for s in run):
+            result['rate_w'] = round(_slope([(s[0], s[2]) for s in run]) * 3600, 2)
+
+        percent, status = run[-1][1], STATUSES[run[-1][4]]
+        if status == 'Discharging' and pct_per_s < 0:
+            result['time_to_empty'] = int(percent / -pct_per_s)
+        elif status == 'Charging' and pct_per_s > 0:
+            result['time_to_full'] = int((100 - percent) / pct_per_s)
+        return result
+
+    def history(self, minutes=60, points=120):
+        """Samples from the last ``minutes``, thinned to at most ``points`` for charting."""
+        cutoff = self._clock() - max(1, float(minutes)) * 60
+        with self._lock:
+            samples = [s for s in self._samples if s[0] >= cutoff]
+        points = max(2, int(points))
+        if len(samples) > points:
+            step = len(samples) / points
+            samples = [samples[int(i * step)] for i in range(points - 1)] + [samples[-1]]
+        return [{'ts': round(ts, 1), 'percent': pct, 'energy': energy, 'power': power, 'status': STATUSES[code]}
+                for ts, pct, energy, power, code in samples]
+
+
+def _slope(points):
+    """Least-squares slope of (x, y) points."""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+
+
+def _duration(seconds):
+    return f'{seconds // 3600}h {(seconds % 3600) // 60}m'
+
 
 class BatteryHandler:
     """Handle battery status monitoring."""
 
+    def __init__(self, sampler=None):
+        # sysfs sampler (Linux); psutil.sensors_battery() is used when it finds no battery
+        self.sampler = sampler
+
+    def _sysfs(self):
+        return self.sampler.latest() if self.sampler is not None else None
+
     def get_battery_status(self):
         """Return detailed battery information (or desktop notice)."""
         try:
+            reading = self._sysfs()
+            if reading is not None:
+                return self._status_from_sysfs(reading)
+
             battery = psutil.sensors_battery()
             if battery is None:
                 return {
@@ -64,6 +276,60 @@ class BatteryHandler:
             logger.error(f"Battery status error: {e}")
             return {'status': 'error', 'message': f'Failed to get battery status: {str(e)}'}
 
+    def _status_from_sysfs(self, reading):
+        percent = int(round(reading['percent']))
+        plugged = reading['plugged']
+        charging_status = '🔌 Charging' if plugged else '🔋 On Battery'
+        estimate = self.sampler.estimate()
+
+        if estimate['time_to_empty'] is not None:
+            time_str = f"{_duration(estimate['time_to_empty'])} remaining"
+        elif estimate['time_to_full'] is not None:
+            time_str = f"{_duration(estimate['time_to_full'])} until full"
+        elif plugged:
+            time_str = 'Unlimited (Plugged in)' if reading['status'] != 'Charging' else 'Estimating…'
+        else:
+            time_str = 'Estimating…'
+
+        icon = '🔋' if percent >= 30 else ('⚠️' if percent >= 15 else '❗')
+        details = f'{icon} {percent}% - {charging_status}\n⏱️ {time_str}'
+        if reading['power']:
+            details += f"\n⚡ {reading['power']:.1f} W"
+        if estimate['rate_pct_h'] is not None:
+            details += f" ({estimate['rate_pct_h']:+.1f} %/h)"
+
+        return {
+            'status': 'success',
+            'message': f'{icon} Battery Status',
+            'has_battery': True,
+            'percent': percent,
+            'charging': plugged,
+            'charging_status': charging_status,
+            'time_remaining': time_str,
+            'battery_state': reading['status'],
+            'power_w': reading['power'],
+            'energy_wh': reading['energy_now'],
+            'estimate': estimate,
+            'source': 'sysfs',
+            'details': details
+        }
+
+    def get_battery_history(self, minutes=60, points=120):
+        """Time series for charting plus the current rate estimate."""
+        if self.sampler is None or not self.sampler.available:
+            return {'status': 'error', 'message': '🔌 No battery history (no sysfs battery)'}
+        try:
+            series = self.sampler.history(minutes, points)
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': 'minutes and points must be numbers'}
+        return {
+            'status': 'success',
+            'message': f'🔋 Battery history ({len(series)} samples)',
+            'samples': series,
+            'interval': self.sampler.interval,
+            'estimate': self.sampler.estimate()
+        }
+
     def get_battery_alert(self):
         """Return alert dict if battery low; else None."""
         try:
@@ -1,16 +1,119 @@
+"""
+Clipboard handler
+Copy/paste through pyperclip, with a bounded history ring keyed by content
+hash: the same text copied again is stored once and just moves to the front.
+Content larger than ``inline_limit`` is not returned inline; callers fetch
+it from GET /clipboard/<id> instead.
+"""
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
 import pyperclip
 
+PREVIEW_CHARS = 80
+MAX_HISTORY_PAGE = 50
+
+
+def content_id(text):
+    return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+
+
+class ClipboardHistory:
+    """Newest-last OrderedDict of id -> entry, bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries=50, max_bytes=8 << 20):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, text, source):
+        """Record ``text``; a duplicate only bumps its count and moves to the front."""
+        if not text:
+            return None
+        entry_id = content_id(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry:
+                entry['last_seen'] = now
+                entry['count'] += 1
+                entry['source'] = source
+                self._entries.move_to_end(entry_id)
+                return entry
+            size = len(text.encode('utf-8', 'surrogatepass'))
+            entry = {
+                'id': entry_id,
+                'text': text,
+                'chars': len(text),
+                'size': size,
+                'source': source,
+                'first_seen': now,
+                'last_seen': now,
+                'count': 1,
+            }
+            self._entries[entry_id] = entry
+            self._bytes += size
+            # Keep the newest entry even if it alone exceeds max_bytes
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, oldest = self._entries.popitem(last=False)
+                self._bytes -= oldest['size']
+            return entry
+
+    def get(self, entry_id):
+        with self._lock:
+            return self._entries.get(entry_id)
+
+    def page(self, offset=0, limit=10):
+        """(entries newest first, total)"""
+        with self._lock:
+            newest_first = list(reversed(self._entries.values()))
+        offset, limit = max(0, int(offset)), max(1, int(limit))
+        return newest_first[offset:offset + limit], len(newest_first)
+
+    @property
+    def total_bytes(self):
+        return self._bytes
+
+
+def _summary(entry, inline_limit):
+    text = entry['text']
+    preview = text[:PREVIEW_CHARS].replace('\n', ' ')
+    return {
+        'id': entry['id'],
+        'preview': preview + ('…' if len(text) > PREVIEW_CHARS else ''),
+        'chars': entry['chars'],
+        'size': entry['size'],
+        'count': entry['count'],
+        'source': entry['source'],
+        'last_seen': entry['last_seen'],
+        'large': entry['chars'] > inline_limit,
+    }
+
 
 class ClipboardHandler:
     """Handle clipboard operations"""
 
+    def __init__(self, history=None, inline_limit=3500):
+        self.history = history or ClipboardHistory()
+        self.inline_limit = max(1, int(inline_limit))
+
     def copy(self, text):
         """Copy text to clipboard"""
         try:
             pyperclip.copy(text)
+            entry = self.history.add(text, 'copy')
             return {
                 'status': 'success',
-                'message': '📋 Text copied to clipboard'
+                'message': '📋 Text copied to clipboard',
+                'id': entry['id'] if entry else None
             }
         except Exception as e:
             return {
@@ -19,16 +122,58 @@ class ClipboardHandler:
             }
 
     def paste(self):
-        """Get clipboard content"""
+        """Get clipboard content (inline up to ``inline_limit`` chars, else a download reference)"""
         try:
             content = pyperclip.paste()
-            return {
+            entry = self.history.add(content, 'paste')
+            result = {
                 'status': 'success',
                 'message': 'Clipboard content retrieved',
                 'content': content
             }
+            if entry and entry['chars'] > self.inline_limit:
+                result.update({
+                    'message': f"Clipboard content is large ({entry['chars']:,} chars)",
+                    'content': content[:self.inline_limit],
+                    'truncated': True,
+                    'id': entry['id'],
+                    'chars': entry['chars'],
+                    'size': entry['size'],
+                    'download': f"/clipboard/{entry['id']}"
+                })
+            elif entry:
+                result['id'] = entry['id']
+            return result
         except Exception as e:
             return {
                 'status': 'error',
                 'message': f'Failed to paste: {str(e)}'
-            }
\ No newline at end of file
+            }
+
+    def get_history(self, offset=0, limit=10):
+        """One page of the history, newest first (previews only; full text via GET /clipboard/<id>)"""
+        try:
+            entries, total = self.history.page(offset, min(int(limit), MAX_HISTORY_PAGE))
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': 'offset and limit must be integers'}
+        offset = max(0, int(offset))
+        items = [_summary(entry, self.inline_limit) for entry in entries]
+
+        details = f"📋 Clipboard history ({offset + 1}-{offset + len(items)} of {total}):\n\n" if items \
+            else "📋 Clipboard history is empty"
+        for i, item in enumerate(items, offset + 1):
+            details += f"{i}. {item['preview']}" + (f" ×{item['count']}" if item['count'] > 1 else '') + '\n'
+
+        return {
+            'status': 'success',
+            'message': f'📋 Clipboard history: {total} entries',
+            'entries': items,
+            'total': total,
+            'offset': offset,
+            'next_offset': offset + len(items) if offset + len(items) < total else None,
+            'details': details.rstrip('\n')
+        }
+
+    def get_entry(self, entry_id):
+        """Full history entry (text included) or None"""
+        return self.history.get(entry_id)
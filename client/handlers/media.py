@@ -1,13 +1,18 @@
 """
 Media player control handler
 Supports play/pause, next, previous, volume
+
+On Linux an in-process MPRIS client (handlers.mpris) is used when available;
+playerctl and media keys remain the fallback.
 """
 
 import platform
-import subprocess
 import logging
 from pynput.keyboard import Key, Controller
 
+import metrics
+from handlers.mpris import MprisClient, MprisUnavailable
+
 logger = logging.getLogger(__name__)
 keyboard = Controller()
 
@@ -15,16 +20,37 @@ keyboard = Controller()
 class MediaHandler:
     """Handle media player controls"""
 
-    def __init__(self):
+    def __init__(self, mpris=None):
         self.os_name = platform.system()
+        # None = playerctl only; server.py passes a started MprisClient
+        self.mpris = mpris
+
+    def _mpris(self):
+        return self.mpris if self.mpris is not None and self.mpris.ensure() else None
+
+    def _mpris_transport(self, method, message):
+        """Direct MPRIS method call; None means fall back to playerctl."""
+        mpris = self._mpris()
+        if mpris is None:
+            return None
+        try:
+            player = mpris.transport(method)
+            return {'status': 'success', 'message': message, 'player': player, 'backend': 'mpris'}
+        except MprisUnavailable as e:
+            logger.debug(f"MPRIS {method} failed, trying playerctl: {e}")
+            return None
 
     def play_pause(self):
         """Toggle play/pause"""
         try:
             if self.os_name == 'Linux':
+                result = self._mpris_transport('PlayPause', '⏯️ Play/Pause toggled')
+                if result:
+                    return result
+
                 # Try playerctl (most Linux media players)
                 try:
-                    result = subprocess.run(
+                    result = metrics.run(
                         ['playerctl', 'play-pause'],
                         capture_output=True,
                         timeout=5
@@ -41,14 +67,14 @@ class MediaHandler:
             elif self.os_name == 'Windows':
                 # Windows: use nircmd or media keys
                 try:
-                    subprocess.run(['nircmd.exe', 'sendkeypress', 0xB3])  # Play/Pause key
+                    metrics.run(['nircmd.exe', 'sendkeypress', 0xB3])  # Play/Pause key
                 except FileNotFoundError:
                     self._press_media_key('play_pause')
                 return {'status': 'success', 'message': '⏯️ Play/Pause toggled'}
 
             elif self.os_name == 'Darwin':
                 # macOS: AppleScript
-                subprocess.run([
+                metrics.run([
                     'osascript', '-e',
                     'tell application "Music" to playpause'
                 ])
@@ -62,8 +88,12 @@ class MediaHandler:
         """Skip to next track"""
         try:
             if self.os_name == 'Linux':
+                result = self._mpris_transport('Next', '⏭️ Next track')
+                if result:
+                    return result
+
                 try:
-                    subprocess.run(['playerctl', 'next'], check=True, timeout=5)
+                    metrics.run(['playerctl', 'next'], check=True, timeout=5)
                     return {'status': 'success', 'message': '⏭️ Next track'}
                 except FileNotFoundError:
                     self._press_media_key('next')
@@ -71,13 +101,13 @@ class MediaHandler:
 
             elif self.os_name == 'Windows':
                 try:
-                    subprocess.run(['nircmd.exe', 'sendkeypress', 0xB0])  # Next track
+                    metrics.run(['nircmd.exe', 'sendkeypress', 0xB0])  # Next track
                 except FileNotFoundError:
                     self._press_media_key('next')
                 return {'status': 'success', 'message': '⏭️ Next track'}
 
             elif self.os_name == 'Darwin':
-                subprocess.run([
+                metrics.run([
                     'osascript', '-e',
                     'tell application "Music" to next track'
                 ])
@@ -91,8 +121,12 @@ class MediaHandler:
         """Go to previous track"""
         try:
             if self.os_name == 'Linux':
+                result = self._mpris_transport('Previous', '⏮️ Previous track')
+                if result:
+                    return result
+
                 try:
-                    subprocess.run(['playerctl', 'previous'], check=True, timeout=5)
+                    metrics.run(['playerctl', 'previous'], check=True, timeout=5)
                     return {'status': 'success', 'message': '⏮️ Previous track'}
                 except FileNotFoundError:
                     self._press_media_key('previous')
@@ -100,13 +134,13 @@ class MediaHandler:
 
             elif self.os_name == 'Windows':
                 try:
-                    subprocess.run(['nircmd.exe', 'sendkeypress', 0xB1])  # Previous track
+                    metrics.run(['nircmd.exe', 'sendkeypress', 0xB1])  # Previous track
                 except FileNotFoundError:
                     self._press_media_key('previous')
                 return {'status': 'success', 'message': '⏮️ Previous track'}
 
             elif self.os_name == 'Darwin':
-                subprocess.run([
+                metrics.run([
                     'osascript', '-e',
                     'tell application "Music" to previous track'
                 ])
@@ -120,8 +154,12 @@ class MediaHandler:
         """Stop playback"""
         try:
             if self.os_name == 'Linux':
+                result = self._mpris_transport('Stop', '⏹️ Playback stopped')
+                if result:
+                    return result
+
                 try:
-                    subprocess.run(['playerctl', 'stop'], check=True, timeout=5)
+                    metrics.run(['playerctl', 'stop'], check=True, timeout=5)
                     return {'status': 'success', 'message': '⏹️ Playback stopped'}
                 except FileNotFoundError:
                     self._press_media_key('stop')
@@ -129,13 +167,13 @@ class MediaHandler:
 
             elif self.os_name == 'Windows':
                 try:
-                    subprocess.run(['nircmd.exe', 'sendkeypress', 0xB2])  # Stop
+                    metrics.run(['nircmd.exe', 'sendkeypress', 0xB2])  # Stop
                 except FileNotFoundError:
                     self._press_media_key('stop')
                 return {'status': 'success', 'message': '⏹️ Playback stopped'}
 
             elif self.os_name == 'Darwin':
-                subprocess.run([
+                metrics.run([
                     'osascript', '-e',
                     'tell application "Music" to stop'
                 ])
@@ -149,23 +187,40 @@ class MediaHandler:
         """Get currently playing track info"""
         try:
             if self.os_name == 'Linux':
+                mpris = self._mpris()
+                if mpris is not None:
+                    # Kept current by PropertiesChanged signals: no D-Bus round trip here
+                    track = mpris.now_playing()
+                    if track and track['title']:
+                        name = f"{track['artist']} - {track['title']}" if track['artist'] else track['title']
+                        return {
+                            'status': 'success',
+                            'message': '🎵 Now Playing',
+                            'track': name,
+                            'playback_status': track['playback_status'],
+                            'album': track['album'],
+                            'player': track['player'],
+                            'backend': 'mpris'
+                        }
+                    return {'status': 'success', 'message': '🎵 No track playing', 'backend': 'mpris'}
+
                 try:
                     # Get metadata from playerctl
-                    artist = subprocess.run(
+                    artist = metrics.run(
                         ['playerctl', 'metadata', 'artist'],
                         capture_output=True,
                         text=True,
                         timeout=5
                     ).stdout.strip()
 
-                    title = subprocess.run(
+                    title = metrics.run(
                         ['playerctl', 'metadata', 'title'],
                         capture_output=True,
                         text=True,
                         timeout=5
                     ).stdout.strip()
 
-                    status = subprocess.run(
+                    status = metrics.run(
                         ['playerctl', 'status'],
                         capture_output=True,
                         text=True,
@@ -197,7 +252,7 @@ class MediaHandler:
                         end if
                     end tell
                 '''
-                result = subprocess.run(
+                result = metrics.run(
                     ['osascript', '-e', script],
                     capture_output=True,
                     text=True,
@@ -0,0 +1,249 @@
+"""
+Audio mixer backends
+PulseMixer keeps one PulseAudio / PipeWire (pipewire-pulse) connection open
+through pulsectl; AmixerMixer is the fallback and runs amixer with a timeout.
+VolumeCoalescer collapses a burst of volume requests into one mixer write of
+the newest target.
+"""
+
+import re
+import time
+import shutil
+import logging
+import threading
+import subprocess
+
+import metrics
+
+try:
+    import pulsectl
+
+    HAS_PULSECTL = True
+except (ImportError, OSError):  # OSError: libpulse itself is missing
+    HAS_PULSECTL = False
+
+logger = logging.getLogger(__name__)
+
+
+class MixerError(RuntimeError):
+    """The mixer could not be read or written."""
+
+
+def _percent(level):
+    return max(0, min(100, int(round(float(level)))))
+
+
+class MixerBackend:
+    """Master volume and mute of the default output; per-app volume where supported."""
+
+    name = 'mixer'
+    supports_apps = False
+
+    def get(self):
+        """{'volume': 0-100, 'muted': bool}"""
+        raise NotImplementedError
+
+    def set_volume(self, level):
+        raise NotImplementedError
+
+    def set_mute(self, muted=None):
+        """Set mute; ``None`` toggles. Returns the new state."""
+        raise NotImplementedError
+
+    def apps(self):
+        raise MixerError(f'{self.name} has no per-application volume')
+
+    def set_app_volume(self, index, level=None, muted=None):
+        raise MixerError(f'{self.name} has no per-application volume')
+
+    def close(self):
+        pass
+
+
+class PulseMixer(MixerBackend):
+    """pulsectl over one long-lived connection (PulseAudio or PipeWire's pulse server)."""
+
+    name = 'pulse'
+    supports_apps = True
+
+    def __init__(self, client_name='kde-bot'):
+        self.client_name = client_name
+        self._pulse = None
+        self._lock = threading.Lock()  # pulsectl connections are not thread-safe
+        self._connect()
+
+    def _connect(self):
+        if self._pulse is not None:
+            self._pulse.close()
+        self._pulse = pulsectl.Pulse(self.client_name)
+
+    def _run(self, fn):
+        """Run ``fn(pulse)`` under the lock, reconnecting once if the server went away."""
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    return fn(self._pulse)
+                except pulsectl.PulseError as e:
+                    if attempt == 2:
+                        raise MixerError(str(e))
+                    logger.warning(f"PulseAudio connection lost, reconnecting: {e}")
+                    try:
+                        self._connect()
+                    except Exception as e:
+                        raise MixerError(f'reconnect failed: {e}')
+
+    @staticmethod
+    def _sink(pulse):
+        return pulse.get_sink_by_name(pulse.server_info().default_sink_name)
+
+    def get(self):
+        def read(pulse):
+            sink = self._sink(pulse)
+            return {'volume': _percent(pulse.volume_get_all_chans(sink) * 100), 'muted': bool(sink.mute)}
+        return self._run(read)
+
+    def set_volume(self, level):
+        self._run(lambda pulse: pulse.volume_set_all_chans(self._sink(pulse), _percent(level) / 100))
+
+    def set_mute(self, muted=None):
+        def mute(pulse):
+            sink = self._sink(pulse)
+            state = (not sink.mute) if muted is None else bool(muted)
+            pulse.mute(sink, state)
+            return state
+        return self._run(mute)
+
+    def apps(self):
+        def read(pulse):
+            return [{
+                'index': si.index,
+                'name': si.proplist.get('application.name') or si.name,
+                'volume': _percent(pulse.volume_get_all_chans(si) * 100),
+                'muted': bool(si.mute),
+            } for si in pulse.sink_input_list()]
+        return self._run(read)
+
+    def set_app_volume(self, index, level=None, muted=None):
+        def write(pulse):
+            try:
+                si = pulse.sink_input_info(int(index))
+            except pulsectl.PulseIndexError:
+                raise MixerError(f'No application stream #{index}')
+            if level is not None:
+                pulse.volume_set_all_chans(si, _percent(level) / 100)
+            if muted is not None:
+                pulse.mute(si, bool(muted))
+        self._run(write)
+
+    def close(self):
+        with self._lock:
+            if self._pulse is not None:
+                self._pulse.close()
+                self._pulse = None
+
+
+class AmixerMixer(MixerBackend):
+    """ALSA ``amixer`` fallback; every call is a subprocess, bounded by ``timeout``."""
+
+    name = 'amixer'
+    _STATE = re.compile(r'\[(\d+)%\](?:.*?\[(on|off)\])?')
+
+    def __init__(self, control='Master', timeout=3.0, run=metrics.run):
+        self.control = control
+        self.timeout = timeout
+        self._run = run
+
+    def _amixer(self, *args):
+        try:
+            result = self._run(['amixer', *args], capture_output=True, text=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            raise MixerError(f'amixer timed out after {self.timeout}s')
+        except FileNotFoundError:
+            raise MixerError('amixer not installed')
+        if result.returncode != 0:
+            raise MixerError((result.stderr or result.stdout or 'amixer failed').strip())
+        return result.stdout
+
+    def _parse(self, output):
+        match = self._STATE.search(output)
+        if not match:
+            raise MixerError(f'Unexpected amixer output for {self.control}')
+        return {'volume': int(match.group(1)), 'muted': match.group(2) == 'off'}
+
+    def get(self):
+        return self._parse(self._amixer('get', self.control))
+
+    def set_volume(self, level):
+        self._amixer('set', self.control, f'{_percent(level)}%')
+
+    def set_mute(self, muted=None):
+        action = 'toggle' if muted is None else ('mute' if muted else 'unmute')
+        return self._parse(self._amixer('set', self.control, action))['muted']
+
+
+def default_mixer(preference='auto', timeout=3.0):
+    """PulseMixer when pulsectl can connect, else amixer when installed, else None."""
+    if preference in ('auto', 'pulse') and HAS_PULSECTL:
+        try:
+            mixer = PulseMixer()
+            logger.info('🔊 Mixer: PulseAudio/PipeWire (persistent connection)')
+            return mixer
+        except Exception as e:
+            logger.warning(f"PulseAudio unavailable, falling back to amixer: {e}")
+    if preference in ('auto', 'amixer') and shutil.which('amixer'):
+        return AmixerMixer(timeout=timeout)
+    return None
+
+
+class VolumeCoalescer:
+    """Apply only the newest volume target of a burst.
+
+    ``submit()`` records the target; one worker sleeps ``window`` seconds to let
+    the burst settle, writes the newest value, and repeats while new targets
+    arrived meanwhile. Every caller gets the result of the write that covered
+    its request (its own value or a later one).
+    """
+
+    def __init__(self, apply, window=0.05):
+        self._apply = apply
+        self.window = max(0.0, float(window))
+        self._cond = threading.Condition()
+        self._pending = None
+        self._requested = 0  # generation of the newest submit
+        self._applied = 0    # generation covered by the last write
+        self._result = None
+        self._busy = False
+        self.writes = 0
+        self.requests = 0
+
+    def submit(self, value, timeout=5.0):
+        with self._cond:
+            self.requests += 1
+            self._requested += 1
+            generation = self._requested
+            self._pending = value
+            if not self._busy:
+                self._busy = True
+                threading.Thread(target=self._drain, name='volume-coalescer', daemon=True).start()
+            if not self._cond.wait_for(lambda: self._applied >= generation, timeout):
+                raise MixerError('Timed out waiting for the mixer')
+            return self._result
+
+    def _drain(self):
+        while True:
+            if self.window:
+                time.sleep(self.window)
+            with self._cond:
+                value, generation = self._pending, self._requested
+            try:
+                self._apply(value)
+                result = {'applied': value, 'error': None}
+            except Exception as e:
+                result = {'applied': None, 'error': str(e)}
+            with self._cond:
+                self.writes += 1
+                self._applied, self._result = generation, result
+                self._cond.notify_all()
+                if self._requested == generation:
+                    self._busy = False
+                    return
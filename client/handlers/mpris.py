@@ -0,0 +1,267 @@
+"""
+In-process MPRIS client
+One D-Bus session connection stays open; player properties are fetched once
+per player and then kept current from PropertiesChanged / NameOwnerChanged
+signals, so now-playing is a memory read and transport commands are direct
+method calls instead of playerctl spawns.
+"""
+
+import time
+import queue
+import logging
+import threading
+
+try:
+    from jeepney import DBusAddress, HeaderFields, MatchRule, MessageType, Properties, message_bus, new_method_call
+    from jeepney.io.threading import DBusRouter, Proxy, RouterClosed, open_dbus_connection
+
+    HAS_JEEPNEY = True
+except ImportError:
+    HAS_JEEPNEY = False
+
+logger = logging.getLogger(__name__)
+
+MPRIS_PREFIX = 'org.mpris.MediaPlayer2.'
+MPRIS_PATH = '/org/mpris/MediaPlayer2'
+PLAYER_IFACE = 'org.mpris.MediaPlayer2.Player'
+TRANSPORT_METHODS = ('PlayPause', 'Play', 'Pause', 'Stop', 'Next', 'Previous')
+
+
+class MprisUnavailable(RuntimeError):
+    """No session bus, no jeepney, or no player to talk to."""
+
+
+def _unwrap(value):
+    """Strip jeepney (signature, value) variant tuples, recursively."""
+    if isinstance(value, tuple) and len(value) == 2 and isinstance(value[0], str):
+        return _unwrap(value[1])
+    if isinstance(value, dict):
+        return {k: _unwrap(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_unwrap(v) for v in value]
+    return value
+
+
+class _Player:
+    def __init__(self, name, owner):
+        self.name = name
+        self.owner = owner
+        self.props = {}
+        self.updated = time.time()
+
+    def apply(self, changed):
+        self.props.update(_unwrap(changed))
+        self.updated = time.time()
+
+    def snapshot(self):
+        meta = self.props.get('Metadata') or {}
+        artist = meta.get('xesam:artist') or []
+        if isinstance(artist, str):
+            artist = [artist]
+        return {
+            'player': self.name[len(MPRIS_PREFIX):],
+            'artist': ', '.join(artist),
+            'title': meta.get('xesam:title', ''),
+            'album': meta.get('xesam:album', ''),
+            'length_us': meta.get('mpris:length'),
+            'playback_status': self.props.get('PlaybackStatus', ''),
+            'updated': self.updated,
+        }
+
+
+class MprisClient:
+    """Signal-driven cache of every MPRIS player on the session bus."""
+
+    def __init__(self, bus='SESSION', timeout=2.0, retry=30.0, keepalive=10.0):
+        self.bus = bus
+        self.timeout = timeout
+        self.retry = retry
+        self.keepalive = keepalive
+        self._conn = None
+        self._router = None
+        self._signals = None
+        self._worker = None
+        self._lost = threading.Event()  # set once a call on this connection fails at the transport level
+        self._players = {}  # well-known name -> _Player
+        self._owners = {}   # unique name (signal sender) -> well-known name
+        self._lock = threading.Lock()
+        self._last_attempt = 0.0
+        self.signals_seen = 0
+
+    @property
+    def connected(self):
+        return bool(self._router is not None and not self._lost.is_set()
+                    and self._worker and self._worker.is_alive())
+
+    def start(self):
+        """Connect, subscribe and load current players; False if MPRIS is unavailable."""
+        if self.connected:
+            return True
+        if not HAS_JEEPNEY:
+            return False
+        self._last_attempt = time.monotonic()
+        self._lost = threading.Event()
+        try:
+            self._conn = open_dbus_connection(bus=self.bus)
+            self._router = DBusRouter(self._conn)
+            self._signals = queue.Queue()
+            bus = Proxy(message_bus, self._router, timeout=self.timeout)
+            rules = [
+                MatchRule(type='signal', interface='org.freedesktop.DBus.Properties',
+                          member='PropertiesChanged', path=MPRIS_PATH),
+                MatchRule(type='signal', sender='org.freedesktop.DBus', interface='org.freedesktop.DBus',
+                          member='NameOwnerChanged'),
+            ]
+            rules[1].add_arg_condition(0, 'org.mpris.MediaPlayer2', kind='namespace')
+            for rule in rules:
+                bus.AddMatch(rule)
+                self._router.filter(rule, queue=self._signals)
+            # Subscribe before listing, so a player appearing in between is not missed
+            names = [n for n in bus.ListNames()[0] if n.startswith(MPRIS_PREFIX)]
+        except Exception as e:
+            logger.warning(f"MPRIS unavailable, using playerctl: {e}")
+            self.close()
+            return False
+
+        for name in names:
+            self._add_player(name)
+        self._worker = threading.Thread(target=self._consume, args=(self._signals, self._lost),
+                                        name='mpris-signals', daemon=True)
+        self._worker.start()
+        logger.info(f"🎵 MPRIS connected ({len(names)} player(s))")
+        return True
+
+    def ensure(self):
+        """Reconnect at most every ``retry`` seconds after the bus went away."""
+        if self.connected:
+            return True
+        if self._router is not None:
+            logger.warning("MPRIS bus connection lost, reconnecting")
+            self.close()
+            self._last_attempt = 0.0  # try right away; later failures wait ``retry``
+        if time.monotonic() - self._last_attempt < self.retry:
+            return False
+        return self.start()
+
+    def close(self):
+        router, conn = self._router, self._conn
+        self._router = self._conn = None
+        if self._signals is not None:
+            self._signals.put(None)
+        for closeable in (router, conn):
+            if closeable is None:
+                continue
+            try:
+                closeable.close()
+            except OSError as e:  # already broken when the bus died
+                logger.debug(f"MPRIS close: {e}")
+        if self._worker:
+            self._worker.join(timeout=2)
+            self._worker = None
+        with self._lock:
+            self._players.clear()
+            self._owners.clear()
+
+    def _add_player(self, name):
+        address = DBusAddress(MPRIS_PATH, bus_name=name, interface=PLAYER_IFACE)
+        try:
+            owner = self._call(message_bus.GetNameOwner(name))[0]
+            props = self._call(Properties(address).get_all())[0]
+        except Exception as e:
+            logger.debug(f"MPRIS player {name} not readable: {e}")
+            return
+        player = _Player(name, owner)
+        player.apply(props)
+        with self._lock:
+            self._players[name] = player
+            self._owners[owner] = name
+
+    def _drop_player(self, name):
+        with self._lock:
+            player = self._players.pop(name, None)
+            if player:
+                self._owners.pop(player.owner, None)
+
+    def _consume(self, signals, lost):
+        while not lost.is_set():
+            try:
+                msg = signals.get(timeout=self.keepalive)
+            except queue.Empty:
+                # A quiet bus may also be a dead one: ping it, a transport failure marks it lost
+                try:
+                    self._call(message_bus.GetId())
+                except MprisUnavailable as e:
+                    if not lost.is_set():
+                        logger.debug(f"MPRIS keepalive failed: {e}")
+                        lost.set()
+                continue
+            if msg is None:
+                return
+            self.signals_seen += 1
+            try:
+                self._handle(msg)
+            except Exception as e:
+                logger.error(f"MPRIS signal error: {e}")
+
+    def _handle(self, msg):
+        member = msg.header.fields.get(HeaderFields.member)
+        if member == 'NameOwnerChanged':
+            name, old, new = msg.body
+            if old:
+                self._drop_player(name)
+            if new:
+                self._add_player(name)
+            return
+
+        interface, changed, invalidated = msg.body
+        if interface != PLAYER_IFACE:
+            return
+        with self._lock:
+            name = self._owners.get(msg.header.fields.get(HeaderFields.sender))
+            player = self._players.get(name)
+            if player:
+                player.apply(changed)
+        if player and invalidated:
+            self._add_player(name)  # values not sent with the signal: re-read them
+
+    def _call(self, msg):
+        router, lost = self._router, self._lost
+        if not router:
+            raise MprisUnavailable('not connected')
+        try:
+            reply = router.send_and_get_reply(msg, timeout=self.timeout)
+        except (RouterClosed, OSError) as e:
+            lost.set()  # the connection is gone; ensure() reconnects
+            raise MprisUnavailable(f'D-Bus call failed: {e!r}') from e
+        except TimeoutError as e:
+            raise MprisUnavailable(f'D-Bus call failed: {e!r}') from e
+        if reply.header.message_type == MessageType.error:
+            raise MprisUnavailable(f"{reply.header.fields.get(HeaderFields.error_name)}: {reply.body}")
+        return reply.body
+
+    def players(self):
+        with self._lock:
+            return [p.snapshot() for p in self._players.values()]
+
+    def active(self):
+        """Playing player first, else the most recently updated one; None without players."""
+        with self._lock:
+            players = list(self._players.values())
+        if not players:
+            return None
+        playing = [p for p in players if p.props.get('PlaybackStatus') == 'Playing']
+        return max(playing or players, key=lambda p: p.updated)
+
+    def now_playing(self):
+        player = self.active()
+        return player.snapshot() if player else None
+
+    def transport(self, method):
+        """Call a Player method (PlayPause, Next, ...) on the active player; returns its name."""
+        if method not in TRANSPORT_METHODS:
+            raise ValueError(f'Unknown MPRIS method: {method}')
+        player = self.active()
+        if player is None:
+            raise MprisUnavailable('no MPRIS player running')
+        self._call(new_method_call(DBusAddress(MPRIS_PATH, bus_name=player.name, interface=PLAYER_IFACE), method))
+        return player.name[len(MPRIS_PREFIX):]
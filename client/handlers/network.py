@@ -1,13 +1,24 @@
 """
 Network information handler
 Shows IP addresses, WiFi info, network stats
+
+The public IP and WiFi lookups (HTTP request, nmcli/iwconfig) are cached
+probes refreshed by a background thread, so a Network request only reads
+memory and never waits on the network. Throughput rates come from a ring
+buffer of per-NIC counters filled by NetworkSampler.
 """
 
+import math
+import time
 import psutil
 import socket
 import logging
-import subprocess
+import threading
 import platform
+from collections import deque
+
+import metrics
+from handlers.telemetry import PeriodicSampler
 
 try:
     import netifaces
@@ -18,23 +29,193 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PUBLIC_IP_URL = 'https://api.ipify.org'
+
+
+class CachedProbe:
+    """Last result of an expensive lookup plus when it was taken.
+
+    ``due()`` turns true once ``refresh_ahead`` of the TTL has passed, so the
+    background refresh lands before readers ever see an expired value. A failed
+    refresh keeps the previous value and retries after ``error_ttl``.
+    """
+
+    def __init__(self, name, fn, ttl, error_ttl=30.0, refresh_ahead=0.8):
+        self.name = name
+        self.fn = fn
+        self.ttl = max(1.0, float(ttl))
+        self.error_ttl = min(self.ttl, max(1.0, float(error_ttl)))
+        self.refresh_ahead = min(1.0, max(0.1, float(refresh_ahead)))
+        self.value = None
+        self.updated = None   # time of the last successful refresh
+        self.attempted = None  # time of the last refresh attempt
+        self.error = None
+        self.refreshes = 0
+        self._lock = threading.Lock()
+
+    def due(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.attempted is None:
+                return True
+            ttl = self.error_ttl if self.error else self.ttl
+            return now - self.attempted >= ttl * self.refresh_ahead
+
+    def refresh(self):
+        try:
+            value, error = self.fn(), None
+        except Exception as e:
+            value, error = None, str(e) or type(e).__name__
+        now = time.time()
+        with self._lock:
+            self.attempted = now
+            self.refreshes += 1
+            self.error = error
+            if error is None:
+                self.value, self.updated = value, now
+            else:
+                logger.debug(f"{self.name} probe failed: {error}")
+
+    def snapshot(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            age = round(now - self.updated, 1) if self.updated else None
+            return {
+                'value': self.value,
+                'age': age,
+                'stale': age is None or age > self.ttl,
+                'error': self.error,
+            }
+
+
+class NetworkProbes(PeriodicSampler):
+    """Refresh every due probe on a daemon thread."""
+
+    name = 'network-probes'
+
+    def __init__(self, probes, interval=5.0):
+        super().__init__(interval)
+        self.probes = {probe.name: probe for probe in probes}
+
+    def tick(self):
+        now = time.time()
+        for probe in self.probes.values():
+            if probe.due(now):
+                probe.refresh()
+
+    def snapshot(self):
+        now = time.time()
+        return {name: probe.snapshot(now) for name, probe in self.probes.items()}
+
+
+# Fields kept per NIC and sample; rates are derived from deltas between samples
+_FIELDS = ('bytes_recv', 'bytes_sent', 'errin', 'errout', 'dropin', 'dropout')
+RATE_WINDOWS = (('1m', 60), ('5m', 300))
+
+
+class NetworkSampler(PeriodicSampler):
+    """Ring buffer of per-NIC counters; rates over any window up to ``history`` seconds."""
+
+    name = 'network-sampler'
+
+    def __init__(self, interval=2.0, history=300, counters=None, clock=time.monotonic):
+        super().__init__(interval)
+        # One sample more than the window needs, so a full 5-minute delta is always available
+        self._samples = deque(maxlen=math.ceil(history / self.interval) + 2)
+        self._counters = counters or (lambda: psutil.net_io_counters(pernic=True))
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def tick(self):
+        now = self._clock()
+        sample = (now, {nic: tuple(getattr(c, f) for f in _FIELDS) for nic, c in self._counters().items()})
+        with self._lock:
+            self._samples.append(sample)
+        return sample
+
+    def _pair(self, window):
+        """(oldest sample within ``window`` of the newest, newest); inline samples if the buffer is short."""
+        with self._lock:
+            count = len(self._samples)
+        if count == 0:
+            self.tick()
+        with self._lock:
+            newest = self._samples[-1]
+            if window is None:
+                return (self._samples[-2] if len(self._samples) > 1 else None), newest
+            for sample in self._samples:
+                if newest[0] - sample[0] <= window + self.interval / 2:
+                    return (sample if sample is not newest else None), newest
+        return None, newest
+
+    def rates(self, window=None):
+        """Per-NIC and total rates over ``window`` seconds (None = the last interval)."""
+        old, new = self._pair(window)
+        span = new[0] - old[0] if old else 0.0
+        per_nic = {}
+        for nic, values in new[1].items():
+            before = old[1].get(nic) if old else None
+            if before is None or span <= 0:
+                deltas = (0,) * len(_FIELDS)
+            else:
+                # Counters can reset (interface re-created); never report a negative rate
+                deltas = tuple(max(0, a - b) for a, b in zip(values, before))
+            per_nic[nic] = {
+                'rx_bps': int(deltas[0] / span) if span > 0 else 0,
+                'tx_bps': int(deltas[1] / span) if span > 0 else 0,
+                'errors_ps': round((deltas[2] + deltas[3]) / span, 3) if span > 0 else 0.0,
+                'drops_ps': round((deltas[4] + deltas[5]) / span, 3) if span > 0 else 0.0,
+            }
+        total = {key: sum(r[key] for r in per_nic.values()) for key in ('rx_bps', 'tx_bps')}
+        for key in ('errors_ps', 'drops_ps'):
+            total[key] = round(sum(r[key] for r in per_nic.values()), 3)
+        return {'span': round(span, 1), 'total': total, 'interfaces': per_nic}
+
+    def current(self):
+        """Total rx/tx over the last interval (the stream's 'network' topic)."""
+        total = self.rates()['total']
+        return {'rx_bps': total['rx_bps'], 'tx_bps': total['tx_bps']}
+
+    def age(self):
+        with self._lock:
+            return round(self._clock() - self._samples[-1][0], 2) if self._samples else None
+
 
 class NetworkHandler:
     """Handle network information"""
 
-    def __init__(self):
+    def __init__(self, public_ip_url=DEFAULT_PUBLIC_IP_URL, public_ip_ttl=300, wifi_ttl=30,
+                 probe_interval=5.0, sampler=None):
         self.os_name = platform.system()
+        # Unstarted sampler still answers (rates are 0 until it has two samples)
+        self.sampler = sampler or NetworkSampler()
+        self.public_ip_url = public_ip_url
+        self.probes = NetworkProbes([
+            CachedProbe('public_ip', self._get_public_ip, public_ip_ttl),
+            CachedProbe('wifi', self._get_wifi_info, wifi_ttl),
+        ], interval=probe_interval)
+
+    def start(self):
+        """Start the background refresh (idempotent; also done on first request)."""
+        self.probes.start()
+
+    def stop(self):
+        self.probes.stop()
 
     def get_network_info(self):
-        """Get comprehensive network information"""
+        """Get comprehensive network information (public IP / WiFi from the probe cache)"""
         try:
+            self.start()
+            probes = self.probes.snapshot()
             info = {
                 'status': 'success',
                 'message': '🌐 Network Information',
                 'hostname': socket.gethostname(),
                 'interfaces': self._get_interfaces(),
-                'wifi': self._get_wifi_info(),
-                'public_ip': self._get_public_ip()
+                'wifi': probes['wifi']['value'],
+                'public_ip': probes['public_ip']['value'],
+                'probes': {name: {k: v for k, v in snap.items() if k != 'value'}
+                           for name, snap in probes.items()}
             }
 
             # Format details
@@ -54,8 +235,13 @@ class NetworkHandler:
                 details += f"  • Signal: {info['wifi'].get('signal', 'N/A')}\n\n"
 
             # Public IP
+            public_ip = info['probes']['public_ip']
             if info['public_ip']:
-                details += f"🌍 Public IP: {info['public_ip']}\n"
+                details += f"🌍 Public IP: {info['public_ip']} (checked {public_ip['age']:.0f}s ago)\n"
+            elif public_ip['error']:
+                details += "🌍 Public IP: unavailable (offline?)\n"
+            else:
+                details += "🌍 Public IP: checking…\n"
 
             info['details'] = details
 
@@ -107,7 +293,7 @@ class NetworkHandler:
             if self.os_name == 'Linux':
                 # Try nmcli (NetworkManager)
                 try:
-                    result = subprocess.run(
+                    result = metrics.run(
                         ['nmcli', '-t', '-f', 'active,ssid,signal', 'dev', 'wifi'],
                         capture_output=True,
                         text=True,
@@ -128,7 +314,7 @@ class NetworkHandler:
 
                 # Try iwconfig
                 try:
-                    result = subprocess.run(
+                    result = metrics.run(
                         ['iwconfig'],
                         capture_output=True,
                         text=True,
@@ -145,7 +331,7 @@ class NetworkHandler:
             elif self.os_name == 'Windows':
                 # Windows: netsh
                 try:
-                    result = subprocess.run(
+                    result = metrics.run(
                         ['netsh', 'wlan', 'show', 'interfaces'],
                         capture_output=True,
                         text=True,
@@ -169,7 +355,7 @@ class NetworkHandler:
             elif self.os_name == 'Darwin':
                 # macOS
                 try:
-                    result = subprocess.run(
+                    result = metrics.run(
                         ['/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport',
                          '-I'],
                         capture_output=True,
@@ -194,30 +380,44 @@ class NetworkHandler:
         return None
 
     def _get_public_ip(self):
-        """Get public IP address"""
-        try:
-            import requests
-            response = requests.get('https://api.ipify.org', timeout=5)
-            return response.text
-        except:
-            return None
+        """Get public IP address (runs on the probe thread; errors are kept by the probe)"""
+        import requests
+        response = requests.get(self.public_ip_url, timeout=5)
+        response.raise_for_status()
+        return response.text.strip()
 
     def get_network_stats(self):
-        """Get network usage statistics"""
+        """Get network totals plus current / 1m / 5m rates from the sampler ring buffer"""
         try:
             stats = psutil.net_io_counters()
-
-            # Convert bytes to human readable
-            def bytes_to_human(n):
-                symbols = ('KB', 'MB', 'GB', 'TB')
-                prefix = {}
-                for i, s in enumerate(symbols):
-                    prefix[s] = 1 << (i + 1) * 10
-                for symbol in reversed(symbols):
-                    if n >= prefix[symbol]:
-                        value = float(n) / prefix[symbol]
-                        return f'{value:.2f} {symbol}'
-                return f'{n} B'
+            current = self.sampler.rates()
+            windows = {name: self.sampler.rates(seconds) for name, seconds in RATE_WINDOWS}
+
+            # Busiest non-loopback interface right now
+            nics = {nic: r for nic, r in current['interfaces'].items() if nic != 'lo'}
+            busiest = max(nics, key=lambda nic: nics[nic]['rx_bps'] + nics[nic]['tx_bps'], default=None)
+
+            def rate_line(label, rates):
+                total = rates['total']
+                return (f"{label}: 📥 {bytes_to_human(total['rx_bps'])}/s  "
+                        f"📤 {bytes_to_human(total['tx_bps'])}/s\n")
+
+            details = (
+                f"📤 Sent: {bytes_to_human(stats.bytes_sent)}\n"
+                f"📥 Received: {bytes_to_human(stats.bytes_recv)}\n"
+                f"📦 Packets Sent: {stats.packets_sent:,}\n"
+                f"📦 Packets Recv: {stats.packets_recv:,}\n\n"
+                + rate_line('⚡ Now', current)
+                + rate_line('🕐 1 min', windows['1m'])
+                + rate_line('🕔 5 min', windows['5m'])
+            )
+            if busiest:
+                busy = nics[busiest]
+                details += (f"🔥 Busiest: {busiest} "
+                            f"({bytes_to_human(busy['rx_bps'] + busy['tx_bps'])}/s)\n")
+            if current['total']['errors_ps'] or current['total']['drops_ps']:
+                details += (f"⚠️ Errors: {current['total']['errors_ps']}/s | "
+                            f"Drops: {current['total']['drops_ps']}/s\n")
 
             return {
                 'status': 'success',
@@ -226,12 +426,12 @@ class NetworkHandler:
                 'received': bytes_to_human(stats.bytes_recv),
                 'packets_sent': stats.packets_sent,
                 'packets_recv': stats.packets_recv,
-                'details': (
-                    f"📤 Sent: {bytes_to_human(stats.bytes_sent)}\n"
-                    f"📥 Received: {bytes_to_human(stats.bytes_recv)}\n"
-                    f"📦 Packets Sent: {stats.packets_sent:,}\n"
-                    f"📦 Packets Recv: {stats.packets_recv:,}"
-                )
+                'rates': {'current': current['total'],
+                          **{name: dict(r['total'], span=r['span']) for name, r in windows.items()}},
+                'interfaces': current['interfaces'],
+                'busiest': busiest,
+                'sample_age': self.sampler.age(),
+                'details': details.rstrip('\n')
             }
 
         except Exception as e:
@@ -239,4 +439,17 @@ class NetworkHandler:
             return {
                 'status': 'error',
                 'message': f'Failed to get network stats: {str(e)}'
-            }
\ No newline at end of file
+            }
+
+
+def bytes_to_human(n):
+    """Convert bytes to human readable"""
+    symbols = ('KB', 'MB', 'GB', 'TB')
+    prefix = {}
+    for i, s in enumerate(symbols):
+        prefix[s] = 1 << (i + 1) * 10
+    for symbol in reversed(symbols):
+        if n >= prefix[symbol]:
+            value = float(n) / prefix[symbol]
+            return f'{value:.2f} {symbol}'
+    return f'{n} B'
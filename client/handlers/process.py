@@ -3,40 +3,30 @@ Process manager handler
 List, filter, and kill processes
 """
 
+import os
+import time
 import psutil
 import logging
 
+from handlers.process_table import SORT_KEYS, ProcessTable
+
 logger = logging.getLogger(__name__)
 
+MAX_KILL_TARGETS = 200
+
 
 class ProcessHandler:
     """Handle process management"""
 
+    def __init__(self, table=None):
+        # Unstarted table still answers (samples inline on first use)
+        self.table = table or ProcessTable()
+
     def list_processes(self, limit=10, sort_by='cpu'):
-        """List top processes sorted by CPU or memory"""
+        """List top processes sorted by CPU or memory (from the background process table)"""
         try:
-            processes = []
-
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-                try:
-                    info = proc.info
-                    processes.append({
-                        'pid': info['pid'],
-                        'name': info['name'],
-                        'cpu': info['cpu_percent'] or 0,
-                        'memory': info['memory_percent'] or 0
-                    })
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    pass
-
-            # Sort processes
-            if sort_by == 'cpu':
-                processes.sort(key=lambda x: x['cpu'], reverse=True)
-            elif sort_by == 'memory':
-                processes.sort(key=lambda x: x['memory'], reverse=True)
-
-            # Get top processes
-            top_processes = processes[:limit]
+            sort_by = sort_by if sort_by in SORT_KEYS else 'cpu'
+            top_processes, total = self.table.top(limit, sort_by)
 
             # Format details
             details = f"🔝 Top {limit} Processes (by {sort_by.upper()}):\n\n"
@@ -53,7 +43,8 @@ class ProcessHandler:
                 'status': 'success',
                 'message': '💻 Process List',
                 'processes': top_processes,
-                'total': len(processes),
+                'total': total,
+                'sample_age': self.table.age(),
                 'details': details
             }
 
@@ -64,49 +55,15 @@ class ProcessHandler:
                 'message': f'Failed to list processes: {str(e)}'
             }
 
-    def search_process(self, name):
-        """Search for process by name"""
-        try:
-            matches = []
-
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-                try:
-                    if name.lower() in proc.info['name'].lower():
-                        matches.append({
-                            'pid': proc.info['pid'],
-                            'name': proc.info['name'],
-                            'cpu': proc.info['cpu_percent'] or 0,
-                            'memory': proc.info['memory_percent'] or 0
-                        })
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    pass
-
-            if not matches:
-                return {
-                    'status': 'success',
-                    'message': f'🔍 No processes found matching: {name}',
-                    'processes': []
-                }
-
-            # Format details
-            details = f"🔍 Found {len(matches)} process(es) matching '{name}':\n\n"
-
-            for proc in matches:
-                details += (
-                    f"• {proc['name']}\n"
-                    f"  PID: {proc['pid']} | "
-                    f"CPU: {proc['cpu']:.1f}% | "
-                    f"RAM: {proc['memory']:.1f}%\n\n"
-                )
-
-            return {
-                'status': 'success',
-                'message': f'🔍 Search Results for: {name}',
-                'processes': matches,
-                'count': len(matches),
-                'details': details
-            }
+    def search_process(self, pattern, mode='substring', field='any', limit=20):
+        """Search processes by name/cmdline via the process table index.
 
+        mode: substring | prefix | regex (case-insensitive); field: any | name | cmdline.
+        """
+        try:
+            matches, truncated = self.table.search(pattern, mode, field, limit)
+        except ValueError as e:
+            return {'status': 'error', 'message': f'❌ {e}'}
         except Exception as e:
             logger.error(f"Search process error: {e}")
             return {
@@ -114,6 +71,39 @@ class ProcessHandler:
                 'message': f'Failed to search processes: {str(e)}'
             }
 
+        if not matches:
+            return {
+                'status': 'success',
+                'message': f'🔍 No processes found matching: {pattern}',
+                'processes': [],
+                'count': 0,
+                'truncated': False
+            }
+
+        # Format details
+        more = '+' if truncated else ''
+        details = f"🔍 Found {len(matches)}{more} process(es) matching '{pattern}':\n\n"
+
+        for proc in matches:
+            cmdline = proc['cmdline']
+            details += (
+                f"• {proc['name']}\n"
+                f"  PID: {proc['pid']} | "
+                f"CPU: {proc['cpu']:.1f}% | "
+                f"RAM: {proc['memory']:.1f}%\n"
+                + (f"  {cmdline[:80]}{'…' if len(cmdline) > 80 else ''}\n" if cmdline else '')
+                + "\n"
+            )
+
+        return {
+            'status': 'success',
+            'message': f'🔍 Search Results for: {pattern}',
+            'processes': matches,
+            'count': len(matches),
+            'truncated': truncated,
+            'details': details
+        }
+
     def kill_process(self, pid):
         """Kill process by PID"""
         try:
@@ -154,21 +144,201 @@ class ProcessHandler:
                 'message': f'Failed to kill process: {str(e)}'
             }
 
+    def kill_many(self, pids=None, pattern=None, tree=None, mode='substring', field='name',
+                  timeout=5, dry_run=False):
+        """Kill a PID list, every process matching ``pattern`` (via the index) or a whole tree.
+
+        All targets get SIGTERM at once, then psutil.wait_procs() against a single
+        ``timeout`` deadline; survivors get SIGKILL. Reports an outcome per PID.
+        """
+        try:
+            targets, outcomes = self._kill_targets(pids, pattern, tree, mode, field)
+        except ValueError as e:
+            return {'status': 'error', 'message': f'❌ {e}'}
+        except psutil.NoSuchProcess:
+            return {'status': 'error', 'message': f'❌ Process not found (PID: {tree})'}
+        except psutil.AccessDenied:
+            return {'status': 'error', 'message': f'❌ Access denied to process tree (PID: {tree})'}
+        except Exception as e:
+            logger.error(f"Kill many error: {e}")
+            return {'status': 'error', 'message': f'Failed to kill processes: {str(e)}'}
+
+        names = {}
+        for proc in targets:
+            try:
+                names[proc.pid] = proc.name()
+            except psutil.Error:
+                names[proc.pid] = '?'
+
+        if dry_run:
+            for proc in targets:
+                outcomes[proc.pid] = 'would_kill'
+        else:
+            self._terminate_all(targets, outcomes, max(0.0, float(timeout)))
+
+        results = [{'pid': pid, 'name': names.get(pid, '?'), 'outcome': outcome}
+                   for pid, outcome in outcomes.items()]
+        counts = {}
+        for row in results:
+            counts[row['outcome']] = counts.get(row['outcome'], 0) + 1
+
+        if not results:
+            return {'status': 'error', 'message': '❌ No matching processes', 'results': [], 'counts': {}}
+
+        details = ('🧪 Dry run' if dry_run else '🔪 Kill results') + f" ({len(results)} process(es)):\n\n"
+        for row in results:
+            details += f"• {row['name']} (PID: {row['pid']}): {row['outcome']}\n"
+
+        if not dry_run:
+            logger.info(f"Bulk kill: {counts}")
+        ok = counts.get('terminated', 0) + counts.get('killed', 0) + counts.get('gone', 0)
+        failed = len(results) - ok - counts.get('would_kill', 0) - counts.get('skipped', 0)
+        return {
+            'status': 'error' if failed and not ok else 'success',
+            'message': f"{'🧪' if dry_run else '✅'} {len(results) - failed}/{len(results)} process(es) handled",
+            'results': results,
+            'counts': counts,
+            'details': details
+        }
+
+    def _kill_targets(self, pids, pattern, tree, mode, field):
+        """Resolve the selector to live Process objects; PIDs that cannot be targeted get an outcome now.
+
+        Pattern and tree selections keep the Process objects they were read from
+        (PID + create time), so a PID that exited and was reused since, or whose
+        image changed, is reported as 'gone' instead of being signalled.
+        """
+        if sum(x is not None and x != [] for x in (pids, pattern, tree)) != 1:
+            raise ValueError('give exactly one of: pids, pattern, tree')
+
+        outcomes = {}
+        lookup = pids is not None  # explicit PIDs are taken as they are now
+        candidates = []  # (pid, Process read with the selection, expected name)
+        if lookup:
+            if isinstance(pids, (int, str)):
+                pids = [pids]
+            candidates = [(int(pid), None, None) for pid in pids]
+        elif pattern is not None:
+            matches, truncated = self.table.search(pattern, mode, field, MAX_KILL_TARGETS)
+            if truncated:
+                raise ValueError(f'pattern matches more than {MAX_KILL_TARGETS} processes')
+            candidates = [(row['pid'], self.table.process(row['pid']), row['name']) for row in matches]
+        else:
+            root = psutil.Process(int(tree))
+            candidates = [(proc.pid, proc, None) for proc in [root] + root.children(recursive=True)]
+
+        if len(candidates) > MAX_KILL_TARGETS:
+            raise ValueError(f'at most {MAX_KILL_TARGETS} processes per request')
+
+        # Never signal ourselves, the process that started us or init
+        protected = {0, 1, os.getpid(), os.getppid()}
+        targets = []
+        for pid, proc, expected in candidates:
+            if pid in outcomes:
+                continue
+            if pid in protected:
+                outcomes[pid] = 'skipped'
+                continue
+            try:
+                if lookup:
+                    proc = psutil.Process(pid)
+                elif proc is None or not proc.is_running() or (expected and proc.name() != expected):
+                    outcomes[pid] = 'gone'  # exited, PID reused or exec()ed since it was selected
+                    continue
+                targets.append(proc)
+                outcomes[pid] = None
+            except psutil.NoSuchProcess:
+                outcomes[pid] = 'not_found' if lookup else 'gone'
+            except psutil.AccessDenied:
+                outcomes[pid] = 'access_denied'
+        return targets, outcomes
+
+    @staticmethod
+    def _terminate_all(targets, outcomes, timeout):
+        signalled = []
+        for proc in targets:
+            try:
+                proc.terminate()
+                signalled.append(proc)
+            except psutil.NoSuchProcess:
+                outcomes[proc.pid] = 'gone'
+            except psutil.AccessDenied:
+                outcomes[proc.pid] = 'access_denied'
+
+        gone, alive = ProcessHandler._wait(signalled, timeout)
+        for proc in gone:
+            outcomes[proc.pid] = 'terminated'
+
+        killed = []
+        for proc in alive:
+            try:
+                proc.kill()
+                killed.append(proc)
+            except psutil.NoSuchProcess:
+                outcomes[proc.pid] = 'terminated'
+            except psutil.AccessDenied:
+                outcomes[proc.pid] = 'access_denied'
+
+        gone, alive = ProcessHandler._wait(killed, 1)
+        for proc in gone:
+            outcomes[proc.pid] = 'killed'
+        for proc in alive:
+            outcomes[proc.pid] = 'survived'
+
+    @staticmethod
+    def _wait(procs, timeout):
+        """psutil.wait_procs() against one deadline, counting zombies as gone.
+
+        Orphaned children of a killed parent stay zombies until init reaps
+        them; they have exited, so waiting on them would only burn the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        gone, alive = [], list(procs)
+        while alive:
+            done, alive = psutil.wait_procs(alive, timeout=min(0.2, max(0.0, deadline - time.monotonic())))
+            gone += done
+            for proc in list(alive):
+                try:
+                    if proc.status() == psutil.STATUS_ZOMBIE:
+                        alive.remove(proc)
+                        gone.append(proc)
+                except psutil.NoSuchProcess:
+                    alive.remove(proc)
+                    gone.append(proc)
+                except psutil.AccessDenied:
+                    pass
+            if time.monotonic() >= deadline:
+                break
+        return gone, alive
+
     def get_process_info(self, pid):
         """Get detailed info about a specific process"""
         try:
             process = psutil.Process(pid)
 
+            # A fresh Process reports 0.0 CPU; use the table's primed value when we have it
+            row = self.table.get(process.pid)
+            cpu = row['cpu'] if row else process.cpu_percent(interval=0.1)
+            cmdline = self.table.cmdline(process.pid)
+            if not cmdline:
+                try:
+                    cmdline = ' '.join(process.cmdline())
+                except psutil.AccessDenied:
+                    cmdline = ''
+
             with process.oneshot():
                 info = {
                     'pid': process.pid,
                     'name': process.name(),
                     'status': process.status(),
-                    'cpu_percent': process.cpu_percent(),
+                    'cpu_percent': cpu,
                     'memory_percent': process.memory_percent(),
                     'memory_mb': process.memory_info().rss / 1024 / 1024,
                     'num_threads': process.num_threads(),
-                    'create_time': process.create_time()
+                    'create_time': process.create_time(),
+                    'cmdline': cmdline,
+                    'ppid': process.ppid(),
+                    'username': process.username()
                 }
 
             # Format details
@@ -180,6 +350,8 @@ class ProcessHandler:
                 f"🔥 CPU: {info['cpu_percent']:.1f}%\n"
                 f"💾 Memory: {info['memory_percent']:.1f}% ({info['memory_mb']:.1f} MB)\n"
                 f"🧵 Threads: {info['num_threads']}\n"
+                f"👤 User: {info['username']} | Parent: {info['ppid']}\n"
+                f"⌨️ {info['cmdline'][:300]}\n"
             )
 
             return {
@@ -194,6 +366,11 @@ class ProcessHandler:
                 'status': 'error',
                 'message': f'❌ Process not found (PID: {pid})'
             }
+        except psutil.AccessDenied:
+            return {
+                'status': 'error',
+                'message': f'❌ Access denied to process (PID: {pid})'
+            }
         except Exception as e:
             logger.error(f"Get process info error: {e}")
             return {
@@ -0,0 +1,224 @@
+"""
+Background process table
+Keeps psutil.Process objects alive between ticks so cpu_percent() measures a
+real delta (a fresh Process always reports 0.0 on its first call). Each tick
+only creates objects for new PIDs and drops vanished ones; top-k queries use
+heapq.nlargest instead of sorting the whole table.
+
+A ProcessIndex over lowercase name/cmdline is updated on the same tick, so
+searches never walk /proc.
+"""
+
+import re
+import time
+import heapq
+import bisect
+import logging
+import threading
+from operator import itemgetter
+
+import psutil
+
+from handlers.telemetry import PeriodicSampler
+
+logger = logging.getLogger(__name__)
+
+SORT_KEYS = ('cpu', 'memory')
+SEARCH_MODES = ('substring', 'prefix', 'regex')
+SEARCH_FIELDS = ('any', 'name', 'cmdline')
+MAX_PATTERN = 200
+
+
+class ProcessIndex:
+    """Name/cmdline index: sorted names for prefix lookups, lowercase strings for the rest."""
+
+    def __init__(self):
+        self._entries = {}  # pid -> (name, cmdline), both lowercase
+        self._names = []    # sorted (name, pid)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, pid, name, cmdline):
+        self.remove(pid)
+        name, cmdline = name.lower(), cmdline.lower()
+        self._entries[pid] = (name, cmdline)
+        bisect.insort(self._names, (name, pid))
+
+    def remove(self, pid):
+        entry = self._entries.pop(pid, None)
+        if entry:
+            i = bisect.bisect_left(self._names, (entry[0], pid))
+            if i < len(self._names) and self._names[i] == (entry[0], pid):
+                del self._names[i]
+
+    def name_of(self, pid):
+        entry = self._entries.get(pid)
+        return entry[0] if entry else None
+
+    def search(self, pattern, mode='substring', field='any', limit=20):
+        """Return (pids, truncated). Raises ValueError for a bad mode/field/regex."""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(SEARCH_MODES)}")
+        if field not in SEARCH_FIELDS:
+            raise ValueError(f"field must be one of: {', '.join(SEARCH_FIELDS)}")
+        if not pattern or len(pattern) > MAX_PATTERN:
+            raise ValueError(f'pattern must be 1-{MAX_PATTERN} characters')
+        limit = max(1, int(limit))
+        query = pattern.lower()
+
+        if mode == 'prefix' and field == 'name':
+            pids = []
+            i = bisect.bisect_left(self._names, (query,))
+            while i < len(self._names) and self._names[i][0].startswith(query):
+                pids.append(self._names[i][1])
+                if len(pids) > limit:
+                    break
+                i += 1
+            return pids[:limit], len(pids) > limit
+
+        if mode == 'regex':
+            try:
+                rx = re.compile(pattern, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f'Invalid regex: {e}')
+            match = rx.search
+        elif mode == 'prefix':
+            match = lambda text: text.startswith(query)
+        else:
+            match = lambda text: query in text
+
+        pids = []
+        for pid, (name, cmdline) in self._entries.items():
+            hit = ((field != 'cmdline' and match(name)) or
+                   (field != 'name' and cmdline and match(cmdline)))
+            if hit:
+                pids.append(pid)
+                if len(pids) > limit:
+                    break
+        return pids[:limit], len(pids) > limit
+
+
+class ProcessTable(PeriodicSampler):
+    """Incrementally maintained snapshot of every visible process."""
+
+    name = 'process-table'
+
+    def __init__(self, interval=3.0):
+        super().__init__(interval)
+        self._procs = {}  # pid -> psutil.Process (primed)
+        self._rows = {}   # pid -> latest row dict
+        self._cmdlines = {}  # pid -> cmdline string (read once per process)
+        self.index = ProcessIndex()
+        self._lock = threading.Lock()  # guards the published state below; held briefly
+        self._tick_lock = threading.Lock()  # one tick at a time (sampler thread vs inline _ensure)
+        self.updated = None
+        self.ticks = 0
+
+    def tick(self):
+        with self._tick_lock:
+            self._tick()
+
+    def _tick(self):
+        pids = set(psutil.pids())
+        total_mem = psutil.virtual_memory().total
+        procs = dict(self._procs)  # rebuilt privately, published under the lock
+
+        gone = [pid for pid in procs if pid not in pids]
+        for pid in gone:
+            del procs[pid]
+
+        rows = {}
+        for pid in pids:
+            proc = procs.get(pid)
+            try:
+                if proc is None:
+                    proc = procs[pid] = psutil.Process(pid)
+                    proc.cpu_percent(None)  # prime; first real value comes next tick
+                    rows[pid] = self._row(proc, 0.0, total_mem)
+                else:
+                    rows[pid] = self._row(proc, None, total_mem)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                procs.pop(pid, None)
+            except psutil.AccessDenied:
+                previous = self._rows.get(pid)
+                if previous:
+                    rows[pid] = previous
+
+        # cmdline is read once per process, outside the lock
+        new_cmdlines = {pid: self._cmdline(procs.get(pid)) for pid in rows if pid not in self._cmdlines}
+
+        with self._lock:
+            for pid in [pid for pid in self._cmdlines if pid not in rows]:
+                self.index.remove(pid)
+                del self._cmdlines[pid]
+            for pid, row in rows.items():
+                if pid in new_cmdlines:
+                    self._cmdlines[pid] = new_cmdlines[pid]
+                    self.index.add(pid, row['name'], new_cmdlines[pid])
+                elif self.index.name_of(pid) != row['name'].lower():
+                    self.index.add(pid, row['name'], self._cmdlines[pid])  # exec() changed the name
+            self._procs = procs
+            self._rows = rows
+            self.updated = time.time()
+            self.ticks += 1
+
+    @staticmethod
+    def _row(proc, cpu, total_mem):
+        with proc.oneshot():
+            name = proc.name()
+            rss = proc.memory_info().rss
+            return {
+                'pid': proc.pid,
+                'name': name,
+                'cpu': proc.cpu_percent(None) if cpu is None else cpu,
+                'memory': rss * 100.0 / total_mem if total_mem else 0.0,
+            }
+
+    @staticmethod
+    def _cmdline(proc):
+        try:
+            return ' '.join(proc.cmdline()) if proc else ''
+        except (psutil.Error, OSError):
+            return ''
+
+    def _ensure(self):
+        # Unstarted table (tests, first request before the thread ran): sample inline,
+        # once; a request racing the sampler's first tick waits for it instead
+        if self.ticks == 0:
+            with self._tick_lock:
+                if self.ticks == 0:
+                    self._tick()
+
+    def top(self, limit=10, sort_by='cpu'):
+        """(top ``limit`` rows by ``sort_by``, total process count)."""
+        self._ensure()
+        key = itemgetter(sort_by if sort_by in SORT_KEYS else 'cpu')
+        with self._lock:
+            rows = self._rows
+        return heapq.nlargest(max(0, int(limit)), rows.values(), key=key), len(rows)
+
+    def get(self, pid):
+        self._ensure()
+        with self._lock:
+            return self._rows.get(pid)
+
+    def process(self, pid):
+        """The table's psutil.Process for ``pid`` (PID + create time identity), or None."""
+        with self._lock:
+            return self._procs.get(pid)
+
+    def cmdline(self, pid):
+        with self._lock:
+            return self._cmdlines.get(pid, '')
+
+    def search(self, pattern, mode='substring', field='any', limit=20):
+        """(matching rows, truncated) from the index; see ProcessIndex.search."""
+        self._ensure()
+        with self._lock:
+            pids, truncated = self.index.search(pattern, mode, field, limit)
+            rows = [dict(self._rows[pid], cmdline=self._cmdlines.get(pid, '')) for pid in pids if pid in self._rows]
+        return rows, truncated
+
+    def age(self):
+        return round(time.time() - self.updated, 2) if self.updated else None
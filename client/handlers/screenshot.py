@@ -0,0 +1,389 @@
+"""
+Screenshot backend registry
+
+Capture tools are probed once (``shutil.which``) at startup or on refresh,
+instead of spawning ``which`` for every candidate on every screenshot. The
+backend that last succeeded for a session type (x11/wayland) is tried first;
+the rest of the fallback chain only runs when it fails. Each backend keeps
+attempt/success counts and latency for ``screenshot_backends``.
+
+In-process backends (Pillow ``ImageGrab`` on X11, or a synthetic test
+pattern for headless runs) hand back an image without spawning a tool or
+writing an intermediate PNG; ``ImageEncoding`` then downscales and encodes
+it once as PNG, JPEG or WebP.
+
+Every capture gets a 64-bit difference hash (dHash). Callers can pass a
+``skip_if`` predicate on it: when the screen has not meaningfully changed
+the capture is dropped before encoding or storing anything.
+"""
+
+import io
+import os
+import time
+import shutil
+import logging
+import threading
+import subprocess
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw, features
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Black or failed captures are often just a PNG header
+MIN_CAPTURE_BYTES = 2000
+
+
+class ImageEncoding:
+    """Output format, quality and optional downscale for one capture."""
+
+    FORMATS = {'png': ('PNG', 'png'), 'jpeg': ('JPEG', 'jpg'), 'jpg': ('JPEG', 'jpg'), 'webp': ('WEBP', 'webp')}
+
+    def __init__(self, fmt: str = 'png', quality: int = 80, max_width: int = 0):
+        fmt = (fmt or 'png').lower()
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported format: {fmt} (use png, jpeg or webp)")
+        self.pil_format, self.ext = self.FORMATS[fmt]
+        self.quality = min(95, max(1, int(quality)))
+        self.max_width = max(0, int(max_width or 0))
+
+    @classmethod
+    def from_params(cls, params: Dict[str, Any], defaults: 'ImageEncoding') -> 'ImageEncoding':
+        return cls(params.get('format') or defaults.ext,
+                   params.get('quality') or defaults.quality,
+                   params.get('max_width', defaults.max_width))
+
+    @property
+    def passthrough(self) -> bool:
+        """Full-size PNG: a tool's output file can be kept as is."""
+        return self.pil_format == 'PNG' and not self.max_width
+
+    def apply(self, image: Image.Image, fp) -> Image.Image:
+        """Downscale if wider than max_width and encode to ``fp`` (path or file object)."""
+        if self.max_width and image.width > self.max_width:
+            height = max(1, round(image.height * self.max_width / image.width))
+            # reducing_gap: cheap integer pre-shrink before the filtered pass
+            image = image.resize((self.max_width, height), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        if self.pil_format == 'PNG':
+            image.save(fp, 'PNG', compress_level=3)
+        else:
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            extra = {'method': 2} if self.pil_format == 'WEBP' else {'optimize': False}
+            image.save(fp, self.pil_format, quality=self.quality, **extra)
+        return image
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a tiny grayscale copy."""
+    small = image.resize((size + 1, size), Image.Resampling.BILINEAR, reducing_gap=2.0).convert('L')
+    px = small.tobytes()
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (px[offset + col] > px[offset + col + 1])
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class Shot:
+    """Result of a successful capture (``unchanged`` ones were not stored)."""
+
+    def __init__(self, backend: str, path: str, encoding: ImageEncoding, width: int, height: int,
+                 image: Optional[Image.Image] = None, data: Optional[bytes] = None,
+                 phash: Optional[int] = None, unchanged: bool = False):
+        self.backend = backend
+        self.path = path
+        self.format = encoding.ext
+        self.width = width
+        self.height = height
+        self.image = image
+        self.data = data
+        self.hash = phash
+        self.unchanged = unchanged
+        if unchanged:
+            self.size = 0
+        else:
+            self.size = len(data) if data is not None else os.path.getsize(path)
+
+    def read(self) -> bytes:
+        """Encoded bytes; only touches the disk for unmodified tool output."""
+        if self.data is None:
+            with open(self.path, 'rb') as f:
+                self.data = f.read()
+        return self.data
+
+
+class ScreenshotBackend:
+    """One capture method plus its running success/latency statistics."""
+
+    def __init__(self, name: str, sessions: Sequence[str] = ('x11', 'wayland'),
+                 skip_desktops: Sequence[str] = ()):
+        self.name = name
+        self.sessions = tuple(sessions)
+        self.skip_desktops = tuple(skip_desktops)
+        self.available = False
+        self.attempts = 0
+        self.successes = 0
+        self.total_latency = 0.0
+        self.last_latency: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def probe(self, which: Callable[[str], Optional[str]]) -> bool:
+        """Return whether this backend can run here (called once per refresh)."""
+        raise NotImplementedError
+
+    def capture(self, path: str, env: Dict[str, str]) -> None:
+        """Write a screenshot to ``path``; raise on failure."""
+        raise NotImplementedError
+
+    def supports(self, session: str, desktop: str) -> bool:
+        if session not in self.sessions:
+            return False
+        return not any(d in desktop for d in self.skip_desktops)
+
+    def record(self, ok: bool, latency: float, error: Optional[str] = None) -> None:
+        self.attempts += 1
+        self.successes += int(ok)
+        self.total_latency += latency
+        self.last_latency = latency
+        self.last_error = None if ok else error
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'available': self.available,
+            'sessions': list(self.sessions),
+            'attempts': self.attempts,
+            'successes': self.successes,
+            'success_rate': round(self.successes / self.attempts, 3) if self.attempts else None,
+            'avg_latency_ms': round(self.total_latency * 1000 / self.attempts, 1) if self.attempts else None,
+            'last_latency_ms': round(self.last_latency * 1000, 1) if self.last_latency is not None else None,
+            'last_error': self.last_error,
+        }
+
+
+class CommandBackend(ScreenshotBackend):
+    """External capture tool; ``argv`` contains ``{path}`` where the output file goes."""
+
+    def __init__(self, name: str, argv: Sequence[str], timeout: float = 10, x11: bool = False, **kw):
+        super().__init__(name, **kw)
+        self.argv = tuple(argv)
+        self.timeout = timeout
+        self.x11 = x11
+        self.executable: Optional[str] = None
+
+    def probe(self, which):
+        self.executable = which(self.argv[0])
+        return self.executable is not None
+
+    def capture(self, path, env):
+        if self.x11 and 'DISPLAY' not in env:
+            env = {**env, 'DISPLAY': ':0'}
+        argv = [self.executable or self.argv[0]] + [a.format(path=path) for a in self.argv[1:]]
+        res = metrics.run(argv, env=env, capture_output=True, timeout=self.timeout)
+        if res.returncode != 0:
+            detail = res.stderr.decode('utf-8', 'replace').strip()[:200]
+            raise RuntimeError(f'exit {res.returncode}' + (f': {detail}' if detail else ''))
+
+
+class InProcessBackend(ScreenshotBackend):
+    """Backend that returns a PIL image directly instead of writing a file."""
+
+    def grab(self, env: Dict[str, str]) -> Image.Image:
+        raise NotImplementedError
+
+
+class PillowGrabBackend(InProcessBackend):
+    """Pillow ``ImageGrab`` over XCB: no subprocess, no intermediate PNG."""
+
+    def __init__(self):
+        super().__init__('pillow', sessions=('x11',))
+
+    def probe(self, which):
+        return features.check('xcb')
+
+    def grab(self, env):
+        from PIL import ImageGrab
+        return ImageGrab.grab(xdisplay=env.get('DISPLAY') or ':0')
+
+
+class SyntheticBackend(InProcessBackend):
+    """Deterministic test pattern for headless runs (SCREENSHOT_SOURCE=synthetic).
+
+    Bump ``frame`` to change the picture.
+    """
+
+    def __init__(self, width: int = 1920, height: int = 1080):
+        super().__init__('synthetic')
+        self.width = width
+        self.height = height
+        self.frame = 0
+
+    def probe(self, which):
+        return True
+
+    def grab(self, env):
+        image = Image.linear_gradient('L').resize((self.width, self.height)).convert('RGB')
+        draw = ImageDraw.Draw(image)
+        box = self.width // 8
+        x = (self.frame * box) % (self.width - box)
+        draw.rectangle([x, self.height // 3, x + box, self.height // 3 + box], fill=(220, 60, 60))
+        draw.text((20, 20), f'frame {self.frame}', fill=(255, 255, 255))
+        return image
+
+
+def default_backends(source: str = 'auto') -> List[ScreenshotBackend]:
+    """Backends in fallback order for SCREENSHOT_SOURCE (auto, tools or synthetic).
+
+    GNOME Wayland skips grim, which captures black there.
+    """
+    if source == 'synthetic':
+        return [SyntheticBackend()]
+    in_process: List[ScreenshotBackend] = [PillowGrabBackend()] if source == 'auto' else []
+    return in_process + [
+        CommandBackend('grim', ['grim', '{path}'], sessions=('wayland',), skip_desktops=('gnome',)),
+        CommandBackend('gnome-screenshot', ['gnome-screenshot', '-f', '{path}'], timeout=15, sessions=('wayland',)),
+        CommandBackend('spectacle', ['spectacle', '--noninteractive', '--background', '--output', '{path}'],
+                       timeout=15, sessions=('wayland',)),
+        CommandBackend('scrot', ['scrot', '-z', '{path}'], x11=True),
+        CommandBackend('maim', ['maim', '{path}'], x11=True),
+    ]
+
+
+def session_info(env: Optional[Dict[str, str]] = None) -> Tuple[str, str]:
+    """(session, desktop) with anything that is not Wayland treated as X11."""
+    env = os.environ if env is None else env
+    session = 'wayland' if env.get('XDG_SESSION_TYPE', '').lower() == 'wayland' else 'x11'
+    desktop = (env.get('XDG_CURRENT_DESKTOP') or env.get('DESKTOP_SESSION') or '').lower()
+    return session, desktop
+
+
+class ScreenshotRegistry:
+    """Ordered backends, probed up front, with a remembered favourite per session type."""
+
+    def __init__(self, backends: Optional[List[ScreenshotBackend]] = None,
+                 which: Callable[[str], Optional[str]] = shutil.which):
+        self.backends = backends if backends is not None else default_backends()
+        self.which = which
+        self.preferred: Dict[str, str] = {}
+        self.probed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def register(self, backend: ScreenshotBackend, first: bool = False) -> None:
+        with self._lock:
+            if first:
+                self.backends.insert(0, backend)
+            else:
+                self.backends.append(backend)
+        if self.probed_at is not None:
+            backend.available = self._probe_one(backend)
+
+    def _probe_one(self, backend: ScreenshotBackend) -> bool:
+        try:
+            return bool(backend.probe(self.which))
+        except Exception as e:
+            logger.warning(f"Screenshot backend {backend.name} probe failed: {e}")
+            return False
+
+    def probe(self) -> List[str]:
+        """(Re)detect available backends; returns their names in fallback order."""
+        for backend in self.backends:
+            backend.available = self._probe_one(backend)
+        self.probed_at = time.time()
+        found = [b.name for b in self.backends if b.available]
+        logger.info(f"Screenshot backends: {', '.join(found) or 'none'}")
+        return found
+
+    def candidates(self, session: str, desktop: str = '') -> List[ScreenshotBackend]:
+        if self.probed_at is None:
+            self.probe()
+        with self._lock:
+            usable = [b for b in self.backends if b.available and b.supports(session, desktop)]
+            favourite = self.preferred.get(session)
+        usable.sort(key=lambda b: b.name != favourite)  # stable: favourite first, rest keep order
+        return usable
+
+    @staticmethod
+    def _encode(backend: ScreenshotBackend, image: Image.Image, path: str, encoding: ImageEncoding,
+                phash: int) -> Shot:
+        # Encode in memory so inline callers get the bytes without reading the file back
+        buf = io.BytesIO()
+        image = encoding.apply(image, buf)
+        data = buf.getvalue()
+        with open(path, 'wb') as f:
+            f.write(data)
+        return Shot(backend.name, path, encoding, image.width, image.height, image, data, phash)
+
+    def _capture_with(self, backend: ScreenshotBackend, path: str, env: Dict[str, str],
+                      encoding: ImageEncoding, skip_if: Optional[Callable[[int], bool]]) -> Shot:
+        if isinstance(backend, InProcessBackend):
+            image = backend.grab(env)
+            if image.getbbox() is None:
+                raise RuntimeError('blank image')
+            phash = dhash(image)
+            if skip_if and skip_if(phash):
+                return Shot(backend.name, path, encoding, image.width, image.height, phash=phash, unchanged=True)
+            return self._encode(backend, image, path, encoding, phash)
+
+        raw = path if encoding.passthrough else f'{path}.capture.png'
+        keep = False
+        try:
+            backend.capture(raw, env)
+            if not (os.path.exists(raw) and os.path.getsize(raw) > MIN_CAPTURE_BYTES):
+                raise RuntimeError('output missing or blank')
+            with Image.open(raw) as image:
+                phash = dhash(image)
+                if skip_if and skip_if(phash):
+                    return Shot(backend.name, path, encoding, image.width, image.height, phash=phash, unchanged=True)
+                if encoding.passthrough:
+                    keep = True
+                    return Shot(backend.name, path, encoding, image.width, image.height, phash=phash)
+                return self._encode(backend, image, path, encoding, phash)
+        finally:
+            if not keep and os.path.exists(raw):
+                os.remove(raw)
+
+    def capture(self, path: str, env: Optional[Dict[str, str]] = None, encoding: Optional[ImageEncoding] = None,
+                skip_if: Optional[Callable[[int], bool]] = None) -> Tuple[Optional[Shot], List[str]]:
+        """Try candidates until one produces a plausible image; returns (shot or None, tried).
+
+        ``skip_if(hash)`` returning True yields an ``unchanged`` shot and nothing is written.
+        """
+        env = dict(os.environ if env is None else env)
+        encoding = encoding or ImageEncoding()
+        session, desktop = session_info(env)
+        tried = []
+        for backend in self.candidates(session, desktop):
+            tried.append(backend.name)
+            started = time.perf_counter()
+            try:
+                shot = self._capture_with(backend, path, env, encoding, skip_if)
+            except Exception as e:
+                error = 'timeout' if isinstance(e, subprocess.TimeoutExpired) else str(e)
+                backend.record(False, time.perf_counter() - started, error)
+                logger.warning(f"Screenshot backend {backend.name} failed: {error}")
+                continue
+            backend.record(True, time.perf_counter() - started)
+            with self._lock:
+                self.preferred[session] = backend.name
+            return shot, tried
+        return None, tried
+
+    def stats(self) -> Dict[str, Any]:
+        session, desktop = session_info()
+        with self._lock:
+            backends = {b.name: b.stats() for b in self.backends}
+            preferred = dict(self.preferred)
+        return {
+            'session': session,
+            'desktop': desktop or 'unknown',
+            'preferred': preferred,
+            'probed_at': self.probed_at,
+            'backends': backends,
+        }
@@ -1,14 +1,17 @@
 """
-System handler - Using SCROT ONLY for screenshots
-Simple and reliable for Arch Linux
+System handler - status, power actions and screenshots
+Screenshot tools are picked by the registry in handlers.screenshot
 """
 
 import platform
-import psutil
-import subprocess
 import os
 import time
 import logging
+import threading
+
+import metrics
+from handlers.screenshot import ImageEncoding, ScreenshotRegistry, default_backends, hamming, session_info
+from handlers.telemetry import TelemetrySampler
 
 logger = logging.getLogger(__name__)
 
@@ -16,28 +19,30 @@ logger = logging.getLogger(__name__)
 class SystemHandler:
     """Handle system-level operations"""
 
-    def __init__(self, config):
+    def __init__(self, config, telemetry=None, screenshots=None, on_saved=None):
         self.config = config
+        self.on_saved = on_saved  # called with the path of every stored screenshot
         self.os_name = platform.system()
+        # Unstarted sampler still answers without blocking (samples inline on demand)
+        self.telemetry = telemetry or TelemetrySampler()
+        self.screenshots = screenshots or ScreenshotRegistry(default_backends(config.get('SCREENSHOT_SOURCE', 'auto')))
+        self.screenshot_defaults = ImageEncoding(config.get('SCREENSHOT_FORMAT', 'png'),
+                                                 config.get('SCREENSHOT_QUALITY', 80),
+                                                 config.get('SCREENSHOT_MAX_WIDTH', 0))
+        self.dedupe_threshold = int(config.get('SCREENSHOT_DEDUPE_THRESHOLD', 4))
+        self._screen = None  # (dhash, first seen) of the current screen content
+        self._screen_lock = threading.Lock()
+        if self.os_name == 'Linux':
+            self.screenshots.probe()
 
         logger.info(f"System initialized: {self.os_name}")
 
     def get_status(self):
-        """Get system status information"""
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        uptime_seconds = int(time.time() - psutil.boot_time())
-
-        hours = uptime_seconds // 3600
-        minutes = (uptime_seconds % 3600) // 60
-        uptime = f"{hours}h {minutes}m"
-
+        """Get system status information from the latest telemetry sample"""
         return {
             'hostname': platform.node(),
             'os': f"{platform.system()} {platform.release()}",
-            'cpu': round(cpu_percent, 1),
-            'memory': round(memory.percent, 1),
-            'uptime': uptime
+            **self.telemetry.status()
         }
 
     # ===========================
@@ -55,7 +60,7 @@ class SystemHandler:
         try:
             if self.os_name == 'Linux':
                 # Try loginctl first (most reliable)
-                result = subprocess.run(
+                result = metrics.run(
                     ['loginctl', 'lock-session'],
                     capture_output=True,
                     timeout=5
@@ -65,15 +70,15 @@ class SystemHandler:
                     return {'status': 'success', 'message': '🔒 Screen locked'}
 
                 # Fallback to xdg-screensaver
-                subprocess.run(['xdg-screensaver', 'lock'], check=True, timeout=5)
+                metrics.run(['xdg-screensaver', 'lock'], check=True, timeout=5)
                 return {'status': 'success', 'message': '🔒 Screen locked'}
 
             elif self.os_name == 'Windows':
-                subprocess.run(['rundll32.exe', 'user32.dll,LockWorkStation'])
+                metrics.run(['rundll32.exe', 'user32.dll,LockWorkStation'])
                 return {'status': 'success', 'message': '🔒 Screen locked'}
 
             elif self.os_name == 'Darwin':
-                subprocess.run(['/System/Library/CoreServices/Menu Extras/User.menu/Contents/Resources/CGSession', '-suspend'])
+                metrics.run(['/System/Library/CoreServices/Menu Extras/User.menu/Contents/Resources/CGSession', '-suspend'])
                 return {'status': 'success', 'message': '🔒 Screen locked'}
 
         except Exception as e:
@@ -84,11 +89,11 @@ class SystemHandler:
         """Put computer to sleep"""
         try:
             if self.os_name == 'Linux':
-                subprocess.Popen(['systemctl', 'suspend'])
+                metrics.spawn(['systemctl', 'suspend'])
             elif self.os_name == 'Windows':
-                subprocess.Popen(['rundll32.exe', 'powrprof.dll,SetSuspendState', '0,1,0'])
+                metrics.spawn(['rundll32.exe', 'powrprof.dll,SetSuspendState', '0,1,0'])
             elif self.os_name == 'Darwin':
-                subprocess.Popen(['pmset', 'sleepnow'])
+                metrics.spawn(['pmset', 'sleepnow'])
 
             return {'status': 'success', 'message': '😴 Going to sleep...'}
         except Exception as e:
@@ -98,134 +103,92 @@ class SystemHandler:
         """Shutdown computer"""
         try:
             if self.os_name == 'Linux':
-                subprocess.Popen(['shutdown', '-h', '+1'])
+                metrics.spawn(['shutdown', '-h', '+1'])
             elif self.os_name == 'Windows':
-                subprocess.Popen(['shutdown', '/s', '/t', '60'])
+                metrics.spawn(['shutdown', '/s', '/t', '60'])
             elif self.os_name == 'Darwin':
-                subprocess.Popen(['sudo', 'shutdown', '-h', '+1'])
+                metrics.spawn(['sudo', 'shutdown', '-h', '+1'])
 
             return {'status': 'success', 'message': '⚠️ Shutting down in 1 minute...'}
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
 
     # ===========================
-    # SCREENSHOT - SCROT ONLY
+    # SCREENSHOT
     # ===========================
 
-    def take_screenshot(self):
-        """Take a screenshot with best-effort tool selection.
+    def take_screenshot(self, params=None, inline=False):
+        """Take a screenshot through the backend registry.
 
-        - Wayland: prefer grim (sway/Hyprland), then spectacle (KDE), then gnome-screenshot.
-        - X11: use scrot with DISPLAY fallback.
-        Notes:
-        - Black screenshots typically mean capturing under Wayland with X11 tools (scrot) or locked session.
-        - This method tries multiple tools and returns first successful capture.
+        Tools are probed once; the backend that last worked for this session type
+        (Wayland/X11) goes first and the fallback chain only runs if it fails.
+        Black screenshots typically mean capturing under Wayland with X11 tools
+        (scrot) or a locked session.
+
+        params (all optional): format png|jpeg|webp, quality 1-95, max_width px.
+        ``if_hash`` (hex dHash of a previous capture) with ``threshold`` (max differing
+        bits) returns ``unchanged`` + ``since`` instead of storing a look-alike image.
+        With ``inline`` the encoded image is returned under ``data`` (bytes).
         """
 
-        if self.os_name != 'Linux':
+        if self.os_name != 'Linux' and self.config.get('SCREENSHOT_SOURCE') != 'synthetic':
             return {'status': 'error', 'message': 'Screenshot supported on Linux only in this build'}
 
+        params = params or {}
+        try:
+            encoding = ImageEncoding.from_params(params, self.screenshot_defaults)
+            known = int(params['if_hash'], 16) if params.get('if_hash') else None
+            threshold = int(params.get('threshold', self.dedupe_threshold))
+        except (TypeError, ValueError) as e:
+            return {'status': 'error', 'message': str(e)}
+
         timestamp = int(time.time())
-        filename = f'screenshot_{timestamp}.png'
+        filename = f'screenshot_{timestamp}.{encoding.ext}'
         filepath = os.path.join(self.config['SCREENSHOT_DIR'], filename)
 
-        env = os.environ.copy()
-        session_type = env.get('XDG_SESSION_TYPE', '').lower()
-        desktop_env = (env.get('XDG_CURRENT_DESKTOP') or env.get('DESKTOP_SESSION') or '').lower()
-        logger.info(f"Screenshot session: {session_type or 'unknown'} | desktop: {desktop_env or 'unknown'}")
-
-        def _exists(cmd):
-            return subprocess.call(['which', cmd], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
-
-        def _ok(path):
-            # Some black screenshots are tiny (just header). Require minimal size.
-            return os.path.exists(path) and os.path.getsize(path) > 2000
-
         try:
-            cmds_tried = []
-
-            # Wayland-first strategies
-            if session_type == 'wayland':
-                # GNOME Wayland: grim usually produces black. Prefer gnome-screenshot if available.
-                is_gnome = 'gnome' in desktop_env
-
-                if not is_gnome and _exists('grim'):
-                    cmds_tried.append('grim')
-                    res = subprocess.run(['grim', filepath], capture_output=True, timeout=10)
-                    if res.returncode == 0 and _ok(filepath):
-                        size = os.path.getsize(filepath)
-                        return {'status': 'success', 'message': '📸 Screenshot captured (grim)', 'file': filename, 'size': size}
-                    else:
-                        logger.warning('grim captured but file invalid or black')
-
-                # GNOME or fallback: try gnome-screenshot first
-                if _exists('gnome-screenshot'):
-                    cmds_tried.append('gnome-screenshot')
-                    res = subprocess.run(['gnome-screenshot', '-f', filepath], capture_output=True, timeout=15)
-                    if res.returncode == 0 and _ok(filepath):
-                        size = os.path.getsize(filepath)
-                        return {'status': 'success', 'message': '📸 Screenshot captured (gnome-screenshot)', 'file': filename, 'size': size}
-                    else:
-                        logger.warning('gnome-screenshot returned but file invalid or black')
-
-                # KDE Wayland alternative
-                if _exists('spectacle'):
-                    cmds_tried.append('spectacle')
-                    res = subprocess.run(['spectacle', '--noninteractive', '--background', '--output', filepath], capture_output=True, timeout=15)
-                    if res.returncode == 0 and _ok(filepath):
-                        size = os.path.getsize(filepath)
-                        return {'status': 'success', 'message': '📸 Screenshot captured (spectacle)', 'file': filename, 'size': size}
-                    else:
-                        logger.warning('spectacle returned but file invalid or black')
-
-                # Fallback X11 tools (often black under Wayland, but attempt)
-                if 'DISPLAY' not in env:
-                    env['DISPLAY'] = ':0'
-                if _exists('scrot'):
-                    cmds_tried.append('scrot')
-                    res = subprocess.run(['scrot', '-z', filepath], env=env, capture_output=True, timeout=10)
-                    if res.returncode == 0 and _ok(filepath):
-                        size = os.path.getsize(filepath)
-                        return {'status': 'success', 'message': '📸 Screenshot captured (scrot via XWayland)', 'file': filename, 'size': size}
-                if _exists('maim'):
-                    cmds_tried.append('maim')
-                    res = subprocess.run(['maim', filepath], env=env, capture_output=True, timeout=10)
-                    if res.returncode == 0 and _ok(filepath):
-                        size = os.path.getsize(filepath)
-                        return {'status': 'success', 'message': '📸 Screenshot captured (maim via XWayland)', 'file': filename, 'size': size}
-
-                # Portal suggestion if all fail
-                portal_hint = 'Install gnome-screenshot (GNOME) or use xdg-desktop-portal screenshot tools.'
-                return {
-                    'status': 'error',
-                    'message': 'Failed to capture on Wayland. ' + portal_hint + '\nTried: ' + (', '.join(cmds_tried) or 'none')
-                }
-
-            # X11 path (default)
-            if 'DISPLAY' not in env:
-                env['DISPLAY'] = ':0'
-            if _exists('scrot'):
-                cmds_tried.append('scrot')
-                res = subprocess.run(['scrot', '-z', filepath], env=env, capture_output=True, timeout=10)
-                if res.returncode == 0 and _ok(filepath):
-                    size = os.path.getsize(filepath)
-                    return {'status': 'success', 'message': '📸 Screenshot captured (scrot)', 'file': filename, 'size': size}
-
-            # Secondary X11 tools
-            if _exists('maim'):
-                cmds_tried.append('maim')
-                res = subprocess.run(['maim', filepath], env=env, capture_output=True, timeout=10)
-                if res.returncode == 0 and _ok(filepath):
-                    size = os.path.getsize(filepath)
-                    return {'status': 'success', 'message': '📸 Screenshot captured (maim)', 'file': filename, 'size': size}
-
-            return {
-                'status': 'error',
-                'message': 'No working screenshot tool found. Install scrot (X11) or grim/spectacle/gnome-screenshot (Wayland).\nTried: ' + ', '.join(cmds_tried) or 'none'
-            }
-
-        except subprocess.TimeoutExpired:
-            return {'status': 'error', 'message': 'Screenshot timeout. Try again.'}
+            skip_if = (lambda h: hamming(h, known) <= threshold) if known is not None else None
+            shot, tried = self.screenshots.capture(filepath, encoding=encoding, skip_if=skip_if)
+            if shot and shot.unchanged:
+                since = self._screen_changed_at(shot.hash)
+                return {'status': 'success', 'unchanged': True, 'hash': f'{known:016x}', 'since': since,
+                        'backend': shot.backend,
+                        'message': f"🟰 No change since {time.strftime('%H:%M:%S', time.localtime(since))}"}
+            if shot:
+                result = {'status': 'success', 'message': f'📸 Screenshot captured ({shot.backend})',
+                          'file': filename, 'size': shot.size, 'backend': shot.backend,
+                          'format': shot.format, 'width': shot.width, 'height': shot.height,
+                          'hash': f'{shot.hash:016x}', 'since': self._screen_changed_at(shot.hash),
+                          'unchanged': False}
+                if inline:
+                    result['data'] = shot.read()
+                if self.on_saved:
+                    self.on_saved(filepath)
+                return result
+
+            session, _ = session_info()
+            if session == 'wayland':
+                hint = 'Failed to capture on Wayland. Install gnome-screenshot (GNOME) or use xdg-desktop-portal screenshot tools.'
+            else:
+                hint = 'No working screenshot tool found. Install scrot (X11) or grim/spectacle/gnome-screenshot (Wayland).'
+            return {'status': 'error', 'message': f"{hint}\nTried: {', '.join(tried) or 'none'}"}
+
         except Exception as e:
             logger.error(f"Screenshot error: {e}")
-            return {'status': 'error', 'message': f'Screenshot failed: {str(e)}'}
\ No newline at end of file
+            return {'status': 'error', 'message': f'Screenshot failed: {str(e)}'}
+
+    def _screen_changed_at(self, phash):
+        """When the screen last changed meaningfully (first capture with a look-alike hash)."""
+        with self._screen_lock:
+            if self._screen is None or hamming(phash, self._screen[0]) > self.dedupe_threshold:
+                self._screen = (phash, time.time())
+            return self._screen[1]
+
+    def screenshot_backends(self):
+        """Per-backend availability, success rate and latency"""
+        return {'status': 'success', 'message': 'Screenshot backends', **self.screenshots.stats()}
+
+    def refresh_screenshot_backends(self):
+        """Re-probe installed capture tools (e.g. after installing one)"""
+        found = self.screenshots.probe()
+        return {'status': 'success', 'message': f"📸 Available: {', '.join(found) or 'none'}", 'available': found}
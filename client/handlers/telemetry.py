@@ -0,0 +1,117 @@
+"""
+Background telemetry sampler
+Keeps recent CPU / memory / swap / load / uptime samples in a ring buffer
+so status requests never wait on psutil's blocking CPU interval.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicSampler:
+    """Run ``tick()`` on a daemon thread every ``interval`` seconds."""
+
+    name = 'sampler'
+
+    def __init__(self, interval=2.0):
+        self.interval = max(0.1, float(interval))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def tick(self):
+        raise NotImplementedError
+
+    def start(self):
+        """Start the background thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"{self.name} tick failed: {e}")
+            self._stop.wait(self.interval)
+
+
+class TelemetrySampler(PeriodicSampler):
+    """Sample host telemetry into a bounded ring buffer."""
+
+    name = 'telemetry-sampler'
+
+    def __init__(self, interval=2.0, history=300):
+        super().__init__(interval)
+        self._samples = deque(maxlen=max(1, int(history)))
+        self._lock = threading.Lock()
+        self._boot_time = psutil.boot_time()
+        # Prime psutil's CPU counter so the first non-blocking read is meaningful
+        psutil.cpu_percent(interval=None)
+
+    def tick(self):
+        mem = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        try:
+            load = os.getloadavg()
+        except (AttributeError, OSError):
+            load = (0.0, 0.0, 0.0)
+        now = time.time()
+        sample = {
+            'ts': now,
+            'cpu': round(psutil.cpu_percent(interval=None), 1),
+            'memory': round(mem.percent, 1),
+            'swap': round(swap.percent, 1),
+            'load': tuple(round(x, 2) for x in load),
+            'uptime_sec': int(now - self._boot_time),
+        }
+        with self._lock:
+            self._samples.append(sample)
+        return sample
+
+    def latest(self):
+        """Return the newest sample, taking one inline if the buffer is empty."""
+        with self._lock:
+            if self._samples:
+                return self._samples[-1]
+        return self.tick()
+
+    def history(self, limit=None):
+        """Return up to ``limit`` most recent samples, oldest first."""
+        with self._lock:
+            samples = list(self._samples)
+        if limit:
+            samples = samples[-int(limit):]
+        return samples
+
+    def status(self):
+        """Status dict in the shape ``/status`` has always returned, plus sample age."""
+        sample = self.latest()
+        uptime_sec = sample['uptime_sec']
+        return {
+            'cpu': sample['cpu'],
+            'memory': sample['memory'],
+            'swap': sample['swap'],
+            'load': list(sample['load']),
+            'uptime': f"{uptime_sec // 3600}h {(uptime_sec % 3600) // 60}m",
+            'sample_age': round(max(0.0, time.time() - sample['ts']), 3),
+        }
@@ -1,23 +1,54 @@
 import platform
-import subprocess
+
+import metrics
+from handlers.mixer import MixerError, VolumeCoalescer, default_mixer
+
+_BOOLS = {True: True, False: False, 1: True, 0: False, '1': True, '0': False, 'true': True, 'false': False}
+
+
+def _parse_bool(value):
+    """Strict flag parsing: real bools, 0/1 and "true"/"false"; anything else is a ValueError"""
+    key = value.strip().lower() if isinstance(value, str) else value
+    if isinstance(key, float) or key not in _BOOLS:
+        raise ValueError(value)
+    return _BOOLS[key]
 
 
 class VolumeHandler:
     """Handle volume control"""
 
-    def __init__(self):
+    def __init__(self, mixer=None, backend='auto', coalesce_window=0.05):
         self.os_name = platform.system()
+        # Linux: persistent PulseAudio/PipeWire connection, amixer as fallback
+        if mixer is None and self.os_name == 'Linux':
+            mixer = default_mixer(backend)
+        self.mixer = mixer
+        self.coalescer = VolumeCoalescer(mixer.set_volume, coalesce_window) if mixer else None
 
     def set_volume(self, level):
         """Set system volume (0-100)"""
         try:
+            level = max(0, min(100, int(level)))
+            if self.mixer is not None:
+                # Bursts of taps collapse into one write of the newest level
+                result = self.coalescer.submit(level)
+                if result['error']:
+                    raise MixerError(result['error'])
+                superseded = result['applied'] != level
+                return {
+                    'status': 'success',
+                    'message': f"🔊 Volume set to {result['applied']}%",
+                    'level': result['applied'],
+                    'superseded': superseded,
+                    'backend': self.mixer.name
+                }
             if self.os_name == 'Windows':
                 # Using nircmd (needs to be installed)
-                subprocess.run(['nircmd.exe', 'setsysvolume', str(int(level * 655.35))])
+                metrics.run(['nircmd.exe', 'setsysvolume', str(int(level * 655.35))], timeout=5)
             elif self.os_name == 'Linux':
-                subprocess.run(['amixer', 'set', 'Master', f'{level}%'])
+                raise MixerError('No mixer available (install pulsectl or alsa-utils)')
             elif self.os_name == 'Darwin':
-                subprocess.run(['osascript', '-e', f'set volume output volume {level}'])
+                metrics.run(['osascript', '-e', f'set volume output volume {level}'], timeout=5)
 
             return {
                 'status': 'success',
@@ -32,12 +63,19 @@ class VolumeHandler:
     def toggle_mute(self):
         """Toggle mute/unmute"""
         try:
+            if self.mixer is not None:
+                muted = self.mixer.set_mute(None)
+                return {
+                    'status': 'success',
+                    'message': '🔇 Muted' if muted else '🔊 Unmuted',
+                    'muted': muted
+                }
             if self.os_name == 'Windows':
-                subprocess.run(['nircmd.exe', 'mutesysvolume', '2'])
+                metrics.run(['nircmd.exe', 'mutesysvolume', '2'], timeout=5)
             elif self.os_name == 'Linux':
-                subprocess.run(['amixer', 'set', 'Master', 'toggle'])
+                raise MixerError('No mixer available (install pulsectl or alsa-utils)')
             elif self.os_name == 'Darwin':
-                subprocess.run(['osascript', '-e', 'set volume with output muted'])
+                metrics.run(['osascript', '-e', 'set volume with output muted'], timeout=5)
 
             return {
                 'status': 'success',
@@ -47,4 +85,61 @@ class VolumeHandler:
             return {
                 'status': 'error',
                 'message': f'Failed to toggle mute: {str(e)}'
-            }
\ No newline at end of file
+            }
+
+    def get_volume(self):
+        """Current master volume and mute state, plus application streams when supported"""
+        if self.mixer is None:
+            return {'status': 'error', 'message': '❌ Reading the volume is not supported here'}
+        try:
+            state = self.mixer.get()
+            apps = self.mixer.apps() if self.mixer.supports_apps else []
+        except MixerError as e:
+            return {'status': 'error', 'message': f'Failed to read volume: {str(e)}'}
+
+        details = f"{'🔇' if state['muted'] else '🔊'} Volume: {state['volume']}%"
+        details += ' (muted)\n' if state['muted'] else '\n'
+        if apps:
+            details += '\n🎛️ Applications:\n'
+            for app in apps:
+                details += (f"  #{app['index']} {app['name']}: {app['volume']}%"
+                            f"{' 🔇' if app['muted'] else ''}\n")
+        return {
+            'status': 'success',
+            'message': f"🔊 Volume: {state['volume']}%",
+            'volume': state['volume'],
+            'muted': state['muted'],
+            'apps': apps,
+            'backend': self.mixer.name,
+            'details': details.rstrip('\n')
+        }
+
+    def set_app_volume(self, index, level=None, muted=None):
+        """Volume / mute of one application stream (PulseAudio sink-input)"""
+        if self.mixer is None or not self.mixer.supports_apps:
+            return {'status': 'error', 'message': '❌ Per-application volume needs PulseAudio/PipeWire (pulsectl)'}
+        if level is None and muted is None:
+            return {'status': 'error', 'message': 'level or muted required'}
+        try:
+            index = int(index)
+            if index < 0:
+                raise ValueError(index)
+            if level is not None:
+                level = max(0, min(100, int(round(float(level)))))
+        except (TypeError, ValueError, OverflowError):
+            return {'status': 'error', 'message': '❌ index must be a stream number and level a number 0-100'}
+        try:
+            if muted is not None:
+                muted = _parse_bool(muted)
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': '❌ muted must be true or false'}
+        try:
+            self.mixer.set_app_volume(index, level, muted)
+        except MixerError as e:
+            return {'status': 'error', 'message': f'❌ {str(e)}'}
+        parts = []
+        if level is not None:
+            parts.append(f'{level}%')
+        if muted is not None:
+            parts.append('muted' if muted else 'unmuted')
+        return {'status': 'success', 'message': f"🎛️ App #{index}: {', '.join(parts)}"}
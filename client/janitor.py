@@ -0,0 +1,203 @@
+"""
+Retention for SCREENSHOT_DIR and UPLOAD_DIR
+
+Each directory gets a policy (max age, max total bytes, max file count). The
+janitor scans a directory once when it is added and afterwards keeps an
+in-memory index (path -> size, stamp) ordered oldest first: new files are
+reported through ``track()`` and reads through ``touch()``, so enforcing the
+limits pops from the front of the index instead of rescanning the disk.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from handlers.telemetry import PeriodicSampler
+
+logger = logging.getLogger(__name__)
+
+# Files still being written (upload .part, tool output before re-encoding)
+TEMP_SUFFIXES = ('.part', '.capture.png')
+
+
+class RetentionPolicy:
+    """Limits for one directory; 0 disables a limit. ``by`` is 'mtime' or 'atime' (LRU)."""
+
+    def __init__(self, max_age: float = 0, max_bytes: int = 0, max_files: int = 0, by: str = 'mtime'):
+        if by not in ('mtime', 'atime'):
+            raise ValueError(f'Unknown eviction order: {by}')
+        self.max_age = max(0.0, float(max_age))
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_files = max(0, int(max_files))
+        self.by = by
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'max_age': self.max_age, 'max_bytes': self.max_bytes, 'max_files': self.max_files, 'by': self.by}
+
+
+class _Directory:
+    def __init__(self, path: str, policy: RetentionPolicy):
+        self.path = path
+        self.policy = policy
+        self.index: 'OrderedDict[str, Tuple[int, float]]' = OrderedDict()  # oldest stamp first
+        self.total = 0
+        self.reclaimed_files = 0
+        self.reclaimed_bytes = 0
+        self.last_run: Optional[float] = None
+
+    def add(self, path: str, size: int, stamp: float) -> None:
+        old = self.index.pop(path, None)
+        if old:
+            self.total -= old[0]
+        newest = next(reversed(self.index), None)
+        self.index[path] = (size, stamp)
+        self.total += size
+        if newest is not None and self.index[newest][1] > stamp:
+            # Rare (clock step): restore stamp order
+            self.index = OrderedDict(sorted(self.index.items(), key=lambda kv: kv[1][1]))
+
+    def remove(self, path: str) -> int:
+        size, _ = self.index.pop(path, (0, 0.0))
+        self.total -= size
+        return size
+
+
+class Janitor(PeriodicSampler):
+    """Background enforcement of per-directory retention policies."""
+
+    name = 'janitor'
+
+    def __init__(self, interval: float = 300.0):
+        super().__init__(interval)
+        self._dirs: Dict[str, _Directory] = {}
+        self._lock = threading.Lock()
+
+    def add_directory(self, path: str, policy: RetentionPolicy) -> None:
+        """Register a directory and build its index with a single scan."""
+        directory = _Directory(os.path.abspath(path), policy)
+        with self._lock:
+            self._dirs[directory.path] = directory
+        self.rescan(directory.path)
+
+    def rescan(self, path: Optional[str] = None) -> None:
+        """Rebuild the index from disk (on registration or on demand)."""
+        with self._lock:
+            targets = [self._dirs[path]] if path else list(self._dirs.values())
+        for directory in targets:
+            found = []
+            try:
+                with os.scandir(directory.path) as it:
+                    for entry in it:
+                        if entry.is_file(follow_symlinks=False) and not entry.name.endswith(TEMP_SUFFIXES):
+                            st = entry.stat(follow_symlinks=False)
+                            found.append((self._stamp(st, directory.policy), entry.path, st.st_size))
+            except FileNotFoundError:
+                pass
+            found.sort()
+            with self._lock:
+                directory.index.clear()
+                directory.total = 0
+                for stamp, file_path, size in found:
+                    directory.index[file_path] = (size, stamp)
+                    directory.total += size
+
+    @staticmethod
+    def _stamp(st: os.stat_result, policy: RetentionPolicy) -> float:
+        return max(st.st_atime, st.st_mtime) if policy.by == 'atime' else st.st_mtime
+
+    def _owner(self, path: str) -> Optional[_Directory]:
+        return self._dirs.get(os.path.dirname(os.path.abspath(path)))
+
+    def track(self, path: str) -> None:
+        """Index a newly written file and enforce its directory's limits right away."""
+        directory = self._owner(path)
+        if directory is None or path.endswith(TEMP_SUFFIXES):
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self._lock:
+            directory.add(os.path.abspath(path), size, time.time())
+        self.enforce(directory.path)
+
+    def touch(self, path: str) -> None:
+        """Mark a file as just read (only affects atime/LRU policies)."""
+        directory = self._owner(path)
+        if directory is None or directory.policy.by != 'atime':
+            return
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = directory.index.get(path)
+            if entry:
+                directory.add(path, entry[0], time.time())
+
+    def enforce(self, path: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Evict oldest-first until every limit holds; returns what was reclaimed per directory."""
+        with self._lock:
+            targets = [self._dirs[path]] if path else list(self._dirs.values())
+        reclaimed = {}
+        now = time.time()
+        for directory in targets:
+            files, freed = 0, 0
+            for victim in self._victims(directory, now):
+                try:
+                    os.remove(victim)
+                except FileNotFoundError:
+                    pass  # already gone; just drop it from the index
+                except OSError as e:
+                    logger.warning(f"Janitor could not remove {victim}: {e}")
+                    continue
+                with self._lock:
+                    size = directory.remove(victim)
+                files += 1
+                freed += size
+            with self._lock:
+                directory.reclaimed_files += files
+                directory.reclaimed_bytes += freed
+                directory.last_run = now
+            if files:
+                logger.info(f"🧹 Janitor reclaimed {files} files / {freed} bytes in {directory.path}")
+            reclaimed[directory.path] = {'files': files, 'bytes': freed}
+        return reclaimed
+
+    def _victims(self, directory: _Directory, now: float) -> List[str]:
+        policy = directory.policy
+        with self._lock:
+            count, total = len(directory.index), directory.total
+            victims = []
+            for file_path, (size, stamp) in directory.index.items():
+                expired = policy.max_age and now - stamp > policy.max_age
+                too_many = policy.max_files and count > policy.max_files
+                too_big = policy.max_bytes and total > policy.max_bytes
+                if not (expired or too_many or too_big):
+                    break
+                victims.append(file_path)
+                count -= 1
+                total -= size
+        return victims
+
+    def tick(self):
+        self.enforce()
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            dirs = {
+                d.path: {
+                    'files': len(d.index),
+                    'bytes': d.total,
+                    'policy': d.policy.to_dict(),
+                    'reclaimed_files': d.reclaimed_files,
+                    'reclaimed_bytes': d.reclaimed_bytes,
+                    'last_run': d.last_run,
+                }
+                for d in self._dirs.values()
+            }
+        return {
+            'directories': dirs,
+            'reclaimed_files': sum(d['reclaimed_files'] for d in dirs.values()),
+            'reclaimed_bytes': sum(d['reclaimed_bytes'] for d in dirs.values()),
+        }
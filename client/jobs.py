@@ -0,0 +1,122 @@
+"""
+Background transfer jobs for /upload
+
+Telegram downloads run on a bounded worker pool instead of the request
+thread. Each job streams into its own ``<name>.<job id>.part`` with large
+buffers (same-name uploads never share a temp file), is renamed into place
+on success and exposes progress for ``/jobs/<id>``.
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class TransferJob:
+    """State of one URL -> file transfer."""
+
+    def __init__(self, filename: str, url: str, path: str, expected_size: Optional[int] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.filename = filename
+        self.url = url
+        self.path = path
+        self.status = 'queued'
+        self.bytes_done = 0
+        self.total = expected_size if isinstance(expected_size, int) and expected_size > 0 else None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.future: Optional[Future] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ('done', 'error')
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0.0
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'path': self.path,
+            'state': self.status,
+            'bytes_done': self.bytes_done,
+            'total': self.total,
+            'percent': round(self.bytes_done * 100 / self.total, 1) if self.total else None,
+            'speed_bps': int(self.bytes_done / elapsed) if elapsed > 0 else 0,
+            'elapsed': round(elapsed, 2),
+            'error': self.error,
+        }
+
+
+class TransferQueue:
+    """Bounded pool of download workers with an in-memory job table."""
+
+    def __init__(self, dest_dir: str, workers: int = 2, chunk_size: int = 1 << 20, keep: int = 100,
+                 on_saved: Optional[Callable[[str], None]] = None):
+        self.dest_dir = dest_dir
+        self.chunk_size = chunk_size
+        self.keep = keep
+        self.on_saved = on_saved
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='transfer')
+        self._jobs: 'OrderedDict[str, TransferJob]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, filename: str, url: str, expected_size: Optional[int] = None) -> TransferJob:
+        filename = os.path.basename(filename)
+        job = TransferJob(filename, url, os.path.join(self.dest_dir, filename), expected_size)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[TransferJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        # Forget the oldest finished jobs beyond ``keep``; running ones are never dropped
+        excess = len(self._jobs) - self.keep
+        for job_id in [j.id for j in self._jobs.values() if j.done][:max(0, excess)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: TransferJob) -> None:
+        job.status = 'running'
+        job.started = time.time()
+        part = f'{job.path}.{job.id}.part'
+        logger.info(f'📥 Downloading from Telegram: {job.filename}')
+        try:
+            with requests.get(job.url, stream=True, timeout=(10, 60)) as r:
+                r.raise_for_status()
+                length = r.headers.get('Content-Length')
+                if length and length.isdigit():
+                    job.total = int(length)
+                with open(part, 'wb', buffering=self.chunk_size) as f:
+                    for chunk in r.iter_content(self.chunk_size):
+                        f.write(chunk)
+                        job.bytes_done += len(chunk)
+            os.replace(part, job.path)
+            job.status = 'done'
+            logger.info(f'✅ Saved: {job.path}')
+            if self.on_saved:
+                self.on_saved(job.path)
+        except Exception as e:
+            job.status = 'error'
+            job.error = str(e)
+            logger.error(f'Upload error ({job.filename}): {e}')
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+        finally:
+            job.finished = time.time()
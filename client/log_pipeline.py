@@ -0,0 +1,129 @@
+"""
+Non-blocking logging pipeline
+
+Request threads only enqueue LogRecords; a QueueListener thread formats and
+writes them. Large arguments are wrapped in ``clip()`` so they are rendered
+lazily on the writer thread and truncated to LOG_FIELD_MAX characters per
+field (a megabyte clipboard never gets fully stringified). Optional
+JSON-lines output for log shippers.
+"""
+
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from typing import Any, List, Optional
+
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_field_max = 300
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['DeferredQueueHandler'] = None
+
+
+def _clip_value(value: Any, cap: int, depth: int = 0) -> Any:
+    if isinstance(value, (str, bytes)):
+        if len(value) > cap:
+            return f'{value[:cap]!s}…(+{len(value) - cap} chars)'
+        return value
+    if depth >= 3:
+        return f'<{type(value).__name__}>'
+    if isinstance(value, dict):
+        items = list(value.items())
+        clipped = {k: _clip_value(v, cap, depth + 1) for k, v in items[:50]}
+        if len(items) > 50:
+            clipped['…'] = f'+{len(items) - 50} keys'
+        return clipped
+    if isinstance(value, (list, tuple)):
+        clipped = [_clip_value(v, cap, depth + 1) for v in value[:20]]
+        if len(value) > 20:
+            clipped.append(f'…+{len(value) - 20} items')
+        return clipped
+    return value
+
+
+class Clip:
+    """Log argument that is truncated and stringified only when the record is written."""
+
+    __slots__ = ('value', 'cap')
+
+    def __init__(self, value: Any, cap: Optional[int] = None):
+        self.value = value
+        self.cap = cap or _field_max
+
+    def __str__(self) -> str:
+        text = str(_clip_value(self.value, self.cap))
+        if len(text) > self.cap:
+            text = f'{text[:self.cap]}…(+{len(text) - self.cap} chars)'
+        return text
+
+    __repr__ = __str__
+
+
+def clip(value: Any, cap: Optional[int] = None) -> Clip:
+    return Clip(value, cap)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread and never blocks."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same-process queue: no need to pre-render msg/args for pickling
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg (+ exc)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = 'INFO', field_max: int = 300, json_lines: bool = False,
+                  log_file: Optional[str] = None, queue_size: int = 10000) -> DeferredQueueHandler:
+    """Install the queue handler on the root logger and start the writer thread (idempotent)."""
+    global _field_max, _listener, _queue_handler
+    _field_max = max(16, int(field_max))
+    if _queue_handler is not None:
+        return _queue_handler
+
+    formatter = JsonLinesFormatter() if json_lines else logging.Formatter(FORMAT)
+    targets: List[logging.Handler] = [logging.StreamHandler()]
+    if log_file:
+        targets.append(logging.FileHandler(log_file, encoding='utf-8'))
+    for handler in targets:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = DeferredQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, *targets, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    root.addHandler(_queue_handler)
+    return _queue_handler
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler else 0
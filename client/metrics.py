@@ -0,0 +1,233 @@
+"""
+In-process metrics with Prometheus text exposition
+
+Minimal counters, gauges and fixed-bucket histograms (no external service or
+client library). Updates are a dict lookup and an add under a per-metric lock,
+so instrumenting the command hot path costs microseconds.
+
+Subprocess spawns are attributed to the command being dispatched on the
+current thread (``track_command``): handlers start programs through ``run()``
+and ``spawn()`` here, which count the spawn and, for ``run()``, its run time.
+"""
+
+import os
+import re
+import time
+import bisect
+import threading
+import subprocess
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def _header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f'{self.name}{_labels(self.labelnames, k)} {_num(v)}' for k, v in items]
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(tuple(labels), 0.0)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(tuple(labels))
+            return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = self._header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else _num(bound)
+                le_label = f'le="{le}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le_label)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_num(series[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Holds metrics plus callbacks that emit extra exposition lines at scrape time."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def counter(self, name, help_text, labelnames=()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def collector(self, func: Callable[[], Iterable[str]]) -> None:
+        self._collectors.append(func)
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for func in self._collectors:
+            lines.extend(func())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+COMMANDS = REGISTRY.counter('kdebot_commands_total', 'Commands dispatched by result status.', ('command', 'status'))
+COMMAND_ERRORS = REGISTRY.counter('kdebot_command_errors_total', 'Commands that returned an error or raised.', ('command',))
+COMMAND_LATENCY = REGISTRY.histogram('kdebot_command_duration_seconds', 'Command handler latency.', ('command',))
+COMMANDS_IN_FLIGHT = REGISTRY.gauge('kdebot_commands_in_flight', 'Commands currently executing.')
+HTTP_IN_FLIGHT = REGISTRY.gauge('kdebot_http_requests_in_flight', 'HTTP requests currently being served.')
+HTTP_LATENCY = REGISTRY.histogram('kdebot_http_request_duration_seconds',
+                                  'HTTP request latency by route (for /stream: connection time).', ('route',))
+SUBPROCESS_SPAWNS = REGISTRY.counter('kdebot_subprocess_spawns_total', 'Subprocesses spawned, by handler and program.',
+                                     ('handler', 'program'))
+SUBPROCESS_DURATION = REGISTRY.histogram('kdebot_subprocess_duration_seconds', 'Subprocess run time, spawn to exit.',
+                                         ('handler',))
+
+_local = threading.local()
+
+
+def current_handler() -> str:
+    return getattr(_local, 'handler', None) or 'background'
+
+
+@contextmanager
+def track_command(command: str):
+    """Time one command, count it, and attribute subprocesses spawned inside it.
+
+    The body may set ``outcome['status']`` to the result status (defaults to 'error'
+    if the body raises).
+    """
+    outcome = {'status': 'error'}
+    previous = getattr(_local, 'handler', None)
+    _local.handler = command
+    COMMANDS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    try:
+        yield outcome
+    finally:
+        COMMAND_LATENCY.observe(time.perf_counter() - started, command)
+        COMMANDS_IN_FLIGHT.dec()
+        status = outcome.get('status') or 'unknown'
+        COMMANDS.inc(command, status)
+        if status != 'success':
+            COMMAND_ERRORS.inc(command)
+        _local.handler = previous
+
+
+def route_label(rule: str) -> str:
+    """Flask '/download/<path:name>' and aiohttp '/download/{name}' -> '/download/{name}'."""
+    return re.sub(r'<(?:[^:<>]+:)?([^<>]+)>', r'{\1}', rule)
+
+
+def _program(args) -> str:
+    first = args[0] if isinstance(args, (list, tuple)) and args else str(args).split(' ', 1)[0]
+    return os.path.basename(str(first))
+
+
+def run(args, **kwargs) -> subprocess.CompletedProcess:
+    """``subprocess.run()`` that counts the spawn and its run time against the current command."""
+    handler = current_handler()
+    started = time.perf_counter()
+    spawned = True
+    try:
+        return subprocess.run(args, **kwargs)
+    except OSError:  # not installed / not executable: nothing ran
+        spawned = False
+        raise
+    finally:
+        if spawned:
+            SUBPROCESS_SPAWNS.inc(handler, _program(args))
+            SUBPROCESS_DURATION.observe(time.perf_counter() - started, handler)
+
+
+def spawn(args, **kwargs) -> subprocess.Popen:
+    """``subprocess.Popen()`` for fire-and-forget programs; only the spawn is counted."""
+    proc = subprocess.Popen(args, **kwargs)
+    SUBPROCESS_SPAWNS.inc(current_handler(), _program(args))
+    return proc
@@ -0,0 +1,114 @@
+"""
+Per-command TTL result cache for the command dispatch layer
+
+Read-only commands declare a CachePolicy (TTL, which params form the key,
+max entries, and which mutating commands invalidate them). Entries are kept
+per command in LRU order; only successful results are cached.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+class CachePolicy:
+    """Caching rules for one command."""
+
+    def __init__(self, ttl: float, key_params: Iterable[str] = (), max_entries: int = 8,
+                 invalidated_by: Iterable[str] = ()):
+        self.ttl = float(ttl)
+        self.key_params = tuple(key_params)
+        self.max_entries = max(1, int(max_entries))
+        self.invalidated_by = tuple(invalidated_by)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class ResultCache:
+    """Thread-safe TTL + LRU cache keyed by command and selected params."""
+
+    def __init__(self, policies: Dict[str, CachePolicy], clock: Callable[[], float] = time.monotonic):
+        self.policies = dict(policies)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[str, OrderedDict] = {name: OrderedDict() for name in self.policies}
+        # Bumped on invalidation so a lookup that raced a mutation does not store a stale result
+        self._generation: Dict[str, int] = {name: 0 for name in self.policies}
+        self._stats = {name: {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+                       for name in self.policies}
+        self._invalidates: Dict[str, Tuple[str, ...]] = {}
+        for name, policy in self.policies.items():
+            for mutator in policy.invalidated_by:
+                self._invalidates[mutator] = self._invalidates.get(mutator, ()) + (name,)
+
+    def _key(self, command: str, params: Dict[str, Any]) -> Tuple:
+        return tuple(_freeze(params.get(p)) for p in self.policies[command].key_params)
+
+    def call(self, command: str, params: Dict[str, Any], func: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return a cached result for ``command`` or run ``func(params)`` and cache it."""
+        policy = self.policies.get(command)
+        if policy is None:
+            result = func(params)
+            self.invalidate_for(command)
+            return result
+
+        key = self._key(command, params)
+        now = self._clock()
+        with self._lock:
+            entries = self._entries[command]
+            entry = entries.get(key)
+            if entry is not None and entry[0] > now:
+                entries.move_to_end(key)
+                self._stats[command]['hits'] += 1
+                return entry[1]
+            if entry is not None:
+                del entries[key]
+            self._stats[command]['misses'] += 1
+            generation = self._generation[command]
+
+        result = func(params)
+        if isinstance(result, dict) and result.get('status') == 'success':
+            with self._lock:
+                if self._generation[command] == generation:
+                    entries = self._entries[command]
+                    entries[key] = (self._clock() + policy.ttl, result)
+                    entries.move_to_end(key)
+                    while len(entries) > policy.max_entries:
+                        entries.popitem(last=False)
+                        self._stats[command]['evictions'] += 1
+        return result
+
+    def invalidate_for(self, mutator: str) -> None:
+        """Drop entries of every cached command that ``mutator`` affects."""
+        for name in self._invalidates.get(mutator, ()):
+            self.invalidate(name)
+
+    def invalidate(self, command: Optional[str] = None) -> None:
+        """Drop cached entries for one command, or all of them."""
+        names = [command] if command else list(self.policies)
+        with self._lock:
+            for name in names:
+                if name not in self._entries:
+                    continue
+                self._entries[name].clear()
+                self._generation[name] += 1
+                self._stats[name]['invalidations'] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-command hit/miss/eviction/invalidation counters and current size."""
+        with self._lock:
+            return {
+                name: {**counters, 'size': len(self._entries[name]), 'ttl': self.policies[name].ttl}
+                for name, counters in self._stats.items()
+            }
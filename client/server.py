@@ -1,25 +1,35 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, send_file
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 import logging
 import platform
-import psutil
 import time
 import subprocess
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 import socket
 import mimetypes
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, Optional, Tuple
 
 # Modular handlers
 from handlers.system import SystemHandler
-from handlers.clipboard import ClipboardHandler
+from handlers.clipboard import ClipboardHandler, ClipboardHistory
 from handlers.volume import VolumeHandler
-from handlers.network import NetworkHandler
-from handlers.battery import BatteryHandler
+from handlers.network import NetworkHandler, NetworkSampler
+from handlers.battery import BatteryHandler, BatterySampler
 from handlers.process import ProcessHandler
 from handlers.media import MediaHandler
+from handlers.mpris import MprisClient
+from handlers.telemetry import TelemetrySampler
+from handlers.process_table import ProcessTable
+from result_cache import CachePolicy, ResultCache
+from stream import StreamHub, parse_subscription_args, sse_events
+import metrics
+from log_pipeline import clip, dropped_records, setup_logging
+from jobs import TransferQueue
+from janitor import Janitor, RetentionPolicy
+from transport import bind_unix_socket, parse_mode
 
 # Load environment
 load_dotenv()
@@ -33,13 +43,60 @@ PORT = int(os.getenv('PORT', 5000))
 UPLOAD_DIR = os.getenv('UPLOAD_DIR', './uploads')
 SCREENSHOT_DIR = os.getenv('SCREENSHOT_DIR', './screenshots')
 ALLOWED_DOWNLOAD_DIRS = [os.path.abspath(UPLOAD_DIR), os.path.abspath(SCREENSHOT_DIR)]
+TELEMETRY_INTERVAL = float(os.getenv('TELEMETRY_INTERVAL', 2.0))
+TELEMETRY_HISTORY = int(os.getenv('TELEMETRY_HISTORY', 300))
+PROCESS_INTERVAL = float(os.getenv('PROCESS_INTERVAL', 3.0))  # process table refresh (CPU% window)
+PUBLIC_IP_URL = os.getenv('PUBLIC_IP_URL', 'https://api.ipify.org')  # must answer with the bare IP as text
+PUBLIC_IP_TTL = float(os.getenv('PUBLIC_IP_TTL', 300))
+WIFI_TTL = float(os.getenv('WIFI_TTL', 30))
+NETWORK_SAMPLE_INTERVAL = float(os.getenv('NETWORK_SAMPLE_INTERVAL', 2.0))  # per-NIC counter ring (5 min)
+POWER_SUPPLY_ROOT = os.getenv('POWER_SUPPLY_ROOT', '/sys/class/power_supply')
+BATTERY_INTERVAL = float(os.getenv('BATTERY_INTERVAL', 30))
+BATTERY_HISTORY_HOURS = float(os.getenv('BATTERY_HISTORY_HOURS', 24))
+CLIPBOARD_HISTORY = int(os.getenv('CLIPBOARD_HISTORY', 50))  # entries kept (deduplicated by content hash)
+CLIPBOARD_HISTORY_MB = float(os.getenv('CLIPBOARD_HISTORY_MB', 8))
+CLIPBOARD_INLINE_MAX = int(os.getenv('CLIPBOARD_INLINE_MAX', 3500))  # larger pastes -> GET /clipboard/<id>
+MIXER_BACKEND = os.getenv('MIXER_BACKEND', 'auto').lower()  # auto (pulsectl, amixer fallback) | pulse | amixer
+VOLUME_COALESCE_MS = float(os.getenv('VOLUME_COALESCE_MS', 50))  # volume requests within this window -> one write
+MEDIA_BACKEND = os.getenv('MEDIA_BACKEND', 'auto').lower()  # auto (MPRIS via jeepney, playerctl fallback) | playerctl
+SERVER_MODE = os.getenv('SERVER_MODE', 'flask').lower()  # 'flask' (Werkzeug dev server) or 'aiohttp'
+SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', 16))  # bounded handler pool for aiohttp mode
+UNIX_SOCKET = os.getenv('UNIX_SOCKET', '')  # listen here instead of HOST:PORT when set
+UNIX_SOCKET_MODE = os.getenv('UNIX_SOCKET_MODE', '0600')
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 8))
+BATCH_MAX = int(os.getenv('BATCH_MAX', 20))
+CACHE_ENABLED = os.getenv('CACHE_ENABLED', '1') not in ('0', 'false', 'False')
+STREAM_INTERVAL = float(os.getenv('STREAM_INTERVAL', 1.0))  # hub tick = fastest per-watcher rate
+STREAM_MAX_SUBSCRIBERS = int(os.getenv('STREAM_MAX_SUBSCRIBERS', 16))
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', 2))
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 1 << 20))
+SCREENSHOT_SOURCE = os.getenv('SCREENSHOT_SOURCE', 'auto').lower()  # auto (in-process first) | tools | synthetic
+SCREENSHOT_FORMAT = os.getenv('SCREENSHOT_FORMAT', 'png')
+SCREENSHOT_QUALITY = int(os.getenv('SCREENSHOT_QUALITY', 80))
+SCREENSHOT_MAX_WIDTH = int(os.getenv('SCREENSHOT_MAX_WIDTH', 0))  # 0 = full resolution
+SCREENSHOT_DEDUPE_THRESHOLD = int(os.getenv('SCREENSHOT_DEDUPE_THRESHOLD', 4))  # dHash bits that may differ
+# Retention (0 disables a limit); files are evicted oldest-first by JANITOR_EVICT_BY (mtime | atime)
+JANITOR_INTERVAL = float(os.getenv('JANITOR_INTERVAL', 300))
+JANITOR_EVICT_BY = os.getenv('JANITOR_EVICT_BY', 'mtime')
+SCREENSHOT_RETENTION_HOURS = float(os.getenv('SCREENSHOT_RETENTION_HOURS', 168))
+SCREENSHOT_MAX_MB = float(os.getenv('SCREENSHOT_MAX_MB', 500))
+SCREENSHOT_MAX_FILES = int(os.getenv('SCREENSHOT_MAX_FILES', 2000))
+UPLOAD_RETENTION_HOURS = float(os.getenv('UPLOAD_RETENTION_HOURS', 0))
+UPLOAD_MAX_MB = float(os.getenv('UPLOAD_MAX_MB', 0))
+UPLOAD_MAX_FILES = int(os.getenv('UPLOAD_MAX_FILES', 0))
 
 # Create directories
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(SCREENSHOT_DIR, exist_ok=True)
 
 # Logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Records are queued and written by a background thread; big fields are clipped lazily
+setup_logging(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    field_max=int(os.getenv('LOG_FIELD_MAX', 300)),
+    json_lines=os.getenv('LOG_JSON', '0') in ('1', 'true', 'True'),
+    log_file=os.getenv('LOG_FILE') or None,
+)
 logger = logging.getLogger(__name__)
 
 
@@ -47,20 +104,27 @@ logger = logging.getLogger(__name__)
 # AUTH MIDDLEWARE
 # ===========================
 
-def require_auth(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        auth_header = request.headers.get('Authorization', '')
+def check_token(auth_header: str) -> Optional[str]:
+    """Return an error message when the Authorization header is not accepted, else None."""
+    token = auth_header.replace('Bearer ', '') if auth_header.startswith('Bearer ') else auth_header
 
-        token = auth_header.replace('Bearer ', '') if auth_header.startswith('Bearer ') else auth_header
+    if not token:
+        logger.warning('❌ Missing auth token')
+        return 'Missing auth token'
 
-        if not token:
-            logger.warning('❌ Missing auth token')
-            return jsonify({'status': 'error', 'message': 'Missing auth token'}), 401
+    if token != AUTH_TOKEN:
+        logger.warning('❌ Invalid token attempt')
+        return 'Invalid auth token'
 
-        if token != AUTH_TOKEN:
-            logger.warning('❌ Invalid token attempt')
-            return jsonify({'status': 'error', 'message': 'Invalid auth token'}), 401
+    return None
+
+
+def require_auth(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        error = check_token(request.headers.get('Authorization', ''))
+        if error:
+            return jsonify({'status': 'error', 'message': error}), 401
 
         return f(*args, **kwargs)
 
@@ -80,18 +144,7 @@ def index():
 @require_auth
 def get_status():
     try:
-        cpu = psutil.cpu_percent(interval=1)
-        mem = psutil.virtual_memory()
-        uptime_sec = int(time.time() - psutil.boot_time())
-        uptime = f"{uptime_sec // 3600}h {(uptime_sec % 3600) // 60}m"
-
-        return jsonify({
-            'hostname': platform.node(),
-            'os': f"{platform.system()} {platform.release()}",
-            'cpu': round(cpu, 1),
-            'memory': round(mem.percent, 1),
-            'uptime': uptime
-        }), 200
+        return jsonify(system_handler.get_status()), 200
     except Exception as e:
         logger.error(f'Status error: {e}')
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -101,14 +154,56 @@ def get_status():
 # Command dispatch (refactored to modular handlers)
 ###############################################################################
 
+# Background telemetry keeps /status off psutil's blocking 1s CPU interval
+telemetry = TelemetrySampler(interval=TELEMETRY_INTERVAL, history=TELEMETRY_HISTORY)
+telemetry.start()
+
+# Long-lived Process objects give real CPU% deltas for process_list
+process_table = ProcessTable(interval=PROCESS_INTERVAL)
+process_table.start()
+
+# Per-NIC counters for network_stats rates and the stream's network topic
+network_sampler = NetworkSampler(interval=NETWORK_SAMPLE_INTERVAL)
+network_sampler.start()
+
+# Battery level/energy history from sysfs (time-to-empty from our own discharge rate)
+battery_sampler = BatterySampler(interval=BATTERY_INTERVAL, history_hours=BATTERY_HISTORY_HOURS,
+                                 root=POWER_SUPPLY_ROOT)
+if battery_sampler.available:
+    battery_sampler.start()
+
+# Keep SCREENSHOT_DIR bounded; new files are indexed as they are written. UPLOAD_DIR holds the
+# user's own files: it is only reported unless an UPLOAD_* limit is set
+janitor = Janitor(interval=JANITOR_INTERVAL)
+janitor.add_directory(SCREENSHOT_DIR, RetentionPolicy(SCREENSHOT_RETENTION_HOURS * 3600, SCREENSHOT_MAX_MB * 2**20,
+                                                      SCREENSHOT_MAX_FILES, by=JANITOR_EVICT_BY))
+janitor.add_directory(UPLOAD_DIR, RetentionPolicy(UPLOAD_RETENTION_HOURS * 3600, UPLOAD_MAX_MB * 2**20,
+                                                  UPLOAD_MAX_FILES, by=JANITOR_EVICT_BY))
+janitor.start()
+
 # Instantiate handlers once (reduces per-call overhead)
-system_handler = SystemHandler({'SCREENSHOT_DIR': SCREENSHOT_DIR})
-clipboard_handler = ClipboardHandler()
-volume_handler = VolumeHandler()
-network_handler = NetworkHandler()
-battery_handler = BatteryHandler()
-process_handler = ProcessHandler()
-media_handler = MediaHandler()
+system_handler = SystemHandler({
+    'SCREENSHOT_DIR': SCREENSHOT_DIR,
+    'SCREENSHOT_SOURCE': SCREENSHOT_SOURCE,
+    'SCREENSHOT_FORMAT': SCREENSHOT_FORMAT,
+    'SCREENSHOT_QUALITY': SCREENSHOT_QUALITY,
+    'SCREENSHOT_MAX_WIDTH': SCREENSHOT_MAX_WIDTH,
+    'SCREENSHOT_DEDUPE_THRESHOLD': SCREENSHOT_DEDUPE_THRESHOLD,
+}, telemetry=telemetry, on_saved=janitor.track)
+clipboard_handler = ClipboardHandler(ClipboardHistory(CLIPBOARD_HISTORY, CLIPBOARD_HISTORY_MB * 2**20),
+                                     inline_limit=CLIPBOARD_INLINE_MAX)
+volume_handler = VolumeHandler(backend=MIXER_BACKEND, coalesce_window=VOLUME_COALESCE_MS / 1000)
+network_handler = NetworkHandler(public_ip_url=PUBLIC_IP_URL, public_ip_ttl=PUBLIC_IP_TTL, wifi_ttl=WIFI_TTL,
+                                 sampler=network_sampler)
+network_handler.start()  # warm the public IP / WiFi probes before the first request
+battery_handler = BatteryHandler(sampler=battery_sampler)
+process_handler = ProcessHandler(table=process_table)
+# One long-lived D-Bus connection; player state arrives as PropertiesChanged signals
+mpris_client = None
+if MEDIA_BACKEND != 'playerctl' and platform.system() == 'Linux':
+    mpris_client = MprisClient()
+    mpris_client.start()
+media_handler = MediaHandler(mpris=mpris_client)
 
 def _wrap(func: Callable[[Dict[str, Any]], Dict[str, Any]], expects_params: bool = False) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
     def inner(params: Dict[str, Any]) -> Dict[str, Any]:
@@ -128,18 +223,40 @@ def _cmd_sleep(_):
     return system_handler.sleep()
 def _cmd_shutdown(_):
     return system_handler.shutdown()
-def _cmd_screenshot(_):
-    return system_handler.take_screenshot()
+def _cmd_screenshot(p):
+    return system_handler.take_screenshot(p)
+def _cmd_screenshot_backends(_):
+    return system_handler.screenshot_backends()
+def _cmd_screenshot_refresh(_):
+    return system_handler.refresh_screenshot_backends()
+def _cmd_storage_report(_):
+    return {'status': 'success', 'message': 'Storage retention', **janitor.report()}
+def _cmd_storage_cleanup(_):
+    janitor.rescan()
+    reclaimed = janitor.enforce()
+    files = sum(r['files'] for r in reclaimed.values())
+    freed = sum(r['bytes'] for r in reclaimed.values())
+    return {'status': 'success', 'message': f'🧹 Removed {files} files ({freed / 2**20:.1f} MB)', 'reclaimed': reclaimed}
 def _cmd_copy(p):
     return clipboard_handler.copy(p.get('text', ''))
 def _cmd_paste(_):
     return clipboard_handler.paste()
+def _cmd_clipboard_history(p):
+    return clipboard_handler.get_history(offset=p.get('offset', 0), limit=p.get('limit', 10))
 def _cmd_volume(p):
     return volume_handler.set_volume(p.get('level', 50))
 def _cmd_mute(_):
     return volume_handler.toggle_mute()
+def _cmd_volume_get(_):
+    return volume_handler.get_volume()
+def _cmd_volume_app(p):
+    if p.get('index') is None:
+        return {'status': 'error', 'message': 'index required'}
+    return volume_handler.set_app_volume(p['index'], level=p.get('level'), muted=p.get('muted'))
 def _cmd_battery(_):
     return battery_handler.get_battery_status()
+def _cmd_battery_history(p):
+    return battery_handler.get_battery_history(minutes=p.get('minutes', 60), points=min(int(p.get('points', 120)), 500))
 def _cmd_network_info(_):
     return network_handler.get_network_info()
 def _cmd_network_stats(_):
@@ -151,6 +268,21 @@ def _cmd_process_kill(p):
     if pid is None:
         return {'status': 'error', 'message': 'pid required'}
     return process_handler.kill_process(pid)
+def _cmd_process_kill_many(p):
+    return process_handler.kill_many(pids=p.get('pids'), pattern=p.get('pattern'), tree=p.get('tree'),
+                                     mode=p.get('mode', 'substring'), field=p.get('field', 'name'),
+                                     timeout=p.get('timeout', 5), dry_run=bool(p.get('dry_run')))
+def _cmd_process_search(p):
+    pattern = p.get('pattern') or p.get('name')
+    if not pattern:
+        return {'status': 'error', 'message': 'pattern required'}
+    return process_handler.search_process(pattern, mode=p.get('mode', 'substring'),
+                                          field=p.get('field', 'any'), limit=p.get('limit', 20))
+def _cmd_process_info(p):
+    pid = p.get('pid')
+    if pid is None:
+        return {'status': 'error', 'message': 'pid required'}
+    return process_handler.get_process_info(int(pid))
 def _cmd_media_play_pause(_):
     return media_handler.play_pause()
 def _cmd_media_next(_):
@@ -167,15 +299,26 @@ COMMAND_MAP: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
     'sleep': _cmd_sleep,
     'shutdown': _cmd_shutdown,
     'screenshot': _cmd_screenshot,
+    'screenshot_backends': _cmd_screenshot_backends,
+    'screenshot_refresh': _cmd_screenshot_refresh,
+    'storage_report': _cmd_storage_report,
+    'storage_cleanup': _cmd_storage_cleanup,
     'copy': _cmd_copy,
     'paste': _cmd_paste,
+    'clipboard_history': _cmd_clipboard_history,
     'volume': _cmd_volume,
     'mute': _cmd_mute,
+    'volume_get': _cmd_volume_get,
+    'volume_app': _cmd_volume_app,
     'battery_status': _cmd_battery,
+    'battery_history': _cmd_battery_history,
     'network_info': _cmd_network_info,
     'network_stats': _cmd_network_stats,
     'process_list': _cmd_process_list,
     'process_kill': _cmd_process_kill,
+    'process_kill_many': _cmd_process_kill_many,
+    'process_search': _cmd_process_search,
+    'process_info': _cmd_process_info,
     'media_play_pause': _cmd_media_play_pause,
     'media_next': _cmd_media_next,
     'media_previous': _cmd_media_previous,
@@ -183,110 +326,428 @@ COMMAND_MAP: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
     'media_now_playing': _cmd_media_now_playing,
 }
 
-@app.route('/command', methods=['POST'])
-@require_auth
-def handle_command():
+def dispatch_command(data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """Run one ``{command, params}`` request through COMMAND_MAP.
+
+    Shared by the Flask route and the aiohttp serving mode; returns (result, http_status).
+    """
     try:
-        data = request.get_json(force=True)
         command = data.get('command') or ''
         params = data.get('params', {}) or {}
-        logger.info(f'📥 Command: {command} | Params: {params}')
+        logger.info('📥 Command: %s | Params: %s', command, clip(params))
         handler = COMMAND_MAP.get(command)
         if not handler:
-            return jsonify({'status': 'error', 'message': f'Unknown command: {command}'}), 400
-        result = handler(params)
-        logger.info(f'📤 Result: {result}')
-        return jsonify(result), 200
+            return {'status': 'error', 'message': f'Unknown command: {command}'}, 400
+        with metrics.track_command(command) as outcome:
+            result = result_cache.call(command, params, handler)
+            outcome['status'] = result.get('status') if isinstance(result, dict) else 'unknown'
+        logger.info('📤 Result: %s', clip(result))
+        return result, 200
+    except Exception as e:
+        logger.error(f'Command error: {e}')
+        return {'status': 'error', 'message': str(e)}, 500
+
+
+# Commands without side effects; a batch may run these concurrently.
+# Anything else runs alone, in request order, between the concurrent groups.
+READ_ONLY_COMMANDS = frozenset({
+    'clipboard_history',
+    'volume_get',
+    'screenshot_backends',
+    'storage_report',
+    'battery_status',
+    'battery_history',
+    'network_info',
+    'network_stats',
+    'process_list',
+    'process_search',
+    'process_info',
+    'media_now_playing',
+})
+
+_batch_pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+
+
+def _timed_dispatch(item: Any) -> Dict[str, Any]:
+    started = time.perf_counter()
+    if isinstance(item, dict):
+        result, code = dispatch_command(item)
+        command = item.get('command') or ''
+    else:
+        result, code = {'status': 'error', 'message': 'Each item must be an object'}, 400
+        command = ''
+    return {
+        'command': command,
+        'code': code,
+        'status': result.get('status', 'error') if isinstance(result, dict) else 'error',
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        'result': result,
+    }
+
+
+def dispatch_batch(items: list) -> list:
+    """Run several ``{command, params}`` items and return their results in request order.
+
+    Consecutive read-only commands run concurrently on the batch pool; a command
+    with side effects waits for the group before it and runs on its own.
+    """
+    results: list = [None] * len(items)
+    group: list = []
+
+    def flush():
+        futures = [(i, _batch_pool.submit(_timed_dispatch, items[i])) for i in group]
+        for i, future in futures:
+            results[i] = future.result()
+        group.clear()
+
+    for i, item in enumerate(items):
+        command = item.get('command') if isinstance(item, dict) else None
+        if command in READ_ONLY_COMMANDS:
+            group.append(i)
+            continue
+        flush()
+        results[i] = _timed_dispatch(item)
+    flush()
+    return results
+
+
+# Cache policies for read-only commands; mutators listed in invalidated_by clear them
+CACHE_POLICIES: Dict[str, CachePolicy] = {
+    'network_info': CachePolicy(ttl=5),  # slow lookups are already cached by the network probes
+    'battery_status': CachePolicy(ttl=10),
+    'volume_get': CachePolicy(ttl=2, invalidated_by=('volume', 'mute', 'volume_app')),
+    'network_stats': CachePolicy(ttl=2),
+    'process_list': CachePolicy(ttl=2, key_params=('limit', 'sort_by'), max_entries=16,
+                                invalidated_by=('process_kill', 'process_kill_many')),
+    'media_now_playing': CachePolicy(ttl=1, invalidated_by=(
+        'media_play_pause', 'media_next', 'media_previous', 'media_stop')),
+}
+
+result_cache = ResultCache(CACHE_POLICIES if CACHE_ENABLED else {})
+
+
+@app.route('/command', methods=['POST'])
+@require_auth
+def handle_command():
+    try:
+        data = request.get_json(force=True)
     except Exception as e:
         logger.error(f'Command error: {e}')
         return jsonify({'status': 'error', 'message': str(e)}), 500
+    result, code = dispatch_command(data)
+    return jsonify(result), code
+
+
+@app.route('/commands', methods=['POST'])
+@require_auth
+def handle_commands():
+    """Batch endpoint: ``{"commands": [{command, params}, ...]}`` -> per-item results."""
+    try:
+        data = request.get_json(force=True)
+        items = data.get('commands') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({'status': 'error', 'message': 'commands must be a non-empty list'}), 400
+        if len(items) > BATCH_MAX:
+            return jsonify({'status': 'error', 'message': f'Too many commands (max {BATCH_MAX})'}), 400
+
+        started = time.perf_counter()
+        results = dispatch_batch(items)
+        return jsonify({
+            'status': 'success',
+            'message': f'{len(results)} command(s) executed',
+            'results': results,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        }), 200
+    except Exception as e:
+        logger.error(f'Batch error: {e}')
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@app.route('/cache/stats', methods=['GET'])
+@require_auth
+def cache_stats():
+    return jsonify({'status': 'success', 'enabled': CACHE_ENABLED, 'commands': result_cache.stats()}), 200
+
+
+# ===========================
+# METRICS
+# ===========================
+
+# Flask routes; aiohttp-native routes are recorded by aio_server's middleware
+@app.before_request
+def _metrics_request_started():
+    metrics.HTTP_IN_FLIGHT.inc()
+    g.metrics_started = time.perf_counter()
+
+
+@app.teardown_request
+def _metrics_request_finished(_exc):
+    metrics.HTTP_IN_FLIGHT.dec()
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.HTTP_LATENCY.observe(time.perf_counter() - g.metrics_started, metrics.route_label(rule))
+
+
+def _collect_runtime_metrics():
+    stats = result_cache.stats()
+    for name, kind in (('hits', 'counter'), ('misses', 'counter'), ('evictions', 'counter'), ('size', 'gauge')):
+        metric = f'kdebot_cache_{name}' + ('_total' if kind == 'counter' else '')
+        yield f'# HELP {metric} Result cache {name} per command.'
+        yield f'# TYPE {metric} {kind}'
+        for command, counters in sorted(stats.items()):
+            yield f'{metric}{{command="{command}"}} {counters[name]}'
+    yield '# HELP kdebot_stream_subscribers Connected /stream watchers.'
+    yield '# TYPE kdebot_stream_subscribers gauge'
+    yield f'kdebot_stream_subscribers {stream_hub.subscriber_count()}'
+    yield '# HELP kdebot_log_records_dropped_total Log records dropped because the log queue was full.'
+    yield '# TYPE kdebot_log_records_dropped_total counter'
+    yield f'kdebot_log_records_dropped_total {dropped_records()}'
+    yield '# HELP kdebot_telemetry_sample_age_seconds Age of the newest telemetry sample.'
+    yield '# TYPE kdebot_telemetry_sample_age_seconds gauge'
+    yield f'kdebot_telemetry_sample_age_seconds {telemetry.status()["sample_age"]}'
+    storage = janitor.report()['directories']
+    for metric, key, kind, text in (('kdebot_storage_bytes', 'bytes', 'gauge', 'Bytes held in a managed directory.'),
+                                    ('kdebot_storage_files', 'files', 'gauge', 'Files held in a managed directory.'),
+                                    ('kdebot_storage_reclaimed_bytes_total', 'reclaimed_bytes', 'counter',
+                                     'Bytes deleted by the retention janitor.')):
+        yield f'# HELP {metric} {text}'
+        yield f'# TYPE {metric} {kind}'
+        for path, info in sorted(storage.items()):
+            yield f'{metric}{{dir="{path}"}} {info[key]}'
+
+
+metrics.REGISTRY.collector(_collect_runtime_metrics)
+
+
+@app.route('/metrics', methods=['GET'])
+@require_auth
+def handle_metrics():
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+# ===========================
+# LIVE STREAM (SSE)
+# ===========================
+
+def _topic_cpu() -> Dict[str, Any]:
+    sample = telemetry.latest()
+    return {'cpu': sample['cpu'], 'load1': sample['load'][0]}
+
+
+def _topic_memory() -> Dict[str, Any]:
+    sample = telemetry.latest()
+    return {'memory': sample['memory'], 'swap': sample['swap']}
+
+
+def _topic_battery() -> Dict[str, Any]:
+    result = result_cache.call('battery_status', {}, _cmd_battery)
+    return {k: result.get(k) for k in ('has_battery', 'percent', 'charging')}
+
+
+def _topic_media() -> Dict[str, Any]:
+    result = result_cache.call('media_now_playing', {}, _cmd_media_now_playing)
+    return {'track': result.get('track'), 'playback_status': result.get('playback_status')}
+
+
+stream_hub = StreamHub(interval=STREAM_INTERVAL, max_subscribers=STREAM_MAX_SUBSCRIBERS)
+stream_hub.register('cpu', _topic_cpu)
+stream_hub.register('memory', _topic_memory)
+stream_hub.register('battery', _topic_battery, every=10)
+stream_hub.register('network', network_sampler.current)
+stream_hub.register('media', _topic_media, every=5)
+stream_hub.start()
+
+
+@app.route('/stream', methods=['GET'])
+@require_auth
+def handle_stream():
+    """Server-Sent Events: ``?topics=cpu,battery&interval=2`` -> compact delta frames."""
+    try:
+        topics, interval = parse_subscription_args(request.args)
+        sub = stream_hub.subscribe(topics, interval)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except OverflowError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
+    return Response(sse_events(stream_hub, sub), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 # ===========================
 # FILE UPLOAD
 # ===========================
 
+transfers = TransferQueue(UPLOAD_DIR, workers=UPLOAD_WORKERS, chunk_size=UPLOAD_CHUNK_SIZE, on_saved=janitor.track)
+
+
 @app.route('/upload', methods=['POST'])
 @require_auth
 def handle_upload():
+    """Queue a Telegram file download; returns a job id immediately (202).
+
+    Pass ``"wait": true`` to block until the transfer finishes (old behaviour).
+    """
     try:
-        import requests
         data = request.get_json(force=True)
-        filename = (data.get('filename') or '').strip()
+        filename = os.path.basename((data.get('filename') or '').strip())
         url = data.get('url')
 
         if not filename or not url:
             return jsonify({'status': 'error', 'message': 'Missing filename or url'}), 400
 
-        # Sanitasi nama file sederhana
-        filename = os.path.basename(filename)
-        filepath = os.path.join(UPLOAD_DIR, filename)
+        job = transfers.submit(filename, url, expected_size=data.get('size'))
 
-        logger.info(f'📥 Downloading from Telegram: {filename}')
+        if data.get('wait'):
+            job.future.result()
+            if job.status != 'done':
+                return jsonify({'status': 'error', 'message': job.error or 'Upload failed'}), 500
+            return jsonify({'status': 'success', 'message': 'File saved', 'path': job.path}), 200
 
-        r = requests.get(url, stream=True, timeout=30)
-        r.raise_for_status()
-        with open(filepath, 'wb') as f:
-            for chunk in r.iter_content(8192):
-                f.write(chunk)
-
-        logger.info(f'✅ Saved: {filepath}')
-        return jsonify({'status': 'success', 'message': 'File saved', 'path': filepath}), 200
+        return jsonify({
+            'status': 'success',
+            'message': 'Upload queued',
+            'job_id': job.id,
+            'path': job.path,
+            'job': job.to_dict(),
+        }), 202
     except Exception as e:
         logger.error(f'Upload error: {e}')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+@require_auth
+def get_job(job_id):
+    job = transfers.get(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'message': f'Job {job.status}', 'job': job.to_dict()}), 200
+
+
 # ===========================
 # FILE DOWNLOAD (generic)
 # ===========================
 
-@app.route('/getfile', methods=['POST'])
+def resolve_download_path(path_req: str) -> Tuple[Optional[str], Optional[Dict[str, Any]], int]:
+    """Map a user-supplied path to a servable file: (abs_path, error, http_status)."""
+    path_req = (path_req or '').strip()
+    if not path_req:
+        return None, {'status': 'error', 'message': 'Path required'}, 400
+
+    abs_path = os.path.abspath(path_req)
+
+    # Allow if inside one of allowed dirs OR exact file exists and user intentionally wants it (optional).
+    if not any(abs_path.startswith(allowed + os.sep) or abs_path == allowed for allowed in ALLOWED_DOWNLOAD_DIRS):
+        return None, {'status': 'error', 'message': 'Access denied to this path'}, 403
+
+    if not os.path.isfile(abs_path):
+        return None, {'status': 'error', 'message': 'File not found'}, 404
+
+    janitor.touch(abs_path)
+    return abs_path, None, 200
+
+
+def resolve_screenshot_path(filename: str) -> Tuple[Optional[str], Optional[Dict[str, Any]], int]:
+    """Map a screenshot filename to its path in SCREENSHOT_DIR: (abs_path, error, http_status)."""
+    filepath = os.path.join(SCREENSHOT_DIR, os.path.basename(filename))
+    if not os.path.isfile(filepath):
+        return None, {'status': 'error', 'message': 'File not found'}, 404
+    janitor.touch(filepath)
+    return os.path.abspath(filepath), None, 200
+
+
+@app.route('/getfile', methods=['GET', 'POST'])
 @require_auth
 def get_file_generic():
     """
     Download arbitrary file by path (used by bot for user-supplied paths).
     Restrict to ALLOWED_DOWNLOAD_DIRS to avoid traversal abuse.
+
+    GET ``/getfile?path=...`` honours Range, If-Range and If-None-Match (ETag), so
+    clients can resume transfers and skip unchanged files. POST with a JSON body
+    is kept for older clients and always returns the whole file.
     """
     try:
-        data = request.get_json(force=True)
-        path_req = data.get('path', '').strip()
-
-        if not path_req:
-            return jsonify({'status': 'error', 'message': 'Path required'}), 400
-
-        abs_path = os.path.abspath(path_req)
-
-        # Allow if inside one of allowed dirs OR exact file exists and user intentionally wants it (optional).
-        if not any(abs_path.startswith(allowed + os.sep) or abs_path == allowed for allowed in ALLOWED_DOWNLOAD_DIRS):
-            return jsonify({'status': 'error', 'message': 'Access denied to this path'}), 403
+        if request.method == 'GET':
+            path_req = request.args.get('path', '')
+        else:
+            path_req = request.get_json(force=True).get('path', '')
 
-        if not os.path.exists(abs_path) or not os.path.isfile(abs_path):
-            return jsonify({'status': 'error', 'message': 'File not found'}), 404
+        abs_path, error, code = resolve_download_path(path_req)
+        if error:
+            return jsonify(error), code
 
         # Stream the file
         mime, _ = mimetypes.guess_type(abs_path)
         mime = mime or 'application/octet-stream'
         return send_file(abs_path, mimetype=mime, as_attachment=True,
-                         download_name=os.path.basename(abs_path))
+                         download_name=os.path.basename(abs_path), conditional=True, etag=True)
     except Exception as e:
         logger.error(f'Download error: {e}')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
-# Existing screenshot download route (unchanged)
+@app.route('/clipboard/<entry_id>', methods=['GET'])
+@require_auth
+def download_clipboard(entry_id):
+    """Full text of a clipboard history entry as a .txt download (ETag = content hash)."""
+    entry = clipboard_handler.get_entry(entry_id)
+    if entry is None:
+        return jsonify({'status': 'error', 'message': 'Clipboard entry not found'}), 404
+    if entry['id'] in request.if_none_match:
+        return Response(status=304, headers={'ETag': f'"{entry["id"]}"'})
+    return Response(entry['text'].encode('utf-8', 'replace'), mimetype='text/plain; charset=utf-8', headers={
+        'ETag': f'"{entry["id"]}"',
+        'Content-Disposition': f'attachment; filename="clipboard-{entry["id"]}.txt"',
+    })
+
+
+# Existing screenshot download route
 @app.route('/download/<filename>', methods=['GET'])
 @require_auth
 def download_file(filename):
     try:
-        filepath = os.path.join(SCREENSHOT_DIR, filename)
-        if not os.path.exists(filepath):
-            return jsonify({'status': 'error', 'message': 'File not found'}), 404
-        return send_file(filepath, as_attachment=True)
+        filepath, error, code = resolve_screenshot_path(filename)
+        if error:
+            return jsonify(error), code
+        return send_file(filepath, as_attachment=True, conditional=True, etag=True)
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@app.route('/screenshot', methods=['GET'])
+@require_auth
+def screenshot_inline():
+    """Capture and return the image in one response (query: format, quality, max_width).
+
+    Saves the bot the follow-up /download call; metadata travels in X-Screenshot-* headers.
+    The ETag is the capture's dHash: ``If-None-Match`` with it answers 304 while the
+    screen has not meaningfully changed (X-Screenshot-Since = last change).
+    """
+    params = request.args.to_dict()
+    if request.if_none_match:
+        params.setdefault('if_hash', next(iter(request.if_none_match), None))
+    with metrics.track_command('screenshot') as outcome:
+        result = system_handler.take_screenshot(params, inline=True)
+        outcome['status'] = result.get('status')
+    if result.get('status') != 'success':
+        return jsonify(result), 500
+    if result['unchanged']:
+        return Response(status=304, headers={
+            'ETag': f'"{result["hash"]}"',
+            'X-Screenshot-Since': str(result['since']),
+        })
+    mime, _ = mimetypes.guess_type(result['file'])
+    return Response(result['data'], mimetype=mime or 'application/octet-stream', headers={
+        'Cache-Control': 'no-store',
+        'ETag': f'"{result["hash"]}"',
+        'X-Screenshot-Since': str(result['since']),
+        'X-Screenshot-File': result['file'],
+        'X-Screenshot-Backend': result['backend'],
+        'X-Screenshot-Width': str(result['width']),
+        'X-Screenshot-Height': str(result['height']),
+    })
+
+
 # ===========================
 # COMMAND EXECUTION
 # ===========================
@@ -297,7 +758,7 @@ def execute_command(command: str, params: Dict[str, Any]):
     if not handler:
         return {'status': 'error', 'message': f'Unknown command: {command}'}
     try:
-        return handler(params or {})
+        return result_cache.call(command, params or {}, handler)
     except Exception as e:
         logger.error(f'Execution error: {e}')
         return {'status': 'error', 'message': str(e)}
@@ -311,9 +772,22 @@ if __name__ == '__main__':
     print('\n' + '=' * 60)
     print('🚀 KDE Connect Bot - Python Client (Enhanced)')
     print('=' * 60)
-    print(f'📡 Host: {HOST}:{PORT}')
+    print(f'📡 Host: unix:{os.path.abspath(UNIX_SOCKET)} (mode {UNIX_SOCKET_MODE})' if UNIX_SOCKET
+          else f'📡 Host: {HOST}:{PORT}')
     print(f'🔒 Auth: {"✅ ENABLED" if AUTH_TOKEN else "❌ DISABLED"}')
     print(f'📁 Upload dir: {os.path.abspath(UPLOAD_DIR)}')
     print(f'🖼️ Screenshot dir: {os.path.abspath(SCREENSHOT_DIR)}')
+    print(f'⚙️ Mode: {SERVER_MODE}' + (f' ({SERVER_WORKERS} workers)' if SERVER_MODE == 'aiohttp' else ''))
     print('=' * 60)
-    app.run(host=HOST, port=PORT, debug=False, threaded=True)
\ No newline at end of file
+    unix_sock = bind_unix_socket(UNIX_SOCKET, parse_mode(UNIX_SOCKET_MODE)) if UNIX_SOCKET else None
+    if SERVER_MODE == 'aiohttp':
+        from aio_server import serve
+        serve(app, dispatch_command, check_token, host=HOST, port=PORT, max_workers=SERVER_WORKERS,
+              stream_hub=stream_hub, resolve_path=resolve_download_path,
+              resolve_screenshot=resolve_screenshot_path, sock=unix_sock)
+    elif unix_sock is not None:
+        from werkzeug.serving import make_server
+        make_server(f'unix://{unix_sock.getsockname()}', 0, app, threaded=True,
+                    fd=unix_sock.fileno()).serve_forever()
+    else:
+        app.run(host=HOST, port=PORT, debug=False, threaded=True)
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""
+Server-push telemetry stream
+
+One StreamHub thread samples every registered topic that has at least one
+watcher, diffs it against the last published value and fans the delta out to
+all subscriptions. Each Subscription holds a single pending frame: updates that
+arrive before a slow consumer drains it are merged (coalesced) into that frame,
+so memory per watcher is bounded and the sampling cost does not depend on the
+number of watchers.
+"""
+
+import json
+import math
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from handlers.telemetry import PeriodicSampler
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_SECONDS = 15.0
+MAX_INTERVAL = 300.0  # slowest per-watcher rate; the hub interval is the fastest
+
+
+class Subscription:
+    """One watcher: chosen topics, minimum seconds between frames, pending delta."""
+
+    def __init__(self, topics: Iterable[str], interval: float):
+        self.topics = frozenset(topics)
+        self.interval = interval
+        self.coalesced = 0
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+
+    def offer(self, topic: str, delta: Dict[str, Any]) -> None:
+        with self._lock:
+            if topic in self._pending:
+                self._pending[topic].update(delta)
+                self.coalesced += 1
+            else:
+                self._pending[topic] = dict(delta)
+        self._event.set()
+
+    def drain(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Take the pending frame (or None) without blocking."""
+        with self._lock:
+            if not self._pending:
+                return None
+            frame, self._pending = self._pending, {}
+            self._event.clear()
+        return frame
+
+    def wait(self, timeout: float) -> bool:
+        return self._event.wait(timeout)
+
+
+class StreamHub(PeriodicSampler):
+    """Single producer that fans topic deltas out to subscriptions."""
+
+    name = 'stream-hub'
+
+    def __init__(self, interval: float = 1.0, max_subscribers: int = 16):
+        super().__init__(interval)
+        self.max_subscribers = max_subscribers
+        self._sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._every: Dict[str, float] = {}
+        self._next_due: Dict[str, float] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._subs: set = set()
+        self._lock = threading.Lock()
+
+    @property
+    def topics(self):
+        return sorted(self._sources)
+
+    def register(self, topic: str, source: Callable[[], Dict[str, Any]], every: float = 0.0) -> None:
+        """Add a topic; ``source`` returns a flat dict, sampled at most once per ``every`` seconds."""
+        self._sources[topic] = source
+        self._every[topic] = every
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, interval: Optional[float] = None) -> Subscription:
+        topics = [t for t in (topics or self._sources) if t in self._sources]
+        if not topics:
+            raise ValueError(f'No known topics requested (available: {", ".join(self.topics)})')
+        interval = float(interval or self.interval)
+        if not math.isfinite(interval):
+            raise ValueError('interval must be a finite number of seconds')
+        sub = Subscription(topics, min(MAX_INTERVAL, max(self.interval, interval)))
+        with self._lock:
+            if len(self._subs) >= self.max_subscribers:
+                raise OverflowError('Too many stream subscribers')
+            self._subs.add(sub)
+            snapshot = {t: self._last[t] for t in sub.topics if t in self._last}
+        # New watchers start from the last full state; later frames are deltas
+        for topic, values in snapshot.items():
+            sub.offer(topic, values)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subs.discard(sub)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subs)
+
+    def tick(self):
+        with self._lock:
+            subs = list(self._subs)
+        watched = set().union(*(s.topics for s in subs)) if subs else set()
+        now = time.monotonic()
+        for topic in self._sources:
+            if topic not in watched:
+                # Nobody is listening: forget state so the next watcher gets a full frame
+                self._last.pop(topic, None)
+                self._next_due.pop(topic, None)
+                continue
+            if now < self._next_due.get(topic, 0.0):
+                continue
+            self._next_due[topic] = now + self._every[topic]
+            try:
+                current = self._sources[topic]()
+            except Exception as e:
+                logger.error(f"Stream topic {topic} failed: {e}")
+                continue
+            previous = self._last.get(topic, {})
+            delta = {k: v for k, v in current.items() if previous.get(k) != v}
+            if not delta:
+                continue
+            with self._lock:
+                self._last[topic] = current
+            for sub in subs:
+                if topic in sub.topics:
+                    sub.offer(topic, delta)
+
+
+def parse_subscription_args(args: Dict[str, str]):
+    """Read ``topics`` (comma separated) and ``interval`` (seconds) query args.
+
+    Raises ValueError for an interval that is not a finite number; the range is
+    clamped by StreamHub.subscribe().
+    """
+    raw = (args.get('topics') or '').strip()
+    topics = [t.strip() for t in raw.split(',') if t.strip()] or None
+    raw_interval = args.get('interval')
+    if not raw_interval:
+        return topics, None
+    try:
+        interval = float(raw_interval)
+    except ValueError:
+        raise ValueError(f'interval must be a number of seconds, got {raw_interval!r}')
+    if not math.isfinite(interval):
+        raise ValueError('interval must be a finite number of seconds')
+    return topics, interval
+
+
+def format_frame(frame: Dict[str, Any]) -> str:
+    payload = json.dumps({'ts': round(time.time(), 3), **frame}, separators=(',', ':'), default=str)
+    return f'event: delta\ndata: {payload}\n\n'
+
+
+def sse_events(hub: StreamHub, sub: Subscription) -> Iterator[str]:
+    """Blocking SSE generator for the threaded Flask server."""
+    try:
+        yield 'retry: 3000\n\n'
+        last_sent = 0.0
+        while True:
+            if not sub.wait(KEEPALIVE_SECONDS):
+                yield ': keepalive\n\n'
+                continue
+            delay = last_sent + sub.interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)  # further updates coalesce into the pending frame
+            frame = sub.drain()
+            if frame:
+                last_sent = time.monotonic()
+                yield format_frame(frame)
+    finally:
+        hub.unsubscribe(sub)
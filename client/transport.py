@@ -0,0 +1,54 @@
+"""
+Unix domain socket listener for the local bot <-> client link.
+
+The bot and the client run on the same machine, so UNIX_SOCKET lets the
+server skip TCP loopback entirely. The socket file's mode is a second auth
+layer next to AUTH_TOKEN: with the default 0600 only the owning user can
+connect at all.
+"""
+
+import os
+import stat
+import socket
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_mode(value) -> int:
+    """'0600' / '660' / 0o600 -> int; only permission bits are accepted."""
+    mode = int(value, 8) if isinstance(value, str) else int(value)
+    if mode & ~0o777:
+        raise ValueError(f'Invalid socket mode: {value!r}')
+    return mode
+
+
+def bind_unix_socket(path: str, mode: int = 0o600, backlog: int = 128) -> socket.socket:
+    """Create a listening Unix socket at ``path`` with permissions ``mode``.
+
+    The umask is tightened while binding, so the file never exists with looser
+    permissions than ``mode``. A stale socket from a previous run is replaced;
+    any other existing file is left alone and raises FileExistsError.
+    """
+    path = os.path.abspath(path)
+    try:
+        if stat.S_ISSOCK(os.lstat(path).st_mode):
+            os.unlink(path)
+        else:
+            raise FileExistsError(f'{path} exists and is not a socket')
+    except FileNotFoundError:
+        pass
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o777 & ~mode)
+    try:
+        sock.bind(path)
+    except Exception:
+        sock.close()
+        raise
+    finally:
+        os.umask(old_umask)
+    os.chmod(path, mode)  # some platforms ignore the umask for sockets
+    sock.listen(backlog)
+    logger.info('Listening on unix:%s (mode %o)', path, mode)
+    return sock
@@ -0,0 +1,79 @@
+from handlers.battery import BatteryHandler, BatterySampler, read_power_supply
+
+
+def write_supply(root, name, **attrs):
+    path = root / name
+    path.mkdir(exist_ok=True)
+    for key, value in attrs.items():
+        (path / key).write_text(f"{value}\n")
+
+
+def fake_sysfs(root, energy_wh=30.0, status="Discharging", online=0):
+    write_supply(root, "AC", type="Mains", online=online)
+    write_supply(root, "BAT0", type="Battery", status=status, capacity=int(energy_wh * 100 / 50),
+                 energy_now=int(energy_wh * 1e6), energy_full=50_000_000, power_now=10_000_000,
+                 voltage_now=12_000_000)
+    write_supply(root, "hidpp_battery_0", type="Battery", scope="Device", capacity=5, status="Discharging")
+
+
+def test_reads_energy_and_skips_peripherals(tmp_path):
+    fake_sysfs(tmp_path)
+    reading = read_power_supply(str(tmp_path))
+    assert reading == {"percent": 60.0, "status": "Discharging", "plugged": False, "energy_now": 30.0,
+                       "energy_full": 50.0, "power": 10.0, "batteries": 1}
+    assert read_power_supply(str(tmp_path / "missing")) is None
+
+
+def test_charge_based_battery_is_converted_to_energy(tmp_path):
+    write_supply(tmp_path, "BAT1", type="Battery", status="Charging", charge_now=2_000_000,
+                 charge_full=4_000_000, current_now=1_500_000, voltage_now=11_000_000)
+    reading = read_power_supply(str(tmp_path))
+    assert reading["percent"] == 50.0 and reading["energy_now"] == 22.0
+    assert reading["power"] == 16.5 and reading["plugged"] is True
+
+
+def test_time_to_empty_from_own_history(tmp_path):
+    clock = [1000.0]
+    sampler = BatterySampler(interval=30, history_hours=1, root=str(tmp_path), clock=lambda: clock[0])
+    energy = 40.0
+    for _ in range(21):  # 10 minutes at 10 W: 1/6 Wh per minute
+        fake_sysfs(tmp_path, energy_wh=energy)
+        sampler.tick()
+        clock[0] += 30
+        energy -= 10 / 120
+
+    estimate = sampler.estimate()
+    assert abs(estimate["rate_w"] + 10) < 0.1
+    assert abs(estimate["rate_pct_h"] + 20) < 0.5  # 10 W of a 50 Wh pack
+    # ~38.3 Wh left at -20 %/h (76.7% / 20) = ~3h50m
+    assert abs(estimate["time_to_empty"] - 3.83 * 3600) < 300
+    assert estimate["time_to_full"] is None
+
+    status = BatteryHandler(sampler).get_battery_status()
+    assert status["source"] == "sysfs" and status["time_remaining"].startswith("3h")
+
+    # Plugging in starts a new run: no estimate until enough charging samples
+    fake_sysfs(tmp_path, energy_wh=energy, status="Charging", online=1)
+    sampler.tick()
+    assert sampler.estimate()["time_to_empty"] is None and sampler.estimate()["rate_pct_h"] is None
+
+
+def test_history_is_bounded_and_thinned(tmp_path):
+    clock = [0.0]
+    fake_sysfs(tmp_path)
+    sampler = BatterySampler(interval=60, history_hours=1, root=str(tmp_path), clock=lambda: clock[0])
+    for _ in range(100):
+        sampler.tick()
+        clock[0] += 60
+    assert len(sampler._samples) == 60
+
+    result = BatteryHandler(sampler).get_battery_history(minutes=30, points=10)
+    assert result["status"] == "success" and len(result["samples"]) == 10
+    assert result["samples"][-1]["ts"] == 99 * 60 and result["samples"][0]["status"] == "Discharging"
+
+
+def test_no_sysfs_battery_falls_back(tmp_path):
+    sampler = BatterySampler(root=str(tmp_path))
+    handler = BatteryHandler(sampler)
+    assert handler.get_battery_history()["status"] == "error"
+    assert handler.get_battery_status()["status"] == "success"  # psutil path
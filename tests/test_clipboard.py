@@ -0,0 +1,86 @@
+import json
+
+import pyperclip
+import pytest
+
+from handlers.clipboard import ClipboardHandler, ClipboardHistory, content_id
+
+
+@pytest.fixture()
+def fake_clipboard(monkeypatch):
+    """In-memory system clipboard (this sandbox has no xclip/xsel)."""
+    board = {"text": ""}
+    monkeypatch.setattr(pyperclip, "copy", lambda text: board.update(text=text))
+    monkeypatch.setattr(pyperclip, "paste", lambda: board["text"])
+    return board
+
+
+def test_history_dedupes_and_evicts_oldest():
+    history = ClipboardHistory(max_entries=3, max_bytes=1000)
+    for text in ("a", "b", "a", "c", "d"):
+        history.add(text, "copy")
+
+    entries, total = history.page()
+    assert [e["text"] for e in entries] == ["d", "c", "a"] and total == 3
+    assert entries[2]["count"] == 2 and entries[2]["id"] == content_id("a")
+
+    history.add("x" * 999, "paste")  # count limit drops "a", byte limit then drops "c"
+    assert [e["text"][:1] for e in history.page()[0]] == ["x", "d"]
+    assert history.total_bytes == 1000
+
+    big = "y" * 5000  # larger than max_bytes on its own: kept as the only entry
+    history.add(big, "paste")
+    assert [e["chars"] for e in history.page()[0]] == [5000]
+
+
+def test_history_pagination(fake_clipboard):
+    handler = ClipboardHandler()
+    for i in range(25):
+        handler.copy(f"entry {i}")
+    handler.copy("entry 3")
+
+    first = handler.get_history(limit=10)
+    assert first["total"] == 25 and first["next_offset"] == 10
+    assert first["entries"][0]["preview"] == "entry 3" and first["entries"][0]["count"] == 2
+    last = handler.get_history(offset=20, limit=10)
+    assert len(last["entries"]) == 5 and last["next_offset"] is None
+    assert handler.get_history(offset="x")["status"] == "error"
+    assert handler.get_history(limit="ten")["status"] == "error"
+    assert len(handler.get_history(limit=500)["entries"]) == 25  # large limits are capped, not rejected
+
+
+def test_large_paste_is_served_as_download(fake_clipboard):
+    from client.server import app, AUTH_TOKEN, clipboard_handler
+
+    fake_clipboard["text"] = "line\n" * 2000
+    headers = {"Authorization": f"Bearer {AUTH_TOKEN}", "Content-Type": "application/json"}
+    with app.test_client() as client:
+        resp = client.post("/command", data=json.dumps({"command": "paste"}), headers=headers)
+        data = resp.get_json()
+        assert data["truncated"] is True and len(data["content"]) == clipboard_handler.inline_limit
+        assert data["download"] == f"/clipboard/{data['id']}"
+
+        resp = client.get(data["download"], headers=headers)
+        assert resp.status_code == 200 and resp.data == fake_clipboard["text"].encode()
+        assert resp.headers["ETag"] == f'"{data["id"]}"'
+        assert client.get(data["download"], headers={**headers, "If-None-Match": resp.headers["ETag"]}).status_code == 304
+        assert client.get("/clipboard/0000000000000000", headers=headers).status_code == 404
+
+        resp = client.post("/command", data=json.dumps({"command": "clipboard_history", "params": {"limit": 5}}),
+                           headers=headers)
+        assert resp.get_json()["entries"][0]["large"] is True
+
+        resp = client.post("/command", data=json.dumps({"command": "clipboard_history", "params": {"limit": "x"}}),
+                           headers=headers)
+        assert resp.get_json()["status"] == "error"
+
+
+def test_batched_paste_runs_before_later_reads(fake_clipboard):
+    from client.server import READ_ONLY_COMMANDS, dispatch_batch
+
+    assert "paste" not in READ_ONLY_COMMANDS  # it records the paste in the history
+    fake_clipboard["text"] = "batched paste"
+    paste, history = dispatch_batch([{"command": "paste"},
+                                     {"command": "clipboard_history", "params": {"limit": 1}}])
+    assert paste["status"] == "success"
+    assert history["result"]["entries"][0]["preview"] == "batched paste"
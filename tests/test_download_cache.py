@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from bot.client import SystemClient
+from bot.download_cache import DownloadCache
+
+
+@pytest.mark.asyncio
+async def test_repeat_download_is_a_304(tmp_path, monkeypatch):
+    from aiohttp.test_utils import TestServer
+    import client.server as server
+    from client.aio_server import create_app
+
+    monkeypatch.setattr(server, 'ALLOWED_DOWNLOAD_DIRS', [str(tmp_path / 'src')])
+    (tmp_path / 'src').mkdir()
+    source = tmp_path / 'src' / 'report.pdf'
+    source.write_bytes(b'x' * 5000)
+
+    app = create_app(server.app, server.dispatch_command, server.check_token, max_workers=2,
+                     resolve_path=server.resolve_download_path)
+    responses = []
+
+    async def record(request, response):
+        responses.append(response.status)
+
+    app.on_response_prepare.append(record)
+    test_server = TestServer(app)
+    await test_server.start_server()
+    client = SystemClient()
+    client.base_url = str(test_server.make_url('')).rstrip('/')
+    cache = DownloadCache(str(tmp_path / 'cache'))
+    try:
+        first = await cache.fetch(client, str(source))
+        assert first['bytes'] == 5000 and not first['unchanged']
+        cache.remember(first['path'], 'telegram-file-id')
+
+        again = await cache.fetch(client, str(source))
+        assert again['unchanged'] is True and again['bytes'] == 0
+        assert responses == [200, 304]
+        assert open(again['path'], 'rb').read() == source.read_bytes()
+        assert cache.file_id(again['path']) == 'telegram-file-id'
+
+        source.write_bytes(b'y' * 10)
+        changed = await cache.fetch(client, str(source))
+        assert changed['bytes'] == 10 and cache.file_id(changed['path']) is None
+
+        failed = await cache.fetch(client, str(tmp_path / 'src' / 'missing'))
+        missing = cache.path_for(str(tmp_path / 'src' / 'missing'))
+        assert failed['status'] == 'error'
+        assert not os.path.exists(missing + '.part') and not os.path.exists(missing + '.etag')
+    finally:
+        await client.aclose()
+        await test_server.close()
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = DownloadCache(str(tmp_path), max_bytes=250)
+    for i, name in enumerate(('old', 'mid', 'new')):
+        path = cache.path_for(name)
+        with open(path, 'wb') as f:
+            f.write(b'.' * 100)
+        with open(path + '.etag', 'w') as f:
+            f.write('"tag"')
+        os.utime(path, (1000 + i, 1000 + i))
+    cache.remember(cache.path_for('old'), 'id')
+
+    cache.prune(keep=cache.path_for('old'))
+
+    assert os.path.exists(cache.path_for('old'))
+    assert not os.path.exists(cache.path_for('mid')) and not os.path.exists(cache.path_for('mid') + '.etag')
+    assert os.path.exists(cache.path_for('new'))
+    assert cache.file_id(cache.path_for('old')) == 'id'
@@ -0,0 +1,62 @@
+import os
+import time
+
+from janitor import Janitor, RetentionPolicy
+
+
+def _write(path, size, age=0.0):
+    path.write_bytes(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return str(path)
+
+
+def test_initial_scan_enforces_age_and_count(tmp_path):
+    _write(tmp_path / "old.png", 10, age=7200)
+    for i in range(4):
+        _write(tmp_path / f"s{i}.png", 10, age=100 - i)
+    _write(tmp_path / "upload.bin.part", 10, age=9999)
+
+    janitor = Janitor()
+    janitor.add_directory(str(tmp_path), RetentionPolicy(max_age=3600, max_files=3))
+    reclaimed = janitor.enforce()
+
+    assert reclaimed[str(tmp_path)] == {"files": 2, "bytes": 20}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["s1.png", "s2.png", "s3.png", "upload.bin.part"]
+
+
+def test_track_evicts_oldest_without_rescan(tmp_path, monkeypatch):
+    janitor = Janitor()
+    janitor.add_directory(str(tmp_path), RetentionPolicy(max_bytes=250))
+    monkeypatch.setattr(os, "scandir", lambda *a: (_ for _ in ()).throw(AssertionError("rescanned")))
+
+    for i in range(3):
+        janitor.track(_write(tmp_path / f"f{i}.bin", 100))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["f1.bin", "f2.bin"]
+    report = janitor.report()
+    assert report["reclaimed_files"] == 1 and report["reclaimed_bytes"] == 100
+    assert report["directories"][str(tmp_path)]["bytes"] == 200
+
+
+def test_atime_policy_keeps_recently_read_files(tmp_path):
+    janitor = Janitor()
+    janitor.add_directory(str(tmp_path), RetentionPolicy(max_files=2, by="atime"))
+    first = _write(tmp_path / "a.bin", 1, age=30)
+    janitor.track(first)
+    janitor.track(_write(tmp_path / "b.bin", 1))
+    janitor.touch(first)
+    janitor.track(_write(tmp_path / "c.bin", 1))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.bin", "c.bin"]
+
+
+def test_externally_deleted_files_leave_the_index(tmp_path):
+    janitor = Janitor()
+    janitor.add_directory(str(tmp_path), RetentionPolicy(max_files=1))
+    janitor.track(_write(tmp_path / "a.bin", 5))
+    os.remove(tmp_path / "a.bin")
+    janitor.track(_write(tmp_path / "b.bin", 5))
+
+    assert janitor.report()["directories"][str(tmp_path)]["files"] == 1
+    assert (tmp_path / "b.bin").exists()
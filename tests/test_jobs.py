@@ -0,0 +1,75 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from jobs import TransferQueue
+
+PAYLOAD = b'kde-bot' * 300_000
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/file':
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def file_server():
+    httpd = HTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+
+
+def test_job_downloads_in_background(tmp_path, file_server):
+    saved = []
+    transfers = TransferQueue(str(tmp_path), workers=1, on_saved=saved.append)
+    job = transfers.submit('../../evil.bin', f'{file_server}/file')
+    assert job.path == str(tmp_path / 'evil.bin')
+
+    job.future.result(timeout=10)
+    info = transfers.get(job.id).to_dict()
+    assert info['state'] == 'done'
+    assert info['bytes_done'] == info['total'] == len(PAYLOAD)
+    assert info['percent'] == 100.0
+    assert (tmp_path / 'evil.bin').read_bytes() == PAYLOAD
+    assert saved == [job.path]
+
+
+def test_same_name_uploads_do_not_share_a_temp_file(tmp_path, file_server):
+    transfers = TransferQueue(str(tmp_path), workers=2)
+    jobs = [transfers.submit('same.bin', f'{file_server}/file') for _ in range(2)]
+    for job in jobs:
+        job.future.result(timeout=10)
+    assert [job.status for job in jobs] == ['done', 'done']
+    assert (tmp_path / 'same.bin').read_bytes() == PAYLOAD
+    assert [p.name for p in tmp_path.iterdir()] == ['same.bin']
+
+
+def test_failed_job_reports_error_and_cleans_up(tmp_path, file_server):
+    transfers = TransferQueue(str(tmp_path), workers=1)
+    job = transfers.submit('missing.bin', f'{file_server}/nope')
+    job.future.result(timeout=10)
+    assert job.status == 'error'
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_finished_jobs_are_pruned(tmp_path, file_server):
+    transfers = TransferQueue(str(tmp_path), workers=1, keep=2)
+    jobs = []
+    for i in range(4):
+        job = transfers.submit(f'f{i}.bin', f'{file_server}/file')
+        job.future.result(timeout=10)
+        jobs.append(job)
+    assert transfers.get(jobs[0].id) is None
+    assert transfers.get(jobs[-1].id) is not None
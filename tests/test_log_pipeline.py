@@ -0,0 +1,48 @@
+import json
+import logging
+import queue
+import threading
+
+from log_pipeline import DeferredQueueHandler, JsonLinesFormatter, clip
+
+
+def test_clip_truncates_large_fields():
+    result = {'status': 'success', 'content': 'x' * 5_000_000}
+    text = str(clip(result, cap=100))
+    assert len(text) < 250
+    assert '(+' in text
+
+
+def test_records_are_not_formatted_on_caller_thread():
+    rendered_on = []
+
+    class Probe:
+        def __str__(self):
+            rendered_on.append(threading.current_thread().name)
+            return 'probe'
+
+    q = queue.Queue()
+    logger = logging.getLogger('test_log_pipeline.deferred')
+    logger.propagate = False
+    logger.addHandler(DeferredQueueHandler(q))
+    logger.setLevel(logging.INFO)
+    logger.info('value=%s', Probe())
+
+    assert rendered_on == []
+    record = q.get_nowait()
+    assert record.getMessage() == 'value=probe'
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DeferredQueueHandler(queue.Queue(maxsize=1))
+    record = logging.LogRecord('x', logging.INFO, __file__, 1, 'msg', None, None)
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.dropped == 1
+
+
+def test_json_lines_formatter():
+    record = logging.LogRecord('srv', logging.WARNING, __file__, 1, 'hi %s', ('there',), None)
+    entry = json.loads(JsonLinesFormatter().format(record))
+    assert entry['msg'] == 'hi there'
+    assert entry['level'] == 'WARNING'
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import metrics
+
+
+def test_histogram_exposition_is_cumulative():
+    registry = metrics.Registry()
+    hist = registry.histogram('t_seconds', 'test', ('command',), buckets=(0.1, 1.0))
+    hist.observe(0.05, 'a')
+    hist.observe(0.5, 'a')
+    hist.observe(5, 'a')
+    text = registry.render()
+    assert 't_seconds_bucket{command="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{command="a",le="1"} 2' in text
+    assert 't_seconds_bucket{command="a",le="+Inf"} 3' in text
+    assert 't_seconds_count{command="a"} 3' in text
+
+
+def test_track_command_counts_status_and_subprocesses():
+    program = os.path.basename(sys.executable)
+    before = metrics.SUBPROCESS_SPAWNS.value('unit_cmd', program)
+    with metrics.track_command('unit_cmd') as outcome:
+        metrics.run([sys.executable, '-c', 'pass'], check=True)
+        metrics.spawn([sys.executable, '-c', 'pass']).wait()
+        subprocess.run([sys.executable, '-c', 'pass'])  # not ours: subprocess itself is untouched
+        outcome['status'] = 'error'
+    assert metrics.COMMAND_ERRORS.value('unit_cmd') >= 1
+    assert metrics.COMMANDS.value('unit_cmd', 'error') >= 1
+    assert metrics.SUBPROCESS_SPAWNS.value('unit_cmd', program) == before + 2
+    assert metrics.SUBPROCESS_DURATION.count('unit_cmd') >= 1
+    assert subprocess.Popen.__module__ == 'subprocess'
+
+    missing = metrics.SUBPROCESS_SPAWNS.value('unit_cmd', 'kdebot-no-such-program')
+    with metrics.track_command('unit_cmd'):
+        try:
+            metrics.run(['kdebot-no-such-program'])
+        except FileNotFoundError:
+            pass
+    assert metrics.SUBPROCESS_SPAWNS.value('unit_cmd', 'kdebot-no-such-program') == missing == 0
+
+
+def test_route_label():
+    assert metrics.route_label('/download/<path:filename>') == '/download/{filename}'
+    assert metrics.route_label('/clipboard/<entry_id>') == '/clipboard/{entry_id}'
+    assert metrics.route_label('/download/{filename}') == '/download/{filename}'
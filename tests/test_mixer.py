@@ -0,0 +1,141 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+from handlers.mixer import AmixerMixer, MixerBackend, MixerError, VolumeCoalescer
+from handlers.volume import VolumeHandler
+
+
+class FakeMixer(MixerBackend):
+    name = "fake"
+    supports_apps = True
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.volume, self.muted = 40, False
+        self.writes = []
+        self.streams = {7: {"index": 7, "name": "Firefox", "volume": 100, "muted": False}}
+
+    def get(self):
+        return {"volume": self.volume, "muted": self.muted}
+
+    def set_volume(self, level):
+        time.sleep(self.delay)
+        self.writes.append(level)
+        self.volume = level
+
+    def set_mute(self, muted=None):
+        self.muted = (not self.muted) if muted is None else muted
+        return self.muted
+
+    def apps(self):
+        return list(self.streams.values())
+
+    def set_app_volume(self, index, level=None, muted=None):
+        if index not in self.streams:
+            raise MixerError(f"No application stream #{index}")
+        if level is not None:
+            self.streams[index]["volume"] = level
+        if muted is not None:
+            self.streams[index]["muted"] = muted
+
+
+def test_burst_of_volume_requests_applies_only_newest():
+    mixer = FakeMixer(delay=0.1)
+    handler = VolumeHandler(mixer=mixer, coalesce_window=0.05)
+    results = {}
+
+    def tap(level):
+        results[level] = handler.set_volume(level)
+
+    threads = []
+    for level in (10, 20, 30, 40, 50, 60):
+        threads.append(threading.Thread(target=tap, args=(level,)))
+        threads[-1].start()
+        time.sleep(0.01)
+    for t in threads:
+        t.join()
+
+    assert mixer.volume == 60
+    assert len(mixer.writes) < 6 and mixer.writes[-1] == 60
+    assert all(r["status"] == "success" for r in results.values())
+    assert results[60]["superseded"] is False
+    assert handler.coalescer.requests == 6 and handler.coalescer.writes == len(mixer.writes)
+
+
+def test_coalescer_reports_mixer_errors():
+    def broken(level):
+        raise MixerError("device busy")
+
+    coalescer = VolumeCoalescer(broken, window=0)
+    assert coalescer.submit(30) == {"applied": None, "error": "device busy"}
+    handler = VolumeHandler(mixer=FakeMixer())
+    handler.coalescer = coalescer
+    assert handler.set_volume(30)["status"] == "error"
+
+
+def test_get_volume_mute_and_app_volume():
+    handler = VolumeHandler(mixer=FakeMixer())
+    assert handler.toggle_mute()["muted"] is True
+    state = handler.get_volume()
+    assert (state["volume"], state["muted"]) == (40, True)
+    assert state["apps"][0]["name"] == "Firefox" and "#7 Firefox" in state["details"]
+
+    assert handler.set_app_volume(7, level=30)["status"] == "success"
+    assert handler.get_volume()["apps"][0]["volume"] == 30
+    assert handler.set_app_volume(99, level=30)["status"] == "error"
+
+    # Bad input is reported, not raised out of the mixer
+    for index, level in (("x", 30), (7, "loud"), (7, float("nan")), (-1, 30)):
+        assert handler.set_app_volume(index, level=level)["status"] == "error"
+    assert handler.set_app_volume("7", level="55.4")["message"].endswith("55%")
+    assert handler.get_volume()["apps"][0]["volume"] == 55
+
+
+def test_volume_app_command_parses_muted_strictly(monkeypatch):
+    import client.server as server
+
+    handler = VolumeHandler(mixer=FakeMixer())
+    monkeypatch.setattr(server, "volume_handler", handler)
+    stream = handler.mixer.streams[7]
+
+    for muted, expected in ((True, True), ("false", False), (1, True), ("0", False), ("TRUE", True), (False, False)):
+        result, _ = server.dispatch_command({"command": "volume_app", "params": {"index": 7, "muted": muted}})
+        assert result["status"] == "success" and stream["muted"] is expected
+
+    for muted in ("off", "yes", 2, 0.5, [], "maybe"):
+        result, _ = server.dispatch_command({"command": "volume_app", "params": {"index": 7, "muted": muted}})
+        assert result["status"] == "error"
+    assert stream["muted"] is False
+
+
+AMIXER_OUTPUT = """Simple mixer control 'Master',0
+  Capabilities: pvolume pswitch pswitch-joined
+  Playback channels: Front Left - Front Right
+  Front Left: Playback 42598 [65%] [-11.00dB] [off]
+  Front Right: Playback 42598 [65%] [-11.00dB] [off]
+"""
+
+
+def test_amixer_fallback_parses_state_and_times_out():
+    calls = []
+
+    def run(argv, **kwargs):
+        calls.append((argv, kwargs["timeout"]))
+        return subprocess.CompletedProcess(argv, 0, AMIXER_OUTPUT, "")
+
+    mixer = AmixerMixer(timeout=2, run=run)
+    assert mixer.get() == {"volume": 65, "muted": True}
+    mixer.set_volume(130)
+    assert calls[-1] == (["amixer", "set", "Master", "100%"], 2)
+    assert mixer.set_mute(None) is True and calls[-1][0][-1] == "toggle"
+
+    def hang(argv, **kwargs):
+        raise subprocess.TimeoutExpired(argv, kwargs["timeout"])
+
+    with pytest.raises(MixerError, match="timed out"):
+        AmixerMixer(run=hang).set_volume(50)
+    with pytest.raises(MixerError):
+        mixer.apps()
@@ -0,0 +1,186 @@
+import shutil
+import subprocess
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("jeepney")
+if not shutil.which("dbus-daemon"):
+    pytest.skip("dbus-daemon not installed", allow_module_level=True)
+
+from jeepney import DBusAddress, HeaderFields, MessageType, message_bus, new_method_return, new_signal
+from jeepney.io.blocking import open_dbus_connection
+
+from handlers.media import MediaHandler
+from handlers.mpris import MPRIS_PATH, PLAYER_IFACE, MprisClient, MprisUnavailable
+
+
+class StubPlayer(threading.Thread):
+    """Minimal MPRIS player: Properties.GetAll plus PlayPause/Next that emit PropertiesChanged."""
+
+    def __init__(self, address, name="kdebottest", title="Song One"):
+        super().__init__(daemon=True)
+        self.conn = open_dbus_connection(bus=address)
+        self.conn.send_and_get_reply(message_bus.RequestName(f"org.mpris.MediaPlayer2.{name}"))
+        self.status = "Paused"
+        self.track = 1
+        self.title = title
+        self.calls = []
+        self._closing = threading.Event()
+        self.start()
+
+    def props(self):
+        metadata = {"xesam:title": ("s", self.title), "xesam:artist": ("as", ["Stub Artist"]),
+                    "xesam:album": ("s", "Stub Album")}
+        return {"PlaybackStatus": ("s", self.status), "Metadata": ("a{sv}", metadata)}
+
+    def emit(self, changed):
+        emitter = DBusAddress(MPRIS_PATH, interface="org.freedesktop.DBus.Properties")
+        self.conn.send(new_signal(emitter, "PropertiesChanged", "sa{sv}as", (PLAYER_IFACE, changed, [])))
+
+    def run(self):
+        while not self._closing.is_set():
+            try:
+                msg = self.conn.receive(timeout=0.1)
+            except TimeoutError:
+                continue
+            except Exception:
+                return
+            if msg.header.message_type != MessageType.method_call:
+                continue
+            member = msg.header.fields[HeaderFields.member]
+            self.calls.append(member)
+            if member == "GetAll":
+                self.conn.send(new_method_return(msg, "a{sv}", (self.props(),)))
+                continue
+            self.conn.send(new_method_return(msg))
+            if member == "PlayPause":
+                self.status = "Playing" if self.status != "Playing" else "Paused"
+                self.emit({"PlaybackStatus": ("s", self.status)})
+            elif member == "Next":
+                self.track += 1
+                self.title = f"Song {self.track}"
+                self.emit({"Metadata": self.props()["Metadata"]})
+
+    def close(self):
+        self._closing.set()
+        self.join(timeout=2)
+        self.conn.close()
+
+
+def start_bus(address="unix:tmpdir=/tmp"):
+    daemon = subprocess.Popen(["dbus-daemon", "--session", "--nofork", "--print-address=1", f"--address={address}"],
+                              stdout=subprocess.PIPE, text=True)
+    return daemon, daemon.stdout.readline().strip()
+
+
+def stop_bus(daemon):
+    daemon.terminate()
+    daemon.wait(timeout=5)
+
+
+@pytest.fixture()
+def session_bus():
+    daemon, address = start_bus()
+    try:
+        yield address
+    finally:
+        stop_bus(daemon)
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.02)
+    return predicate()
+
+
+def test_signals_keep_now_playing_current(session_bus, monkeypatch):
+    player = StubPlayer(session_bus)
+    client = MprisClient(bus=session_bus)
+    try:
+        assert client.start()
+        track = client.now_playing()
+        assert (track["title"], track["artist"], track["playback_status"]) == ("Song One", "Stub Artist", "Paused")
+
+        assert client.transport("PlayPause") == "kdebottest"
+        assert wait_for(lambda: client.now_playing()["playback_status"] == "Playing")
+        client.transport("Next")
+        assert wait_for(lambda: client.now_playing()["title"] == "Song 2")
+        assert player.calls.count("GetAll") == 1  # everything after start came from signals
+
+        # No playerctl involved once MPRIS is connected
+        real_run = subprocess.run
+
+        def no_playerctl(argv, **kwargs):
+            assert argv[0] != "playerctl", f"unexpected subprocess: {argv}"
+            return real_run(argv, **kwargs)
+        monkeypatch.setattr(subprocess, "run", no_playerctl)
+        handler = MediaHandler(mpris=client)
+        result = handler.get_now_playing()
+        assert result["track"] == "Stub Artist - Song 2" and result["backend"] == "mpris"
+        assert handler.previous_track()["player"] == "kdebottest"
+    finally:
+        client.close()
+        player.close()
+
+
+def test_players_appear_and_vanish(session_bus):
+    client = MprisClient(bus=session_bus)
+    try:
+        assert client.start()
+        assert client.now_playing() is None
+
+        late = StubPlayer(session_bus, name="late", title="Late Song")
+        assert wait_for(lambda: [p["player"] for p in client.players()] == ["late"])
+        assert client.now_playing()["title"] == "Late Song"
+
+        late.close()
+        assert wait_for(lambda: client.players() == [])
+    finally:
+        client.close()
+
+
+def test_unreachable_bus_falls_back():
+    client = MprisClient(bus="unix:path=/nonexistent/kdebot-bus")
+    assert client.start() is False and not client.connected
+    handler = MediaHandler(mpris=client)
+    assert handler._mpris() is None
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_bus_loss_falls_back_and_reconnects(tmp_path, monkeypatch):
+    address = f"unix:path={tmp_path}/bus"
+    daemon, _ = start_bus(address)
+    player = StubPlayer(address)
+    client = MprisClient(bus=address, retry=0, keepalive=0.1)
+    spawned = []  # playerctl only: background probes from other tests may run programs meanwhile
+
+    def fake_run(argv, **kwargs):
+        if argv[0] == "playerctl":
+            spawned.append(argv)
+        return subprocess.CompletedProcess(argv, 0, "", "")
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    try:
+        assert client.start()
+        player.close()
+        stop_bus(daemon)
+        assert wait_for(lambda: not client.connected)
+        with pytest.raises(MprisUnavailable):
+            client.transport("PlayPause")  # cached player, dead router
+
+        handler = MediaHandler(mpris=client)
+        result = handler.play_pause()
+        assert result["status"] == "success" and "backend" not in result
+        assert spawned == [["playerctl", "play-pause"]]
+
+        daemon, _ = start_bus(address)
+        player = StubPlayer(address, title="Back Again")
+        assert client.ensure()
+        assert client.now_playing()["title"] == "Back Again"
+        assert handler.next_track()["backend"] == "mpris" and len(spawned) == 1
+    finally:
+        client.close()
+        player.close()
+        stop_bus(daemon)
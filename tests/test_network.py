@@ -0,0 +1,151 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from handlers.network import CachedProbe, NetworkHandler
+
+
+@pytest.fixture()
+def ip_server():
+    """Local stand-in for api.ipify.org that answers after ``state['delay']`` seconds."""
+    state = {"delay": 0.0, "hits": 0, "status": 200}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state["hits"] += 1
+            time.sleep(state["delay"])
+            body = b"203.0.113.7\n"
+            self.send_response(state["status"])
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}/"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.05)
+    return predicate()
+
+
+def test_network_info_never_waits_for_the_resolver(ip_server):
+    ip_server["delay"] = 1.5
+    handler = NetworkHandler(public_ip_url=ip_server["url"], probe_interval=0.1)
+    handler.probes.probes["wifi"].fn = lambda: None
+    try:
+        started = time.monotonic()
+        first = handler.get_network_info()
+        assert time.monotonic() - started < 1
+        assert first["public_ip"] is None and first["probes"]["public_ip"]["age"] is None
+        assert "checking" in first["details"]
+
+        assert wait_for(lambda: handler.get_network_info()["public_ip"] == "203.0.113.7")
+        info = handler.get_network_info()
+        assert info["probes"]["public_ip"]["age"] < 5 and info["probes"]["public_ip"]["stale"] is False
+        assert ip_server["hits"] == 1  # later requests read the cache
+    finally:
+        handler.stop()
+
+
+def test_probe_refreshes_ahead_and_keeps_last_value_on_error():
+    calls = []
+
+    def lookup():
+        calls.append(time.time())
+        if len(calls) > 1:
+            raise OSError("network unreachable")
+        return "198.51.100.1"
+
+    probe = CachedProbe("public_ip", lookup, ttl=100, error_ttl=10, refresh_ahead=0.8)
+    assert probe.due()
+    probe.refresh()
+    now = probe.attempted
+    assert not probe.due(now + 79) and probe.due(now + 80)
+
+    probe.refresh()
+    snap = probe.snapshot()
+    assert snap["value"] == "198.51.100.1" and snap["error"] == "network unreachable"
+    assert not probe.due(probe.attempted + 7) and probe.due(probe.attempted + 8)
+
+
+def test_resolver_errors_are_reported(ip_server):
+    ip_server["status"] = 503
+    handler = NetworkHandler(public_ip_url=ip_server["url"])
+    handler.probes.probes["wifi"].fn = lambda: None
+    handler.probes.tick()
+    info = handler.probes.snapshot()["public_ip"]
+    assert info["value"] is None and "503" in info["error"]
+
+
+class FakeCounters:
+    """Scripted psutil.net_io_counters(pernic=True) plus a manual clock."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.nics = {"lo": [0] * 6, "eth0": [0] * 6, "wlan0": [0] * 6}
+
+    def advance(self, seconds, **per_nic_rx_tx):
+        self.now += seconds
+        for nic, (rx, tx) in per_nic_rx_tx.items():
+            self.nics[nic][0] += rx * seconds
+            self.nics[nic][1] += tx * seconds
+
+    def __call__(self):
+        from collections import namedtuple
+        row = namedtuple("snetio", "bytes_recv bytes_sent errin errout dropin dropout")
+        return {nic: row(*values) for nic, values in self.nics.items()}
+
+
+def test_sampler_rates_over_windows():
+    from handlers.network import NetworkSampler
+
+    fake = FakeCounters()
+    sampler = NetworkSampler(interval=2, history=300, counters=fake, clock=lambda: fake.now)
+    sampler.tick()
+    for _ in range(150):  # 5 minutes: eth0 at 1000 B/s in, lo is noisy
+        fake.advance(2, eth0=(1000, 100), lo=(50000, 50000))
+        sampler.tick()
+    for _ in range(30):   # last minute: wlan0 takes over at 4000 B/s
+        fake.advance(2, wlan0=(4000, 400))
+        sampler.tick()
+    fake.nics["wlan0"][3] += 10  # 10 tx errors in the last interval
+    fake.advance(2, wlan0=(4000, 400))
+    sampler.tick()
+
+    now = sampler.rates()
+    assert now["total"]["rx_bps"] == 4000 and now["interfaces"]["eth0"]["rx_bps"] == 0
+    assert now["total"]["errors_ps"] == 5.0
+    assert sampler.rates(60)["total"]["rx_bps"] == 4000
+    five = sampler.rates(300)  # t=62..362; eth0 carried 1000 B/s until t=300
+    assert five["span"] == 300 and five["interfaces"]["eth0"]["rx_bps"] == 238000 // 300
+    assert len(sampler._samples) == sampler._samples.maxlen
+
+
+def test_network_stats_reports_rates_and_busiest():
+    from handlers.network import NetworkSampler
+
+    fake = FakeCounters()
+    sampler = NetworkSampler(interval=1, counters=fake, clock=lambda: fake.now)
+    handler = NetworkHandler(sampler=sampler)
+    assert handler.get_network_stats()["rates"]["current"]["rx_bps"] == 0  # one sample, no delay
+
+    fake.advance(1, eth0=(2048, 1024), lo=(10 ** 6, 10 ** 6))
+    sampler.tick()
+    result = handler.get_network_stats()
+    assert result["busiest"] == "eth0"
+    assert result["rates"]["current"]["tx_bps"] == 1024 + 10 ** 6
+    assert set(result["rates"]) == {"current", "1m", "5m"}
+    assert "Busiest: eth0" in result["details"]
+    assert sampler.current() == {"rx_bps": 2048 + 10 ** 6, "tx_bps": 1024 + 10 ** 6}
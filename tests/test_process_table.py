@@ -0,0 +1,169 @@
+import subprocess
+import sys
+import time
+import uuid
+
+from handlers.process import ProcessHandler
+from handlers.process_table import ProcessTable
+
+
+def test_busy_process_reports_cpu_after_second_tick():
+    busy = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+    try:
+        table = ProcessTable(interval=60)
+        table.tick()
+        assert table.get(busy.pid)["cpu"] == 0.0  # primed only
+        time.sleep(0.5)
+        table.tick()
+        assert table.get(busy.pid)["cpu"] > 10
+        top, total = table.top(limit=3, sort_by="cpu")
+        assert busy.pid in [row["pid"] for row in top]
+        assert len(top) == 3 and total >= 3
+    finally:
+        busy.kill()
+        busy.wait()
+
+
+def test_vanished_pids_are_dropped():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    table = ProcessTable(interval=60)
+    table.tick()
+    assert table.get(child.pid) is not None
+    child.kill()
+    child.wait()
+    table.tick()
+    assert table.get(child.pid) is None
+    assert child.pid not in table._procs
+
+
+def test_concurrent_first_requests_share_one_tick():
+    import threading
+
+    table = ProcessTable(interval=60)
+    table.start()  # sampler's first tick races the requests below
+    try:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(table.top(limit=5)[1])) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(results) == 8 and all(total > 0 for total in results)
+        assert table.ticks == 1
+    finally:
+        table.stop()
+
+
+def test_handler_uses_table_and_sorts_by_memory():
+    handler = ProcessHandler(ProcessTable(interval=60))
+    result = handler.list_processes(limit=5, sort_by="memory")
+    assert result["status"] == "success"
+    mems = [p["memory"] for p in result["processes"]]
+    assert mems == sorted(mems, reverse=True) and len(mems) <= 5
+
+
+def test_index_prefix_substring_regex_and_limits():
+    from handlers.process_table import ProcessIndex
+    import pytest
+
+    index = ProcessIndex()
+    index.add(1, "firefox", "/usr/lib/firefox/firefox --new-window")
+    index.add(2, "Web Content", "/usr/lib/firefox/firefox -contentproc 12")
+    index.add(3, "fish", "-fish")
+    index.add(4, "python3", "python3 client/server.py")
+
+    assert index.search("fi", mode="prefix", field="name") == ([1, 3], False)
+    assert sorted(index.search("firefox")[0]) == [1, 2]
+    assert index.search("firefox", field="name")[0] == [1]
+    assert index.search(r"server\.py$", mode="regex")[0] == [4]
+    assert index.search("f", limit=2)[1] is True
+
+    index.remove(1)
+    assert index.search("fire", mode="prefix", field="name") == ([], False)
+    with pytest.raises(ValueError):
+        index.search("(", mode="regex")
+
+
+def test_table_search_finds_spawned_process():
+    marker = f"kdebot-{uuid.uuid4().hex}"  # unique, so no other cmdline can match
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)", marker])
+    try:
+        table = ProcessTable(interval=60)
+        table.tick()
+        rows, truncated = table.search(marker, field="cmdline")
+        assert [r["pid"] for r in rows] == [child.pid]
+        assert marker in rows[0]["cmdline"]
+
+        result = ProcessHandler(table).get_process_info(child.pid)
+        assert result["status"] == "success" and marker in result["process"]["cmdline"]
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_kill_many_tree_and_escalation():
+    import textwrap
+    parent = subprocess.Popen([sys.executable, "-c", textwrap.dedent("""
+        import subprocess, sys, time
+        kids = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"]) for _ in range(2)]
+        print(" ".join(str(k.pid) for k in kids), flush=True)
+        time.sleep(30)
+    """)], stdout=subprocess.PIPE, text=True)
+    stubborn = subprocess.Popen([sys.executable, "-c", "import signal, time; "
+                                 "signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); "
+                                 "time.sleep(30)"], stdout=subprocess.PIPE, text=True)
+    try:
+        kids = [int(pid) for pid in parent.stdout.readline().split()]
+        stubborn.stdout.readline()
+        handler = ProcessHandler(ProcessTable(interval=60))
+
+        preview = handler.kill_many(tree=parent.pid, dry_run=True)
+        assert {r["pid"] for r in preview["results"]} == {parent.pid, *kids}
+        assert preview["counts"] == {"would_kill": 3}
+
+        started = time.monotonic()
+        result = handler.kill_many(pids=[parent.pid, *kids, stubborn.pid, 999999999], timeout=0.5)
+        assert time.monotonic() - started < 3
+        outcomes = {r["pid"]: r["outcome"] for r in result["results"]}
+        assert outcomes[stubborn.pid] == "killed"
+        assert outcomes[999999999] == "not_found"
+        assert all(outcomes[pid] == "terminated" for pid in (parent.pid, *kids))
+        assert result["status"] == "success"
+    finally:
+        for proc in (parent, stubborn):
+            proc.kill()
+            proc.wait()
+
+
+def test_kill_many_by_pattern_and_selector_validation():
+    marker = f"kdebot-{uuid.uuid4().hex}"
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)", marker])
+    try:
+        handler = ProcessHandler(ProcessTable(interval=60))
+        result = handler.kill_many(pattern=marker, field="cmdline", timeout=2)
+        assert [(r["pid"], r["outcome"]) for r in result["results"]] == [(child.pid, "terminated")]
+
+        assert handler.kill_many(pids=[1], pattern="x")["status"] == "error"
+        assert handler.kill_many()["status"] == "error"
+        assert handler.kill_many(pids=[1])["counts"] == {"skipped": 1}
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_kill_many_by_pattern_skips_processes_changed_since_tick():
+    marker = f"kdebot-{uuid.uuid4().hex}"
+    # Matches by cmdline at tick time, then exec()s into something else
+    child = subprocess.Popen(["sh", "-c", "sleep 0.3; exec sleep 30", marker])
+    try:
+        table = ProcessTable(interval=60)
+        table.tick()
+        assert table.search(marker, field="cmdline")[0]
+        time.sleep(0.6)
+
+        result = ProcessHandler(table).kill_many(pattern=marker, field="cmdline", timeout=1)
+        assert [(r["pid"], r["outcome"]) for r in result["results"]] == [(child.pid, "gone")]
+        assert child.poll() is None  # not signalled
+    finally:
+        child.kill()
+        child.wait()
@@ -0,0 +1,63 @@
+from result_cache import CachePolicy, ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting_handler(calls):
+    def handler(params):
+        calls.append(params)
+        return {'status': 'success', 'n': len(calls)}
+    return handler
+
+
+def test_hit_until_ttl_expires():
+    clock = FakeClock()
+    cache = ResultCache({'battery_status': CachePolicy(ttl=10)}, clock=clock)
+    calls = []
+    handler = counting_handler(calls)
+
+    assert cache.call('battery_status', {}, handler)['n'] == 1
+    assert cache.call('battery_status', {}, handler)['n'] == 1
+    clock.now = 11
+    assert cache.call('battery_status', {}, handler)['n'] == 2
+    stats = cache.stats()['battery_status']
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+
+def test_key_params_and_lru_eviction():
+    cache = ResultCache({'process_list': CachePolicy(ttl=60, key_params=('limit',), max_entries=2)})
+    calls = []
+    handler = counting_handler(calls)
+
+    for limit in (5, 10, 5, 20):
+        cache.call('process_list', {'limit': limit, 'ignored': limit}, handler)
+    # limit=10 was least recently used when limit=20 arrived
+    assert len(calls) == 3
+    cache.call('process_list', {'limit': 10}, handler)
+    assert len(calls) == 4
+    assert cache.stats()['process_list']['evictions'] == 2
+
+
+def test_errors_are_not_cached_and_mutators_invalidate():
+    cache = ResultCache({'media_now_playing': CachePolicy(ttl=60, invalidated_by=('media_next',))})
+    calls = []
+
+    def flaky(params):
+        calls.append(1)
+        return {'status': 'error' if len(calls) == 1 else 'success'}
+
+    cache.call('media_now_playing', {}, flaky)
+    cache.call('media_now_playing', {}, flaky)
+    cache.call('media_now_playing', {}, flaky)
+    assert len(calls) == 2
+
+    cache.call('media_next', {}, lambda p: {'status': 'success'})
+    cache.call('media_now_playing', {}, flaky)
+    assert len(calls) == 3
+    assert cache.stats()['media_now_playing']['invalidations'] == 1
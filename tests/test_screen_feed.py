@@ -0,0 +1,56 @@
+import pytest
+
+from bot.command_manager import CommandManager
+from bot.screen_feed import ScreenFeed
+
+
+class FakeClient:
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.calls = []
+
+    async def capture_screenshot(self, params, if_hash=None):
+        self.calls.append((params, if_hash))
+        frame = self.frames.pop(0) if self.frames else if_hash  # idle screen once scripted frames run out
+        if frame == "error":
+            return {"status": "error", "message": "boom"}
+        if frame == if_hash:
+            return {"status": "success", "unchanged": True, "hash": if_hash, "since": 0}
+        return {"status": "success", "unchanged": False, "hash": frame, "data": b"x" * 100, "file": "f.jpg"}
+
+
+@pytest.mark.asyncio
+async def test_feed_publishes_only_changed_frames():
+    client = FakeClient(["a", "a", "a", "b", "error", "b"])
+    feed = ScreenFeed(client, interval=0.01, params={"max_width": 640}, threshold=3, duration=0.2)
+    published = []
+
+    async def publish(result):
+        published.append(result["hash"])
+
+    await feed.run(publish)
+
+    assert published == ["a", "b"]
+    assert feed.frames_sent == 2 and feed.frames_skipped >= 3
+    assert feed.bytes_sent == 200
+    assert client.calls[0] == ({"max_width": 640, "threshold": 3}, None)
+    assert client.calls[1][1] == "a"
+
+
+@pytest.mark.asyncio
+async def test_feed_stops_after_repeated_errors():
+    feed = ScreenFeed(FakeClient(["error"] * 5), interval=0, duration=5, max_errors=3)
+    await feed.run(lambda result: None)
+    assert feed.frames_sent == 0 and feed.last_error == "boom"
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_running_task():
+    import asyncio
+    cm = CommandManager()
+    runner = asyncio.create_task(cm.run_exclusive(chat_id=7, coro_factory=lambda: asyncio.sleep(10)))
+    await asyncio.sleep(0.05)
+    assert cm.cancel(7) is True
+    await runner
+    assert cm.is_running(7) is False
+    assert cm.cancel(7) is False
@@ -0,0 +1,136 @@
+import pytest
+from PIL import Image
+
+from handlers.screenshot import (CommandBackend, ImageEncoding, ScreenshotBackend, ScreenshotRegistry,
+                                 SyntheticBackend)
+from handlers.system import SystemHandler
+
+
+class FakeBackend(ScreenshotBackend):
+    def __init__(self, name, works=True, installed=True, **kw):
+        super().__init__(name, **kw)
+        self.works = works
+        self.installed = installed
+        self.calls = 0
+
+    def probe(self, which):
+        return self.installed
+
+    def capture(self, path, env):
+        self.calls += 1
+        if not self.works:
+            raise RuntimeError("boom")
+        Image.effect_noise((200, 200), 64).convert("RGB").save(path)
+
+
+X11 = {"XDG_SESSION_TYPE": "x11"}
+
+
+def test_probe_uses_which_once_per_refresh():
+    lookups = []
+
+    def which(name):
+        lookups.append(name)
+        return "/usr/bin/scrot" if name == "scrot" else None
+
+    registry = ScreenshotRegistry([CommandBackend("scrot", ["scrot", "{path}"]),
+                                   CommandBackend("maim", ["maim", "{path}"])], which=which)
+    assert registry.probe() == ["scrot"]
+    registry.candidates("x11")
+    registry.candidates("x11")
+    assert lookups == ["scrot", "maim"]
+
+
+def test_fallback_then_preferred_backend_goes_first(tmp_path):
+    broken, good = FakeBackend("broken", works=False), FakeBackend("good")
+    registry = ScreenshotRegistry([broken, good, FakeBackend("missing", installed=False)])
+
+    shot, tried = registry.capture(str(tmp_path / "a.png"), X11)
+    assert shot.backend == "good" and tried == ["broken", "good"]
+
+    shot, tried = registry.capture(str(tmp_path / "b.png"), X11)
+    assert tried == ["good"]
+    assert broken.calls == 1
+
+    stats = registry.stats()["backends"]
+    assert stats["good"]["success_rate"] == 1.0
+    assert stats["broken"]["success_rate"] == 0.0 and stats["broken"]["last_error"] == "boom"
+    assert stats["missing"]["available"] is False
+
+
+def test_session_filtering_and_blank_output(tmp_path):
+    class Blank(FakeBackend):
+        def capture(self, path, env):
+            open(path, "wb").close()
+
+    registry = ScreenshotRegistry([FakeBackend("wl", sessions=("wayland",), skip_desktops=("gnome",)),
+                                   Blank("blank")])
+    shot, tried = registry.capture(str(tmp_path / "c.png"), {"XDG_SESSION_TYPE": "wayland",
+                                                             "XDG_CURRENT_DESKTOP": "GNOME"})
+    assert shot is None and tried == ["blank"]
+    assert registry.stats()["backends"]["blank"]["last_error"] == "output missing or blank"
+
+
+def test_in_process_capture_downscales_and_encodes(tmp_path):
+    registry = ScreenshotRegistry([SyntheticBackend(3840, 2160)])
+    png, _ = registry.capture(str(tmp_path / "full.png"), X11)
+    jpeg, _ = registry.capture(str(tmp_path / "small.jpg"), X11, ImageEncoding("jpeg", 70, 1280))
+
+    assert (png.width, png.height) == (3840, 2160)
+    assert (jpeg.width, jpeg.height) == (1280, 720)
+    assert jpeg.size * 4 < png.size
+    with Image.open(jpeg.path) as image:
+        assert image.format == "JPEG" and image.size == (1280, 720)
+
+
+def test_tool_output_is_reencoded(tmp_path):
+    class Tool(CommandBackend):
+        def capture(self, path, env):
+            Image.effect_noise((800, 600), 64).save(path)
+
+    registry = ScreenshotRegistry([Tool("tool", ["tool", "{path}"])], which=lambda name: "/bin/" + name)
+    shot, _ = registry.capture(str(tmp_path / "s.webp"), X11, ImageEncoding("webp", 60, 400))
+    assert shot.format == "webp" and (shot.width, shot.height) == (400, 300)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["s.webp"]
+
+
+def test_screenshot_params(tmp_path):
+    handler = SystemHandler({"SCREENSHOT_DIR": str(tmp_path), "SCREENSHOT_SOURCE": "synthetic"})
+    result = handler.take_screenshot({"format": "webp", "quality": 50, "max_width": 640})
+    assert result["status"] == "success"
+    assert result["file"].endswith(".webp") and result["width"] == 640
+
+    result = handler.take_screenshot({"format": "bmp"})
+    assert result["status"] == "error"
+
+
+def test_encoding_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        ImageEncoding("gif")
+
+
+def test_dhash_tolerates_small_changes():
+    from handlers.screenshot import dhash, hamming
+    backend = SyntheticBackend(640, 360)
+    base = backend.grab({})
+    assert dhash(base) == dhash(base.copy())
+
+    backend.frame = 3
+    moved = backend.grab({})
+    assert hamming(dhash(base), dhash(moved)) > 4
+
+
+def test_unchanged_screen_is_not_stored(tmp_path):
+    handler = SystemHandler({"SCREENSHOT_DIR": str(tmp_path), "SCREENSHOT_SOURCE": "synthetic"})
+    first = handler.take_screenshot()
+    assert first["unchanged"] is False and len(first["hash"]) == 16
+
+    again = handler.take_screenshot({"if_hash": first["hash"]})
+    assert again["unchanged"] is True
+    assert again["since"] == first["since"]
+    assert len(list(tmp_path.iterdir())) == 1
+
+    handler.screenshots.backends[0].frame = 3
+    changed = handler.take_screenshot({"if_hash": first["hash"]})
+    assert changed["unchanged"] is False and changed["hash"] != first["hash"]
+    assert changed["since"] >= first["since"]
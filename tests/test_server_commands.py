@@ -3,7 +3,7 @@ import json
 import types
 import pytest
 
-from client.server import app, AUTH_TOKEN
+from client.server import app, AUTH_TOKEN, UPLOAD_DIR
 
 def auth_headers():
     return {"Authorization": f"Bearer {AUTH_TOKEN}", "Content-Type": "application/json"}
@@ -33,6 +33,7 @@ def test_status_ok_with_auth(client):
     data = resp.get_json()
     assert "hostname" in data
     assert "cpu" in data
+    assert data["sample_age"] >= 0
 
 
 def test_unknown_command(client):
@@ -61,3 +62,117 @@ def test_download_restriction(client, tmp_path, monkeypatch):
     resp = client.post("/getfile", data=json.dumps({"path": str(outside_path)}), headers=auth_headers())
     assert resp.status_code in (403, 500)
 
+
+def test_getfile_range_and_etag(client, tmp_path, monkeypatch):
+    import client.server as server
+    monkeypatch.setattr(server, "ALLOWED_DOWNLOAD_DIRS", [str(tmp_path)])
+    target = tmp_path / "data.bin"
+    target.write_bytes(bytes(range(256)) * 4)
+    headers = {"Authorization": f"Bearer {AUTH_TOKEN}"}
+
+    resp = client.get("/getfile", query_string={"path": str(target)}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["Accept-Ranges"] == "bytes"
+    etag = resp.headers["ETag"]
+
+    resp = client.get("/getfile", query_string={"path": str(target)},
+                      headers={**headers, "Range": "bytes=1000-", "If-Range": etag})
+    assert resp.status_code == 206
+    assert resp.data == target.read_bytes()[1000:]
+
+    resp = client.get("/getfile", query_string={"path": str(target)}, headers={**headers, "If-None-Match": etag})
+    assert resp.status_code == 304
+
+
+
+def test_batch_returns_results_in_order(client):
+    payload = {"commands": [
+        {"command": "network_stats"},
+        {"command": "not_exists"},
+        {"command": "battery_status", "params": {}},
+    ]}
+    resp = client.post("/commands", data=json.dumps(payload), headers=auth_headers())
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert [r["command"] for r in results] == ["network_stats", "not_exists", "battery_status"]
+    assert results[0]["status"] == "success"
+    assert results[1]["code"] == 400
+    assert all(r["elapsed_ms"] >= 0 for r in results)
+
+
+def test_batch_rejects_empty(client):
+    resp = client.post("/commands", data=json.dumps({"commands": []}), headers=auth_headers())
+    assert resp.status_code == 400
+
+
+def test_stream_pushes_sse_frames(client):
+    resp = client.get("/stream?topics=memory&interval=0.1", headers=auth_headers())
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    chunks = resp.response
+    assert next(chunks).startswith(b"retry:")
+    frame = next(chunks)
+    assert b'"memory"' in frame
+    resp.close()
+
+
+def test_stream_rejects_unknown_topics(client):
+    resp = client.get("/stream?topics=nope", headers=auth_headers())
+    assert resp.status_code == 400
+
+
+def test_metrics_exposition(client):
+    client.post("/command", data=json.dumps({"command": "network_stats"}), headers=auth_headers())
+    resp = client.get("/metrics", headers=auth_headers())
+    assert resp.status_code == 200
+    text = resp.get_data(as_text=True)
+    assert 'kdebot_commands_total{command="network_stats",status="success"}' in text
+    assert 'kdebot_command_duration_seconds_bucket{command="network_stats",le="+Inf"}' in text
+    assert "kdebot_cache_hits_total" in text
+
+
+def test_upload_returns_job_id(client):
+    payload = {"filename": "x.bin", "url": "http://127.0.0.1:9/unreachable"}
+    resp = client.post("/upload", data=json.dumps(payload), headers=auth_headers())
+    assert resp.status_code == 202
+    job_id = resp.get_json()["job_id"]
+    resp = client.get(f"/jobs/{job_id}", headers=auth_headers())
+    assert resp.status_code == 200
+    assert resp.get_json()["job"]["job_id"] == job_id
+    assert client.get("/jobs/unknown", headers=auth_headers()).status_code == 404
+
+
+def test_screenshot_backends_command(client):
+    resp = client.post("/command", data=json.dumps({"command": "screenshot_backends"}), headers=auth_headers())
+    data = resp.get_json()
+    assert data["status"] == "success"
+    assert "scrot" in data["backends"]
+    assert data["session"] in ("x11", "wayland")
+
+
+def test_inline_screenshot(client, tmp_path, monkeypatch):
+    import client.server as server
+    from handlers.screenshot import ScreenshotRegistry, SyntheticBackend
+    monkeypatch.setattr(server.system_handler, "screenshots", ScreenshotRegistry([SyntheticBackend(800, 600)]))
+    monkeypatch.setitem(server.system_handler.config, "SCREENSHOT_DIR", str(tmp_path))
+
+    resp = client.get("/screenshot?format=jpeg&max_width=400", headers=auth_headers())
+    assert resp.status_code == 200
+    assert resp.mimetype == "image/jpeg"
+    assert resp.headers["X-Screenshot-Width"] == "400"
+    assert resp.data == (tmp_path / resp.headers["X-Screenshot-File"]).read_bytes()
+
+    resp = client.get("/screenshot?format=jpeg&max_width=400",
+                      headers={**auth_headers(), "If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 304
+    assert float(resp.headers["X-Screenshot-Since"]) > 0
+
+
+def test_storage_report(client):
+    resp = client.post("/command", data=json.dumps({"command": "storage_report"}), headers=auth_headers())
+    data = resp.get_json()
+    assert data["status"] == "success"
+    assert len(data["directories"]) == 2
+    # Upload retention is opt-in: nothing in UPLOAD_DIR is evicted by default
+    uploads = data["directories"][os.path.abspath(UPLOAD_DIR)]
+    assert uploads["policy"] == {"max_age": 0, "max_bytes": 0, "max_files": 0, "by": "mtime"}
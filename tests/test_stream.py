@@ -0,0 +1,84 @@
+from stream import StreamHub, format_frame
+
+
+def make_hub(values):
+    hub = StreamHub(interval=0.1)
+    hub.register('cpu', lambda: dict(values))
+    hub.register('memory', lambda: {'memory': 50.0})
+    return hub
+
+
+def test_only_changed_fields_are_published():
+    values = {'cpu': 10.0, 'load1': 0.5}
+    hub = make_hub(values)
+    sub = hub.subscribe(['cpu'])
+
+    hub.tick()
+    assert sub.drain() == {'cpu': {'cpu': 10.0, 'load1': 0.5}}
+
+    values['cpu'] = 20.0
+    hub.tick()
+    assert sub.drain() == {'cpu': {'cpu': 20.0}}
+
+    hub.tick()
+    assert sub.drain() is None
+
+
+def test_slow_consumer_frames_are_coalesced():
+    values = {'cpu': 1.0}
+    hub = make_hub(values)
+    sub = hub.subscribe(['cpu', 'memory'])
+    for n in range(2, 6):
+        values['cpu'] = float(n)
+        hub.tick()
+    frame = sub.drain()
+    assert frame == {'cpu': {'cpu': 5.0}, 'memory': {'memory': 50.0}}
+    assert sub.coalesced >= 3
+
+
+def test_one_sample_fans_out_to_all_watchers():
+    calls = []
+    hub = StreamHub(interval=0.1)
+    hub.register('cpu', lambda: calls.append(1) or {'cpu': len(calls)})
+    subs = [hub.subscribe(['cpu']) for _ in range(10)]
+    hub.tick()
+    assert len(calls) == 1
+    assert all(s.drain() == {'cpu': {'cpu': 1}} for s in subs)
+
+
+def test_unwatched_topics_are_not_sampled_and_late_joiners_get_state():
+    calls = []
+    hub = StreamHub(interval=0.1)
+    hub.register('cpu', lambda: {'cpu': 1.0})
+    hub.register('media', lambda: calls.append(1) or {'track': 'x'})
+    first = hub.subscribe(['cpu'])
+    hub.tick()
+    assert calls == []
+
+    late = hub.subscribe(['cpu'])
+    assert late.drain() == {'cpu': {'cpu': 1.0}}
+    hub.unsubscribe(first)
+    hub.unsubscribe(late)
+    assert hub.subscriber_count() == 0
+
+
+def test_format_frame_is_sse():
+    text = format_frame({'cpu': {'cpu': 3.0}})
+    assert text.startswith('event: delta\ndata: {')
+    assert text.endswith('\n\n')
+
+
+def test_interval_must_be_finite_and_is_clamped():
+    import pytest
+    from stream import MAX_INTERVAL, parse_subscription_args
+
+    for bad in ('inf', '-inf', 'nan', 'fast'):
+        with pytest.raises(ValueError):
+            parse_subscription_args({'interval': bad})
+    assert parse_subscription_args({'topics': 'cpu', 'interval': '2'}) == (['cpu'], 2.0)
+
+    hub = make_hub({'cpu': 1.0})
+    with pytest.raises(ValueError):
+        hub.subscribe(['cpu'], float('nan'))
+    assert hub.subscribe(['cpu'], 1e9).interval == MAX_INTERVAL
+    assert hub.subscribe(['cpu'], -5).interval == hub.interval
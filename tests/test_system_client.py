@@ -15,3 +15,95 @@ async def test_system_client_handles_unreachable(monkeypatch):
         await client._with_retries(lambda: failing())
 
     await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_send_batch_roundtrip():
+    from aiohttp.test_utils import TestServer
+    from client.server import app, dispatch_command, check_token
+    from client.aio_server import create_app
+
+    server = TestServer(create_app(app, dispatch_command, check_token, max_workers=2))
+    await server.start_server()
+    client = SystemClient()
+    client.base_url = str(server.make_url('')).rstrip('/')
+    try:
+        result = await client.send_batch([{'command': 'network_stats'}, {'command': 'battery_status'}])
+        assert result['status'] == 'success'
+        assert [r['command'] for r in result['results']] == ['network_stats', 'battery_status']
+    finally:
+        await client.aclose()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_download_to_resumes_and_skips_unchanged(tmp_path, monkeypatch):
+    from aiohttp.test_utils import TestServer
+    import client.server as server
+    from client.aio_server import create_app
+
+    monkeypatch.setattr(server, 'ALLOWED_DOWNLOAD_DIRS', [str(tmp_path / 'src')])
+    (tmp_path / 'src').mkdir()
+    source = tmp_path / 'src' / 'file.bin'
+    source.write_bytes(b'a' * 3000 + b'b' * 3000)
+    dest = str(tmp_path / 'file.bin')
+
+    app = create_app(server.app, server.dispatch_command, server.check_token, max_workers=2,
+                     resolve_path=server.resolve_download_path)
+    test_server = TestServer(app)
+    await test_server.start_server()
+    client = SystemClient()
+    client.base_url = str(test_server.make_url('')).rstrip('/')
+    try:
+        first = await client.download_to(str(source), dest)
+        assert first['status'] == 'success' and first['bytes'] == 6000
+
+        again = await client.download_to(str(source), dest)
+        assert again['unchanged'] is True
+
+        # Simulate an interrupted transfer: half of the file left in .part
+        with open(dest, 'rb') as f:
+            half = f.read(3000)
+        with open(dest + '.part', 'wb') as f:
+            f.write(half)
+        resumed = await client.download_to(str(source), dest)
+        assert resumed['resumed'] is True and resumed['bytes'] == 3000
+        assert open(dest, 'rb').read() == source.read_bytes()
+
+        # A complete .part makes the Range request unsatisfiable (416): start over
+        with open(dest + '.part', 'wb') as f:
+            f.write(source.read_bytes())
+        restarted = await client.download_to(str(source), dest)
+        assert restarted['status'] == 'success' and restarted['resumed'] is False
+        assert restarted['bytes'] == 6000 and open(dest, 'rb').read() == source.read_bytes()
+    finally:
+        await client.aclose()
+        await test_server.close()
+
+
+@pytest.mark.asyncio
+async def test_capture_screenshot_inline(tmp_path, monkeypatch):
+    from aiohttp.test_utils import TestServer
+    import client.server as server
+    from client.aio_server import create_app
+    from handlers.screenshot import ScreenshotRegistry, SyntheticBackend
+
+    monkeypatch.setattr(server.system_handler, 'screenshots', ScreenshotRegistry([SyntheticBackend(640, 480)]))
+    monkeypatch.setitem(server.system_handler.config, 'SCREENSHOT_DIR', str(tmp_path))
+    test_server = TestServer(create_app(server.app, server.dispatch_command, server.check_token, max_workers=2))
+    await test_server.start_server()
+    client = SystemClient()
+    client.base_url = str(test_server.make_url('')).rstrip('/')
+    try:
+        result = await client.capture_screenshot({'format': 'png'})
+        assert result['status'] == 'success'
+        assert result['data'].startswith(b'\x89PNG') and result['width'] == 640
+
+        same = await client.capture_screenshot({'format': 'png'}, if_hash=result['hash'])
+        assert same['unchanged'] is True and 'data' not in same
+
+        bad = await client.capture_screenshot({'format': 'gif'})
+        assert bad['status'] == 'error'
+    finally:
+        await client.aclose()
+        await test_server.close()
@@ -0,0 +1,30 @@
+import time
+
+from handlers.telemetry import TelemetrySampler
+
+
+def test_latest_samples_inline_when_not_started():
+    sampler = TelemetrySampler(interval=60, history=5)
+    sample = sampler.latest()
+    assert {'cpu', 'memory', 'swap', 'load', 'uptime_sec', 'ts'} <= set(sample)
+
+
+def test_ring_buffer_is_bounded():
+    sampler = TelemetrySampler(interval=60, history=3)
+    for _ in range(5):
+        sampler.tick()
+    assert len(sampler.history()) == 3
+    assert sampler.history(limit=2) == sampler.history()[-2:]
+
+
+def test_background_thread_fills_buffer():
+    sampler = TelemetrySampler(interval=0.1, history=10)
+    sampler.start()
+    try:
+        deadline = time.time() + 2
+        while len(sampler.history()) < 2 and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        sampler.stop()
+    assert len(sampler.history()) >= 2
+    assert sampler.status()['sample_age'] < 2
@@ -0,0 +1,53 @@
+import os
+import stat
+
+import pytest
+from aiohttp import web
+
+from bot import config
+from bot.client import SystemClient
+from transport import bind_unix_socket, parse_mode
+
+
+def test_parse_mode():
+    assert parse_mode("0600") == parse_mode("600") == parse_mode(0o600) == 0o600
+    with pytest.raises(ValueError):
+        parse_mode("4755")
+
+
+def test_bind_sets_mode_and_replaces_only_stale_sockets(tmp_path):
+    path = str(tmp_path / "s.sock")
+    sock = bind_unix_socket(path, 0o660)
+    assert stat.S_ISSOCK(os.stat(path).st_mode) and stat.S_IMODE(os.stat(path).st_mode) == 0o660
+    sock.close()  # the file stays behind, as after a crash
+
+    sock = bind_unix_socket(path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    sock.close()
+
+    regular = tmp_path / "not-a-socket"
+    regular.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        bind_unix_socket(str(regular))
+    assert regular.read_text() == "keep me"
+
+
+@pytest.mark.asyncio
+async def test_system_client_over_unix_socket(tmp_path, monkeypatch):
+    from client.server import app, dispatch_command, check_token
+    from client.aio_server import create_app
+
+    path = str(tmp_path / "kdebot.sock")
+    runner = web.AppRunner(create_app(app, dispatch_command, check_token, max_workers=2))
+    await runner.setup()
+    await web.SockSite(runner, bind_unix_socket(path)).start()
+    monkeypatch.setattr(config, "CLIENT_URL", f"unix://{path}")
+    client = SystemClient()
+    try:
+        assert client.unix_path == path and client.base_url == "http://localhost"
+        result = await client.send_command("network_stats")
+        assert result["status"] == "success"
+        assert (await client.get_status())["hostname"]
+    finally:
+        await client.aclose()
+        await runner.cleanup()